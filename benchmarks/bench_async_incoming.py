@@ -0,0 +1,116 @@
+"""Throughput of ``/incoming`` while the LLM takes ``--delay`` seconds.
+
+Compares the previous shape of the endpoint (blocking calls made straight
+from the ``async def`` handler) with the current async pipeline, driving
+both in-process through ``httpx.ASGITransport``. The outbox and the
+memory service are replaced by no-ops and the LLM by a sleep, so only the
+webhook itself is measured.
+
+    python benchmarks/bench_async_incoming.py --requests 50 --delay 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT / "src")]
+
+import httpx
+from fastapi import FastAPI, Request
+
+os.environ.setdefault("INGEST_WORKERS", "0")  # measure the pipeline, not the ack
+import src.receiver as receiver
+from src.agent import agent as agent_module
+from src.storage import open_store, set_store
+from src.utils import reply_buffer
+
+
+def stub_dependencies(delay: float) -> None:
+    def think_llm(self, user_message):
+        time.sleep(delay)
+        return None, {}
+
+    async def think_llm_async(self, user_message):
+        await asyncio.sleep(delay)
+        return None, {}
+
+    agent_module.Agent.think_llm = think_llm
+    agent_module.Agent.think_llm_async = think_llm_async
+    agent_module.save_user_memory = lambda user_id, memory: {}
+    reply_buffer.queue_message = lambda number, message: 0
+
+
+def blocking_app() -> FastAPI:
+    """The endpoint as it was: every call blocks the event loop."""
+    app = FastAPI()
+
+    @app.post("/incoming")
+    async def incoming(request: Request):
+        payload = await request.json()
+        user, message = payload["number"], payload["message"]
+        result, _replies = receiver.handle_message(user, message)
+        if result is None:
+            agent = agent_module.Agent(user_id=user)
+            tool, args = agent.think_llm(message)
+            agent.act(tool, args, message)
+            result = {"status": "agent"}
+        return result
+
+    return app
+
+
+async def drive(app: FastAPI, requests: int) -> tuple[float, list[float]]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+
+        async def one(i: int) -> float:
+            start = time.perf_counter()
+            res = await client.post(
+                "/incoming", json={"number": f"bench-{i}", "message": "hi"}
+            )
+            res.raise_for_status()
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one(i) for i in range(requests)))
+        return time.perf_counter() - start, list(latencies)
+
+
+def report(label: str, elapsed: float, latencies: list[float]) -> None:
+    print(
+        f"{label:<9} {len(latencies) / elapsed:8.2f} req/s  "
+        f"wall {elapsed:7.2f} s  "
+        f"p50 {statistics.median(latencies):6.2f} s  "
+        f"max {max(latencies):6.2f} s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=2.0)
+    parser.add_argument("--skip-blocking", action="store_true")
+    args = parser.parse_args()
+
+    stub_dependencies(args.delay)
+    with tempfile.TemporaryDirectory() as tmp:
+        set_store(open_store("journal", os.path.join(tmp, "bookings.json")))
+        print(f"{args.requests} concurrent LLM-bound messages, {args.delay}s LLM delay")
+        if not args.skip_blocking:
+            report("blocking", *asyncio.run(drive(blocking_app(), args.requests)))
+        report("async", *asyncio.run(drive(receiver.app, args.requests)))
+        set_store(None)
+
+
+if __name__ == "__main__":
+    main()
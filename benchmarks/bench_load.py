@@ -0,0 +1,324 @@
+"""Load test: the real server against local stand-ins, driven by a
+conversation mix.
+
+Boots ``python -m src.server`` on a scratch data directory with the
+WhatsApp bridge, Ollama, the memory service and Duckling replaced by the
+stubs in ``stubs.py``, then starts conversations at random (Poisson)
+arrival times so that roughly ``--rate`` messages/sec arrive:
+
+booking     "book tomorrow at 3:15pm", then "skip" if asked for an email
+reschedule  a booked user moves their slot (plus "skip" if asked)
+cancel      a booked user cancels
+lookup      a booked user asks when their appointment is
+smalltalk   "hi", which goes to the LLM agent
+
+Reschedule, cancel and lookup pick a user an earlier booking conversation
+left booked, or a fresh one when there is none yet. Latency is measured
+per message from the client and reported per intent path, with the
+statuses the webhook answered. By default the server processes each
+message inline (``INGEST_WORKERS=0``) so latency covers the whole
+pipeline; ``--queued`` measures the 202 acknowledgement instead (the
+answers then carry no status, so there are no follow-ups or returning
+users and fewer messages than ``--rate``).
+
+    python benchmarks/bench_load.py --rate 20 --duration 30
+    python benchmarks/bench_load.py --mix booking=1,smalltalk=1 --latency llm=2 --errors llm=0.1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from stubs import Stubs, add_stub_arguments, behaviours_from_args
+
+DEFAULT_MIX = {
+    "booking": 40,
+    "reschedule": 15,
+    "cancel": 10,
+    "lookup": 20,
+    "smalltalk": 15,
+}
+# messages per conversation, to turn --rate into conversation arrivals
+NOMINAL_LENGTH = {
+    "booking": 2,
+    "reschedule": 2,
+    "cancel": 1,
+    "lookup": 1,
+    "smalltalk": 1,
+}
+
+DAYS = ["tomorrow", "monday", "tuesday", "wednesday", "thursday", "friday"]
+
+
+def random_slot() -> str:
+    hour = random.choice([9, 10, 11, 1, 2, 3, 4])
+    minute = random.choice(["00", "15", "30", "45"])
+    return f"{random.choice(DAYS)} at {hour}:{minute}{'am' if hour >= 9 else 'pm'}"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class LoadRun:
+    """Drives conversations against ``base_url`` and records every message."""
+
+    def __init__(self, client: httpx.AsyncClient, mix: dict[str, float]):
+        self.client = client
+        self.mix = mix
+        self.latency: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter[str] = Counter()
+        self.statuses: dict[str, Counter[str]] = defaultdict(Counter)
+        self.booked: list[str] = []
+        self.users = 0
+
+    async def send(self, path: str, number: str, message: str) -> str | None:
+        start = time.perf_counter()
+        try:
+            res = await self.client.post(
+                "/incoming", json={"number": number, "message": message}
+            )
+            status = res.json().get("status") if res.content else None
+            ok = res.status_code < 400
+        except (httpx.HTTPError, ValueError) as exc:
+            status, ok = type(exc).__name__, False
+        self.latency[path].append(time.perf_counter() - start)
+        self.statuses[path][str(status)] += 1
+        if not ok:
+            self.errors[path] += 1
+        return status
+
+    def new_user(self) -> str:
+        self.users += 1
+        return f"load-{self.users}"
+
+    def booked_user(self) -> str:
+        if self.booked:
+            return self.booked.pop(random.randrange(len(self.booked)))
+        return self.new_user()
+
+    async def book(self, path: str, number: str, message: str) -> None:
+        status = await self.send(path, number, message)
+        if status == "ask email":
+            status = await self.send("email", number, "skip")
+        if status in {"email skipped", "booked natural", "confirmed", "booked"}:
+            self.booked.append(number)
+
+    async def conversation(self, kind: str) -> None:
+        if kind == "booking":
+            await self.book(kind, self.new_user(), f"book {random_slot()}")
+        elif kind == "reschedule":
+            await self.book(kind, self.booked_user(), f"reschedule to {random_slot()}")
+        elif kind == "cancel":
+            await self.send(kind, self.booked_user(), "please cancel my appointment")
+        elif kind == "lookup":
+            returning = bool(self.booked)
+            number = self.booked_user()
+            status = await self.send(kind, number, "when is my appointment?")
+            if returning and status == "lookup":
+                self.booked.append(number)
+        else:
+            await self.send(kind, self.new_user(), "hi")
+
+    async def run(self, rate: float, duration: float, max_inflight: int) -> float:
+        kinds, weights = zip(*self.mix.items())
+        per_conversation = sum(
+            NOMINAL_LENGTH[k] * w for k, w in self.mix.items()
+        ) / sum(weights)
+        arrivals = rate / per_conversation
+        tasks: set[asyncio.Task] = set()
+        start = time.perf_counter()
+        deadline = start + duration
+        next_at = start
+        while next_at < deadline:
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            if len(tasks) < max_inflight:
+                kind = random.choices(kinds, weights)[0]
+                task = asyncio.create_task(self.conversation(kind))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            else:
+                self.errors["dropped (max inflight)"] += 1
+            next_at += random.expovariate(arrivals)
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float) -> dict:
+        paths = {}
+        for path, samples in sorted(self.latency.items()):
+            paths[path] = {
+                "messages": len(samples),
+                "errors": self.errors[path],
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p95_ms": percentile(samples, 95) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+                "max_ms": max(samples) * 1000,
+                "statuses": dict(self.statuses[path].most_common()),
+            }
+        total = sum(len(s) for s in self.latency.values())
+        return {
+            "elapsed_s": elapsed,
+            "messages": total,
+            "throughput_msg_s": total / elapsed,
+            "dropped": self.errors["dropped (max inflight)"],
+            "paths": paths,
+        }
+
+
+def start_server(port: int, env: dict[str, str], workers: int, log: bool):
+    cmd = [sys.executable, "-m", "src.server", "--workers", str(workers)]
+    cmd += ["--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    out = None if log else subprocess.DEVNULL
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=out, stderr=out)
+
+
+async def wait_ready(client: httpx.AsyncClient, server, timeout: float = 60) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("❌ server exited during startup (try --server-log)")
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.05)
+    raise SystemExit("❌ server not ready in time")
+
+
+async def drive(args, base_url: str, server) -> dict:
+    limits = httpx.Limits(max_connections=args.max_inflight)
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=args.timeout, limits=limits
+    ) as client:
+        await wait_ready(client, server)
+        run = LoadRun(client, args.mix)
+        elapsed = await run.run(args.rate, args.duration, args.max_inflight)
+        return run.report(elapsed)
+
+
+def print_report(result: dict, stubs: dict) -> None:
+    print(
+        f"\n{result['messages']} messages in {result['elapsed_s']:.1f} s "
+        f"= {result['throughput_msg_s']:.1f} msg/s"
+        + (f" ({result['dropped']} conversations dropped)" if result["dropped"] else "")
+    )
+    print(
+        f"\n{'path':<12} {'msgs':>6} {'errors':>6} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    )
+    for path, row in result["paths"].items():
+        print(
+            f"{path:<12} {row['messages']:>6} {row['errors']:>6} "
+            f"{row['p50_ms']:8.1f} {row['p95_ms']:8.1f} "
+            f"{row['p99_ms']:8.1f} {row['max_ms']:8.1f}"
+        )
+    print()
+    for path, row in result["paths"].items():
+        statuses = ", ".join(f"{s} ×{n}" for s, n in row["statuses"].items())
+        print(f"{path:<12} {statuses}")
+    print(
+        "\nstub calls: "
+        + ", ".join(
+            f"{name} {s['calls']} ({s['errors']} failed)" for name, s in stubs.items()
+        )
+    )
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown conversation {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=20, help="target messages/sec")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help="conversation weights, e.g. booking=4,lookup=2,smalltalk=1",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="server processes")
+    parser.add_argument(
+        "--queued", action="store_true", help="measure the 202 ack, not the pipeline"
+    )
+    parser.add_argument("--max-inflight", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout")
+    parser.add_argument("--seed", type=int, help="random seed for a repeatable mix")
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    parser.add_argument("--server-log", action="store_true", help="show server output")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    stubs = Stubs(behaviours_from_args(args))
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        data = Path(tmp)
+        env = {
+            **os.environ,
+            **stubs.env(),
+            "BOOKINGS_BACKEND": "sqlite",
+            "BOOKINGS_DB": str(data / "bookings.db"),
+            "OUTBOX_DB": str(data / "outbox.db"),
+            "LEADER_LOCK": str(data / "leader.lock"),
+        }
+        if not args.queued:
+            env["INGEST_WORKERS"] = "0"
+        server = start_server(port, env, args.workers, args.server_log)
+        try:
+            result = asyncio.run(drive(args, f"http://127.0.0.1:{port}", server))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+            stubs.close()
+
+    result["stubs"] = stubs.stats()
+    result["config"] = {
+        "rate": args.rate,
+        "duration": args.duration,
+        "mix": args.mix,
+        "workers": args.workers,
+        "queued": args.queued,
+        "stubs": {
+            name: {"latency": s.behaviour.latency, "error_rate": s.behaviour.error_rate}
+            for name, s in stubs.servers.items()
+        },
+    }
+    print_report(result, result["stubs"])
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
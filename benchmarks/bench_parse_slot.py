@@ -0,0 +1,76 @@
+"""Cost of ``parse_slot_dt`` with and without the per-minute result cache.
+
+Replays a mix of inbound messages and stored slot labels (the strings
+``slot_taken`` and the availability helpers re-parse) ``--rounds`` times.
+``--fallbacks`` turns on the opt-in parsers (``SLOT_FALLBACKS``). With
+``duckling`` among them, Duckling is the stub from ``stubs.py`` answering
+after ``--duckling-ms``.
+
+    python benchmarks/bench_parse_slot.py --rounds 200
+    python benchmarks/bench_parse_slot.py --fallbacks dateparser,duckling
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT / "src"), str(Path(__file__).resolve().parent)]
+
+from stubs import STUBS, Behaviour, Stubs
+
+TEXTS = [
+    "Friday 2:00 PM",
+    "Monday 9:15 AM",
+    "Tuesday 11:30 AM",
+    "book tomorrow at 3pm",
+    "can I come friday at 10?",
+    "reschedule to next week 4pm",
+    "hi",
+    "when is my appointment?",
+    "cancel my appointment",
+    "2",
+]
+
+
+def run(parse, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in TEXTS:
+            parse(text)
+    return (time.perf_counter() - start) / (rounds * len(TEXTS))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--duckling-ms", type=float, default=10)
+    parser.add_argument("--fallbacks", default="", help="e.g. dateparser,duckling")
+    args = parser.parse_args()
+
+    latency = {name: 0.0 for name in STUBS}
+    latency["duckling"] = args.duckling_ms / 1000
+    stubs = Stubs({name: Behaviour(latency=value) for name, value in latency.items()})
+    os.environ["DUCKLING_URL"] = stubs.env()["DUCKLING_URL"]
+    os.environ["SLOT_FALLBACKS"] = args.fallbacks
+
+    from src.utils import slot_parser
+
+    slot_parser.parse_slot_dt("warm up the parsers on monday at 10")
+    slot_parser._cache = slot_parser.SlotCache(maxsize=0)
+    uncached = run(slot_parser.parse_slot_dt, max(1, args.rounds // 10))
+    slot_parser._cache = cache = slot_parser.SlotCache()
+    cached = run(slot_parser.parse_slot_dt, args.rounds)
+    stubs.close()
+
+    print(f"uncached  {uncached * 1e6:10.1f} µs/parse")
+    print(f"cached    {cached * 1e6:10.1f} µs/parse  ({uncached / cached:.0f}x)")
+    print(f"cache     {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Requests/sec of ``python -m src.server`` from 1 to N worker processes.
+
+Each run starts the production server on a scratch data directory, waits
+for ``/ping`` and then drives ``/incoming`` from several client processes
+for ``--seconds`` seconds. Messages are processed inline
+(``INGEST_WORKERS=0``) with a lookup intent, so every request does a
+bookings read and an outbox write but never reaches the LLM.
+
+    python benchmarks/bench_server_scaling.py --max-workers 4 --seconds 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int, data: Path) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "BOOKINGS_BACKEND": "sqlite",
+        "BOOKINGS_DB": str(data / "bookings.db"),
+        "OUTBOX_DB": str(data / "outbox.db"),
+        "LEADER_LOCK": str(data / "leader.lock"),
+        "BUSINESS_CALENDAR": str(data / "calendar.json"),
+        "INGEST_WORKERS": "0",
+        "WHATSAPP_SEND_URL": "http://127.0.0.1:9/send",  # discard port
+    }
+    cmd = [sys.executable, "-m", "src.server", "--workers", str(workers)]
+    cmd += ["--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    return subprocess.Popen(
+        cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def wait_ready(url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url + "/ping", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not come up")
+
+
+def client(url: str, seconds: float, concurrency: int, offset: int) -> int:
+    async def run() -> int:
+        done = 0
+        stop = time.monotonic() + seconds
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=url, limits=limits) as http:
+
+            async def loop(n: int) -> None:
+                nonlocal done
+                user = f"bench-{offset}-{n}"
+                while time.monotonic() < stop:
+                    res = await http.post(
+                        "/incoming",
+                        json={"number": user, "message": "when is my appointment"},
+                    )
+                    res.raise_for_status()
+                    done += 1
+
+            await asyncio.gather(*(loop(n) for n in range(concurrency)))
+        return done
+
+    return asyncio.run(run())
+
+
+def measure(workers: int, args: argparse.Namespace) -> float:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(workers, port, Path(tmp))
+        try:
+            wait_ready(url)
+            jobs = [
+                (url, args.seconds, args.concurrency, i) for i in range(args.clients)
+            ]
+            start = time.perf_counter()
+            with multiprocessing.Pool(args.clients) as pool:
+                total = sum(pool.starmap(client, jobs))
+            return total / (time.perf_counter() - start)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPU(s); {args.clients} client processes")
+    baseline = None
+    for workers in range(1, args.max_workers + 1):
+        rate = measure(workers, args)
+        baseline = baseline or rate
+        print(f"{workers} worker(s) {rate:9.1f} req/s  x{rate / baseline:4.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Cold-start cost of the webhook: import time, first response, readiness.
+
+Starts ``python -m src.server --workers 1`` on a scratch data directory
+``--runs`` times and reports how long until ``/incoming`` first answers and
+until ``/ready`` turns 200, plus the import time of ``src.receiver`` in a
+fresh interpreter. ``python -m src.utils.startup`` breaks the import time
+down per module.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT / "src")]
+
+from src.utils.startup import import_profile
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def poll(send, deadline: float) -> float:
+    while time.perf_counter() < deadline:
+        try:
+            if send().status_code < 300:
+                return time.perf_counter()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError("server did not answer in time")
+
+
+def one_run(data: Path) -> tuple[float, float]:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        "BOOKINGS_BACKEND": "sqlite",
+        "BOOKINGS_DB": str(data / "bookings.db"),
+        "OUTBOX_DB": str(data / "outbox.db"),
+        "LEADER_LOCK": str(data / "leader.lock"),
+        "INGEST_WORKERS": "0",
+    }
+    cmd = [sys.executable, "-m", "src.server", "--workers", "1"]
+    cmd += ["--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = start + 60
+        first = poll(
+            lambda: httpx.post(
+                url + "/incoming",
+                json={"number": "bench", "message": "when is my appointment"},
+                timeout=5,
+            ),
+            deadline,
+        )
+        ready = poll(lambda: httpx.get(url + "/ready", timeout=5), deadline)
+        return first - start, ready - start
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    imports = [import_profile("src.receiver")[-1][2] / 1e6 for _ in range(args.runs)]
+    firsts, readies = [], []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            first, ready = one_run(Path(tmp))
+        firsts.append(first)
+        readies.append(ready)
+
+    for label, samples in (
+        ("import src.receiver", imports),
+        ("first /incoming response", firsts),
+        ("/ready", readies),
+    ):
+        print(
+            f"{label:<26} median {statistics.median(samples):6.2f} s  "
+            f"min {min(samples):6.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Accuracy and speed of the temporal grammar, dateparser and Duckling.
+
+Every parser reads each text of ``temporal_corpus.json`` at the corpus'
+reference time. A reading counts as right when it matches the expected
+minute, the expected date (for texts that name no time of day) or
+"nothing" (for texts with no date or time). Each text is timed as the
+fastest of ``--repeat`` passes (a tenth of that for the slow parsers), and
+the table shows the mean and the maximum over all texts.
+
+Duckling needs a running server. Pass ``--duckling-url`` to include it;
+requests go through :mod:`src.utils.duckling` just as the app sends them.
+
+    python benchmarks/bench_temporal.py --misses
+    python benchmarks/bench_temporal.py --duckling-url http://localhost:8000/parse
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT / "src")]
+
+from src.utils import temporal_grammar
+from src.utils.time_utils import BUSINESS_TZ, as_local
+
+CORPUS = Path(__file__).resolve().parent / "temporal_corpus.json"
+
+# text, reference time -> (aware datetime, names a time of day) or None
+Parser = Callable[[str, datetime], "tuple[datetime, bool] | None"]
+
+
+def grammar(text: str, now: datetime) -> tuple[datetime, bool] | None:
+    found = temporal_grammar.resolve(text, now)
+    return None if found is None else (found.start, found.grain == "minute")
+
+
+def make_dateparser() -> Parser:
+    import dateparser
+
+    def parse(text: str, now: datetime) -> tuple[datetime, bool] | None:
+        found = dateparser.parse(
+            text,
+            settings={
+                "PREFER_DATES_FROM": "future",
+                "RELATIVE_BASE": now.replace(tzinfo=None),
+            },
+        )
+        return None if found is None else (as_local(found), True)
+
+    return parse
+
+
+def make_duckling(url: str) -> Parser:
+    from src.utils import duckling
+
+    duckling.DUCKLING_URL = url
+
+    def parse(text: str, now: datetime) -> tuple[datetime, bool] | None:
+        duckling.negative_cache.discard(text)  # time the request, not the cache
+        found = duckling.parse(text, now)
+        return None if found is None else (as_local(found), True)
+
+    return parse
+
+
+def reading(result: tuple[datetime, bool] | None, expect: str | None) -> str | None:
+    """*result* at the precision of *expect*."""
+    if result is None:
+        return None
+    dt, has_time = result
+    if expect is not None and "T" not in expect:
+        return dt.date().isoformat()
+    return dt.strftime("%Y-%m-%dT%H:%M") if has_time else dt.date().isoformat()
+
+
+def evaluate(parse: Parser, cases: list[dict], now: datetime, repeat: int) -> dict:
+    misses, timings = [], []
+    for case in cases:
+        text, expect = case["text"], case["expect"]
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = parse(text, now)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best)
+        got = reading(result, expect)
+        if got != expect:
+            misses.append((text, expect, got))
+    return {
+        "correct": len(cases) - len(misses),
+        "total": len(cases),
+        "mean_us": sum(timings) / len(timings) * 1e6,
+        "max_us": max(timings) * 1e6,
+        "misses": misses,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--duckling-url", help="include a running Duckling server")
+    parser.add_argument(
+        "--no-dateparser", action="store_true", help="skip dateparser (slow)"
+    )
+    parser.add_argument("--misses", action="store_true", help="list wrong readings")
+    args = parser.parse_args()
+
+    corpus = json.loads(CORPUS.read_text(encoding="utf-8"))
+    now = datetime.fromisoformat(corpus["reference"]).replace(tzinfo=BUSINESS_TZ)
+    cases = corpus["cases"]
+
+    parsers: dict[str, Parser] = {"grammar": grammar}
+    if not args.no_dateparser:
+        start = time.perf_counter()
+        parsers["dateparser"] = make_dateparser()
+        parsers["dateparser"]("warm up on monday at 10", now)
+        print(f"dateparser import + warm-up: {time.perf_counter() - start:.2f} s")
+    if args.duckling_url:
+        parsers["duckling"] = make_duckling(args.duckling_url)
+    else:
+        print("duckling: skipped (pass --duckling-url)")
+
+    print(f"\n{len(cases)} texts at {now.isoformat()}\n")
+    print(f"{'parser':12} {'accuracy':>14} {'mean µs':>10} {'max µs':>10}")
+    results = {}
+    for name, parse in parsers.items():
+        repeat = args.repeat if name == "grammar" else max(1, args.repeat // 10)
+        results[name] = r = evaluate(parse, cases, now, repeat)
+        accuracy = (
+            f"{r['correct']}/{r['total']} {100 * r['correct'] / r['total']:3.0f}%"
+        )
+        print(f"{name:12} {accuracy:>14} {r['mean_us']:10.1f} {r['max_us']:10.1f}")
+
+    if args.misses:
+        for name, r in results.items():
+            print(f"\n{name} misses:")
+            for text, expect, got in r["misses"]:
+                print(f"  {text!r:45} expected {expect}, got {got}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Messages/sec to a local stub bridge: one-off ``requests.post`` vs the
+pooled WhatsApp client.
+
+The stub is a keep-alive HTTP/1.1 server on a free local port that answers
+every ``POST /send`` with 200, so the numbers reflect connection handling
+rather than WhatsApp.
+
+    python benchmarks/bench_whatsapp_send.py --messages 2000 --concurrency 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT / "src")]
+
+import requests
+
+from src.utils import whatsapp
+
+
+class StubBridge(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"status":"sent"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # one-off connections arrive in bursts
+
+
+def one_off_post(number: str, message: str) -> None:
+    """The previous send path: a fresh connection per message."""
+    res = requests.post(
+        whatsapp.WHATSAPP_SEND_URL,
+        json={"number": number, "message": message},
+        timeout=5,
+    )
+    res.raise_for_status()
+
+
+def run_threads(send, messages: int, concurrency: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(lambda i: send(f"user-{i}", "reminder"), range(messages)))
+    return messages / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    server = StubServer(("127.0.0.1", 0), StubBridge)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    whatsapp.WHATSAPP_SEND_URL = f"http://127.0.0.1:{server.server_port}/send"
+
+    n, c = args.messages, args.concurrency
+    print(f"{n} messages to a stub bridge, {c} concurrent senders")
+    for label, rate in (
+        ("requests.post, sequential", run_threads(one_off_post, n, 1)),
+        ("pooled sync, sequential", run_threads(whatsapp.post_message, n, 1)),
+        (f"requests.post, {c} threads", run_threads(one_off_post, n, c)),
+        (f"pooled sync, {c} threads", run_threads(whatsapp.post_message, n, c)),
+    ):
+        print(f"{label:<28} {rate:9.0f} msg/s")
+    whatsapp.close_whatsapp_client()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""Local stand-ins for the services the webhook talks to.
+
+Each stub is a keep-alive HTTP/1.1 server on a free local port with a
+configurable latency and error rate:
+
+=========  ===========================  ==============================
+name       endpoint                     env var that points at it
+=========  ===========================  ==============================
+bridge     ``POST /send``               ``WHATSAPP_SEND_URL``
+llm        ``POST /api/chat`` (Ollama)  ``OLLAMA_HOST``
+memory     ``/memory/<user>`` (MCP)     ``MCP_BASE_URL``
+duckling   ``POST /parse``              ``DUCKLING_URL``
+=========  ===========================  ==============================
+
+The LLM always answers with a ``SendWhatsappMsg`` tool call, the memory
+stub keeps what it is sent in a dict, and Duckling finds nothing. Used by
+``bench_load.py``; run on its own to point a dev server at them::
+
+    python benchmarks/stubs.py --latency llm=0.8 --errors bridge=0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+
+STUBS = ("bridge", "llm", "memory", "duckling")
+
+DEFAULT_LATENCY = {"bridge": 0.02, "llm": 0.5, "memory": 0.005, "duckling": 0.01}
+
+LLM_REPLY = json.dumps(
+    {
+        "tool": "SendWhatsappMsg",
+        "args": {"message": "Hi! 😊 I can book, move or cancel appointments."},
+    }
+)
+
+
+@dataclass
+class Behaviour:
+    """How a stub responds: ``latency`` s plus up to ``jitter`` s, and a
+    500 with probability ``error_rate``."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    calls: int = 0
+    errors: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def delay(self) -> bool:
+        """Sleep for this call; ``True`` if it should fail."""
+        failed = random.random() < self.error_rate
+        with self._lock:
+            self.calls += 1
+            self.errors += failed
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+        return failed
+
+
+# ------------------------------------------------------------------ handlers
+
+_memory: dict[str, Any] = {}
+
+
+def _bridge(method: str, path: str, body: Any) -> tuple[int, Any]:
+    return 200, {"status": "sent"}
+
+
+def _llm(method: str, path: str, body: Any) -> tuple[int, Any]:
+    if path != "/api/chat":
+        return 200, {"models": []}
+    return 200, {
+        "model": (body or {}).get("model", "stub"),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "message": {"role": "assistant", "content": LLM_REPLY},
+        "done": True,
+        "done_reason": "stop",
+    }
+
+
+def _memory_service(method: str, path: str, body: Any) -> tuple[int, Any]:
+    user = path.rsplit("/", 1)[-1]
+    if method == "POST":
+        _memory[user] = (body or {}).get("memory", {})
+        return 200, {"status": "saved"}
+    if method == "DELETE":
+        _memory.pop(user, None)
+        return 200, {"status": "deleted"}
+    return 200, _memory.get(user, {})
+
+
+def _duckling(method: str, path: str, body: Any) -> tuple[int, Any]:
+    return 200, []
+
+
+ROUTES: dict[str, Callable[[str, str, Any], tuple[int, Any]]] = {
+    "bridge": _bridge,
+    "llm": _llm,
+    "memory": _memory_service,
+    "duckling": _duckling,
+}
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, name: str, behaviour: Behaviour):
+        self.name = name
+        self.behaviour = behaviour
+        self.route = ROUTES[name]
+        super().__init__(("127.0.0.1", 0), StubHandler)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: StubServer
+
+    def _handle(self) -> None:
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            body = json.loads(raw) if raw else None
+        except ValueError:
+            body = None
+        if self.server.behaviour.delay():
+            status, payload = 500, {"error": "injected failure"}
+        else:
+            status, payload = self.server.route(self.command, self.path, body)
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_DELETE = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+class Stubs:
+    """All four stubs, each serving from its own thread."""
+
+    def __init__(self, behaviours: dict[str, Behaviour]):
+        self.servers = {name: StubServer(name, behaviours[name]) for name in STUBS}
+        for server in self.servers.values():
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def env(self) -> dict[str, str]:
+        """Env vars that point the app at the stubs."""
+        return {
+            "WHATSAPP_SEND_URL": self.servers["bridge"].url + "/send",
+            "OLLAMA_HOST": self.servers["llm"].url,
+            "MCP_BASE_URL": self.servers["memory"].url,
+            "DUCKLING_URL": self.servers["duckling"].url + "/parse",
+        }
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            name: {"calls": s.behaviour.calls, "errors": s.behaviour.errors}
+            for name, s in self.servers.items()
+        }
+
+    def close(self) -> None:
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+
+def parse_specs(specs: list[str] | None, what: str) -> dict[str, float]:
+    """``["llm=0.8", "bridge=0.05"]`` -> ``{"llm": 0.8, "bridge": 0.05}``."""
+    values = {}
+    for spec in specs or ():
+        name, _, value = spec.partition("=")
+        if name not in STUBS or not value:
+            raise SystemExit(f"❌ --{what} {spec!r}: expected one of {STUBS}=NUMBER")
+        values[name] = float(value)
+    return values
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--latency",
+        action="append",
+        metavar="STUB=SECONDS",
+        help=f"base latency per stub (defaults {DEFAULT_LATENCY})",
+    )
+    parser.add_argument(
+        "--jitter",
+        action="append",
+        metavar="STUB=SECONDS",
+        help="extra uniform random latency per stub (default: half the latency)",
+    )
+    parser.add_argument(
+        "--errors",
+        action="append",
+        metavar="STUB=RATE",
+        help="fraction of calls answered with a 500 (default 0)",
+    )
+
+
+def behaviours_from_args(args: argparse.Namespace) -> dict[str, Behaviour]:
+    latency = {**DEFAULT_LATENCY, **parse_specs(args.latency, "latency")}
+    jitter = parse_specs(args.jitter, "jitter")
+    errors = parse_specs(args.errors, "errors")
+    return {
+        name: Behaviour(
+            latency=latency[name],
+            jitter=jitter.get(name, latency[name] / 2),
+            error_rate=errors.get(name, 0.0),
+        )
+        for name in STUBS
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_stub_arguments(parser)
+    stubs = Stubs(behaviours_from_args(parser.parse_args()))
+    for key, value in stubs.env().items():
+        print(f"export {key}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stubs.close()
+
+
+if __name__ == "__main__":
+    main()
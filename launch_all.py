@@ -30,7 +30,10 @@ mcp_server = launch(
 )
 
 # ---------------------- Launch Duckling Server (Docker) ----------------------
-duckling = launch(["docker", "run", "--rm", "-p", "8000:8000", "rasa/duckling"])
+# only needed when it is enabled as a slot-parsing fallback (see README)
+duckling = None
+if "duckling" in os.getenv("SLOT_FALLBACKS", "").lower():
+    duckling = launch(["docker", "run", "--rm", "-p", "8000:8000", "rasa/duckling"])
 
 # ---------------------- Launch FastAPI Agent Receiver ----------------------
 # give everything a moment to start
@@ -61,4 +64,5 @@ try:
 except KeyboardInterrupt:
     print("\n👋 Shutting down services…")
     for proc in (whatsapp_api, mcp_server, duckling, receiver):
-        proc.terminate()
+        if proc is not None:
+            proc.terminate()
@@ -1,13 +1,33 @@
 # src/agent/agent.py
+import asyncio
 import json
+import os
 from datetime import datetime
-from ollama import Client
+from ollama import AsyncClient, Client
 from src.tools.whatsapp_snd_tool import SendWhatsappMsg
 from src.tools.booking_tool import BookingTool
 from src.tools.time_tool import GetTime
 from src.tools.check_booking_tool import CheckBookingTool
 from src.tools.check_availability_tool import CheckAvailabilityTool
-from src.memory.memory_client import get_user_memory, save_user_memory
+from src.memory.memory_client import (
+    aget_user_memory,
+    get_user_memory,
+    save_user_memory,
+)
+from src.utils.metrics import TOOL_SECONDS, timed
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_MODEL = "qwen2.5"
+
+# one async Ollama client (and its connection pool) per event loop
+_async_llm: dict[asyncio.AbstractEventLoop, AsyncClient] = {}
+
+
+def _async_llm_client() -> AsyncClient:
+    loop = asyncio.get_running_loop()
+    if loop not in _async_llm:
+        _async_llm[loop] = AsyncClient(host=OLLAMA_HOST)
+    return _async_llm[loop]
 
 
 class Agent:
@@ -26,10 +46,43 @@ class Agent:
             CheckAvailabilityTool,
         ]
 
+    @timed("think_llm")
     def think_llm(self, user_message: str):
         """Ask the local Ollama LLM what tool + args to run, including memory context."""
         # Load user memory
         user_mem = get_user_memory(self.user_id) or {}
+        try:
+            client = Client(host=OLLAMA_HOST)
+            with timed("llm"):
+                response = client.chat(
+                    model=OLLAMA_MODEL, messages=self._messages(user_mem, user_message)
+                )
+            response_text = response["message"]["content"]
+            print("\n🛠️ RAW LLM RESPONSE:\n", response_text)
+        except Exception as exc:
+            print(f"⚠️ Agent: LLM call failed – falling back to heuristics ({exc}).")
+            return self._fallback_tool(user_message, str(exc))
+        return self._parse_llm(response_text, user_message)
+
+    @timed("think_llm")
+    async def think_llm_async(self, user_message: str):
+        """:meth:`think_llm` on async I/O, for the webhook's event loop."""
+        user_mem = await aget_user_memory(self.user_id) or {}
+        try:
+            with timed("llm"):
+                response = await _async_llm_client().chat(
+                    model=OLLAMA_MODEL, messages=self._messages(user_mem, user_message)
+                )
+            response_text = response["message"]["content"]
+            print("\n🛠️ RAW LLM RESPONSE:\n", response_text)
+        except Exception as exc:
+            print(f"⚠️ Agent: LLM call failed – falling back to heuristics ({exc}).")
+            return self._fallback_tool(user_message, str(exc))
+        return self._parse_llm(response_text, user_message)
+
+    @staticmethod
+    def _messages(user_mem: dict, user_message: str) -> list[dict]:
+        """Chat messages for the LLM: system prompt with memory, then the user."""
         # Build memory block for prompt
         mem_lines = []
         # Identity & contact
@@ -81,21 +134,13 @@ class Agent:
             )
         )
 
-        try:
-            client = Client(host="http://localhost:11434")
-            response = client.chat(
-                model="qwen2.5",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"User message: {user_message}"},
-                ],
-            )
-            response_text = response["message"]["content"]
-            print("\n🛠️ RAW LLM RESPONSE:\n", response_text)
-        except Exception as exc:
-            print(f"⚠️ Agent: LLM call failed – falling back to heuristics ({exc}).")
-            return self._fallback_tool(user_message, str(exc))
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"User message: {user_message}"},
+        ]
 
+    def _parse_llm(self, response_text: str, user_message: str):
+        """Turn the LLM's JSON reply into ``(tool, args)``."""
         try:
             parsed = json.loads(response_text)
             tool = parsed.get("tool")
@@ -108,6 +153,7 @@ class Agent:
             print(f"⚠️ Agent: Failed to parse LLM output ({exc}). Using heuristic routing.")
             return self._fallback_tool(user_message, str(exc))
 
+    @timed("act")
     def act(self, tool_name: str | None, tool_args: dict | None, user_message: str):
         """Invoke the chosen tool, relay results, and save updated memory."""
         # Load and prepare memory update
@@ -138,9 +184,12 @@ class Agent:
         for tool in self.tools:
             if tool.name.lower() == normalized:
                 print(f"🤖 Agent: Invoking tool {tool.name} with args {tool_args}")
-                result = tool.invoke(tool_args)
-                # Handle direct string replies
-                if isinstance(result, str) and result.strip():
+                with timed(tool.name, TOOL_SECONDS, span=f"tool:{tool.name}"):
+                    result = tool.invoke(tool_args)
+                booking_tool = tool.name in {"BookingTool", "CheckBookingTool"}
+                # Handle direct string replies (booking statuses are sent
+                # normalized below instead of as raw "booked::…" strings)
+                if isinstance(result, str) and result.strip() and not booking_tool:
                     SendWhatsappMsg.invoke(
                         {
                             "number": tool_args["number"],
@@ -149,9 +198,7 @@ class Agent:
                     )
                     result_text = result.strip()
                 # Booking tool normalization and memory update
-                if tool.name in {"BookingTool", "CheckBookingTool"} and isinstance(
-                    result, str
-                ):
+                if booking_tool and isinstance(result, str):
                     msg = self._normalize_booking_response(result)
                     SendWhatsappMsg.invoke(
                         {
@@ -0,0 +1,253 @@
+"""Business calendar: opening hours, breaks, holidays, buffers and services.
+
+The calendar is described in a JSON file (``BUSINESS_CALENDAR``, default
+``data/calendar.json``; see ``calendar.example.json`` next to this module)::
+
+    {
+      "slot_minutes": 15,
+      "days_ahead": 7,
+      "buffer_minutes": 5,
+      "default_duration": 15,
+      "services": {"consultation": 30, "colour": 90},
+      "hours": {"monday": [["09:00", "17:00"]], "saturday": [["10:00", "14:00"]]},
+      "breaks": [["12:00", "12:30"]],
+      "holidays": ["2026-12-25"],
+      "closures": [["2026-10-20T13:00", "2026-10-20T15:00"]]
+    }
+
+Weekdays missing from ``hours`` are closed; without a file every day is open
+09:00–17:00, as before. Each calendar day is compiled once into sorted open
+intervals (minutes after midnight, business timezone) plus a bitmap of the
+slot grid, so "is this appointment inside opening hours?" is one bisect and
+slot listings are bit operations. :func:`get_calendar` recompiles only when
+the file changes.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Any
+
+from src.utils.time_utils import BUSINESS_TZ, as_local
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+CALENDAR_FILE = Path(
+    os.getenv("BUSINESS_CALENDAR", BASE_DIR / "data" / "calendar.json")
+)
+
+WEEKDAYS = [
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+]
+
+DEFAULT_CONFIG: dict[str, Any] = {
+    "slot_minutes": 15,
+    "days_ahead": 7,
+    "buffer_minutes": 0,
+    "default_duration": 15,
+    "services": {},
+    "hours": {day: [["09:00", "17:00"]] for day in WEEKDAYS},
+    "breaks": [],
+    "holidays": [],
+    "closures": [],
+}
+
+Interval = tuple[int, int]
+
+
+def _minutes(text: str) -> int:
+    hours, minutes = text.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _subtract(intervals: list[Interval], cut: Interval) -> list[Interval]:
+    out = []
+    for start, end in intervals:
+        if cut[1] <= start or cut[0] >= end:
+            out.append((start, end))
+            continue
+        if start < cut[0]:
+            out.append((start, cut[0]))
+        if cut[1] < end:
+            out.append((cut[1], end))
+    return out
+
+
+class CompiledDay:
+    """Open intervals of one day and the grid slots that lie inside them."""
+
+    __slots__ = ("starts", "ends", "open_mask")
+
+    def __init__(self, intervals: list[Interval], slot_minutes: int):
+        merged: list[Interval] = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+            elif end > start:
+                merged.append((start, end))
+        intervals = merged
+        self.starts = [s for s, _ in intervals]
+        self.ends = [e for _, e in intervals]
+        mask = 0
+        for start, end in intervals:
+            first = -(-start // slot_minutes)
+            last = end // slot_minutes  # exclusive: slot must end by `end`
+            if last > first:
+                mask |= ((1 << (last - first)) - 1) << first
+        self.open_mask = mask
+
+    def is_open(self, minute: int, length: int) -> bool:
+        """True if ``[minute, minute + length)`` lies in one open interval."""
+        i = bisect_right(self.starts, minute) - 1
+        return i >= 0 and minute + length <= self.ends[i]
+
+
+class BusinessCalendar:
+    """Opening rules, compiled lazily one day at a time."""
+
+    def __init__(self, config: dict[str, Any]):
+        cfg = {**DEFAULT_CONFIG, **config}
+        self.slot_minutes = int(cfg["slot_minutes"])
+        self.days_ahead = int(cfg["days_ahead"])
+        self.buffer_minutes = int(cfg["buffer_minutes"])
+        self.default_duration = int(cfg["default_duration"])
+        self.services = {k.lower(): int(v) for k, v in cfg["services"].items()}
+        self.slots_per_day = 24 * 60 // self.slot_minutes
+        self._hours = [
+            [(_minutes(a), _minutes(b)) for a, b in cfg["hours"].get(day, [])]
+            for day in WEEKDAYS
+        ]
+        self._breaks = [(_minutes(a), _minutes(b)) for a, b in cfg["breaks"]]
+        self._holidays = {date.fromisoformat(d) for d in cfg["holidays"]}
+        self._closures = [
+            (as_local(datetime.fromisoformat(a)), as_local(datetime.fromisoformat(b)))
+            for a, b in cfg["closures"]
+        ]
+        self._days: dict[date, CompiledDay] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: Path | str) -> "BusinessCalendar":
+        path = Path(path)
+        config = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+        return cls(config)
+
+    # ------------------------------------------------------------------ compile
+
+    def day(self, day: date) -> CompiledDay:
+        """The compiled day, built on first use and then reused."""
+        compiled = self._days.get(day)
+        if compiled is None:
+            with self._lock:
+                compiled = self._days.get(day)
+                if compiled is None:
+                    compiled = self._days[day] = self._compile(day)
+        return compiled
+
+    def _compile(self, day: date) -> CompiledDay:
+        intervals = [] if day in self._holidays else list(self._hours[day.weekday()])
+        for cut in self._breaks:
+            intervals = _subtract(intervals, cut)
+        midnight = datetime.combine(day, time(), BUSINESS_TZ)
+        for start, end in self._closures:
+            if start.date() <= day <= end.date():
+                cut_start = max(int((start - midnight).total_seconds() // 60), 0)
+                cut_end = min(int((end - midnight).total_seconds() // 60), 24 * 60)
+                intervals = _subtract(intervals, (cut_start, cut_end))
+        return CompiledDay(intervals, self.slot_minutes)
+
+    # ------------------------------------------------------------------ queries
+
+    def duration(self, service: str | None = None) -> int:
+        """Appointment length in minutes for *service* (or the default)."""
+        if service:
+            return self.services.get(service.lower(), self.default_duration)
+        return self.default_duration
+
+    def span(self, service: str | None = None) -> int:
+        """Grid slots an appointment blocks, including the trailing buffer."""
+        minutes = self.duration(service) + self.buffer_minutes
+        return max(1, -(-minutes // self.slot_minutes))
+
+    def is_open(self, dt: datetime, service: str | None = None) -> bool:
+        """True if an appointment starting at *dt* fits in opening hours."""
+        dt = as_local(dt)
+        minute = dt.hour * 60 + dt.minute
+        return self.day(dt.date()).is_open(minute, self.duration(service))
+
+    def open_mask(self, day: date, service: str | None = None) -> int:
+        """Grid slots of *day* where a *service* appointment can start."""
+        mask = self.day(day).open_mask
+        need = -(-self.duration(service) // self.slot_minutes)
+        fit = mask
+        for shift in range(1, need):
+            fit &= mask >> shift
+        return fit
+
+    def slots(
+        self,
+        after: datetime,
+        *,
+        days: int | None = None,
+        service: str | None = None,
+    ) -> list[datetime]:
+        """Every start time a *service* appointment could take, in order."""
+        after = as_local(after)
+        out = []
+        for n in range(self.days_ahead if days is None else days):
+            day = after.date() + timedelta(days=n)
+            midnight = datetime.combine(day, time(), BUSINESS_TZ)
+            mask = self.open_mask(day, service)
+            while mask:
+                low = mask & -mask
+                dt = midnight + timedelta(
+                    minutes=(low.bit_length() - 1) * self.slot_minutes
+                )
+                if dt >= after:
+                    out.append(dt)
+                mask ^= low
+        return out
+
+
+_calendar: BusinessCalendar | None = None
+_calendar_mtime: float | None = None
+_calendar_lock = threading.Lock()
+
+
+def _mtime(path: Path) -> float | None:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+def get_calendar() -> BusinessCalendar:
+    """Return the compiled calendar, recompiling if the file changed."""
+    global _calendar, _calendar_mtime
+    mtime = _mtime(CALENDAR_FILE)
+    if _calendar is None or mtime != _calendar_mtime:
+        with _calendar_lock:
+            if _calendar is None or mtime != _calendar_mtime:
+                _calendar = BusinessCalendar.from_file(CALENDAR_FILE)
+                _calendar_mtime = mtime
+                if mtime is not None:
+                    print(f"📅 Business calendar compiled from {CALENDAR_FILE}")
+    return _calendar
+
+
+def set_calendar(calendar: BusinessCalendar | None) -> None:
+    """Pin a calendar (tests); ``None`` goes back to reading the file."""
+    global _calendar, _calendar_mtime
+    with _calendar_lock:
+        _calendar = calendar
+        _calendar_mtime = _mtime(CALENDAR_FILE) if calendar else None
@@ -1,118 +1,331 @@
 import os
-import json
-import random
 import re
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime
 from src.utils.whatsapp import send_whatsapp_message
-import tempfile, shutil
-from utils.slot_parser import parse_slot
-from typing import Any
+from src.storage import BOOKINGS_FILE, AvailabilityIndex, SlotIndex, get_store
+from src.storage.base import (
+    DEFAULT_RESOURCE,
+    SlotConflict,
+    VersionConflict,
+    claim_of,
+    resource_of,
+    slot_at_of,
+    slot_key_of,
+    version_of,
+)
+from src.storage.migrate import canonicalize
+from src.handlers.booking_session import CAS_RETRIES, current_session
+from src.config.calendar import WEEKDAYS, BusinessCalendar, get_calendar
+from src.utils.time_utils import BUSINESS_TZ, format_slot, now_local, slot_key
+from src.utils import metrics
+from src.utils.slot_parser import parse_slot_dt
+from typing import Any, Callable
+
+
+# Configuration (opening hours, slot length and horizon: src/config/calendar.py)
+# staff members / rooms that can each take one booking per slot
+RESOURCES = [
+    r.strip()
+    for r in os.getenv("BOOKING_RESOURCES", DEFAULT_RESOURCE).split(",")
+    if r.strip()
+] or [DEFAULT_RESOURCE]
+
+
+class PastSlot(ValueError):
+    """The requested slot has already started."""
+
+    def __init__(self, message: str = "Slot is in the past"):
+        super().__init__(message)
 
-from pathlib import Path
 
-BASE_DIR = Path(__file__).resolve().parents[2]  # adjust depth if needed
-BOOKINGS_FILE = BASE_DIR / "data" / "bookings.json"
-BOOKINGS_FILE.parent.mkdir(parents=True, exist_ok=True)
+def load_bookings() -> dict[str, Any]:
+    """Return every booking keyed by user (prefer the per-user helpers)."""
+    return get_store().load_all()
+
+
+def save_all_bookings(bookings: dict[str, Any]) -> list[str]:
+    """Persist the records of *bookings* (a :func:`load_bookings` snapshot).
+
+    Each changed record is compare-and-swapped against the version it was
+    loaded at, so rows another request wrote in the meantime are left alone
+    rather than overwritten with stale data; those users are returned (and
+    counted in ``whatsapp_bookings_stale_writes_total``). Users missing from
+    *bookings* are not deleted; use :func:`cancel_booking`.
+    """
+    store = get_store()
+    current = store.load_all()
+    stale: list[str] = []
+    for user, record in bookings.items():
+        if current.get(user) == record:
+            continue
+        try:
+            store.cas(user, version_of(record), record)
+        except VersionConflict:
+            stale.append(user)
+    metrics.STALE_WRITES.inc(amount=len(stale))
+    return stale
 
 
-# Configuration
-WORKING_HOURS_START = 9  # 9AM
-WORKING_HOURS_END = 17  # 5PM
-SLOT_INTERVAL_MINUTES = 15
-DAYS_AHEAD = 7
+def mutate_booking(
+    user_number: str,
+    change: Callable[[dict[str, Any]], dict[str, Any] | None],
+    *,
+    retries: int = CAS_RETRIES,
+) -> dict[str, Any] | None:
+    """Apply *change* to the user's record with optimistic concurrency.
+
+    *change* receives a copy of the current record (``{}`` if none) and
+    returns the new record, or ``None`` to delete it. If another request
+    wrote the record in between, the read-change-write cycle is retried.
+    :class:`SlotConflict` from the store propagates unchanged.
+
+    Inside a :func:`~src.handlers.booking_session.booking_session` for this
+    user the change is only staged; the session writes it on commit.
+    """
+    session = current_session(user_number)
+    if session is not None:
+        return session.apply(change)
+    store = get_store()
+    for _ in range(retries):
+        current = store.get(user_number)
+        updated = change(dict(current or {}))
+        try:
+            return store.cas(user_number, version_of(current), updated)
+        except VersionConflict:
+            continue
+    raise VersionConflict(user_number)
 
 
-def load_bookings():
-    if not os.path.exists(BOOKINGS_FILE):
-        os.makedirs(os.path.dirname(BOOKINGS_FILE), exist_ok=True)
-        with open(BOOKINGS_FILE, "w") as f:
-            json.dump({}, f)
-    with open(BOOKINGS_FILE, "r") as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError:
-            data = {}
-            save_all_bookings(data)
-    if isinstance(data, list):
-        data = {}
-        save_all_bookings(data)
-    return data
+_slot_index: SlotIndex | None = None
+_slot_index_lock = threading.Lock()
 
 
-def save_all_bookings(bookings: dict):
-    tmp_fd, tmp_path = tempfile.mkstemp(dir=BOOKINGS_FILE.parent, suffix=".tmp")
-    with os.fdopen(tmp_fd, "w", encoding="utf-8") as f:
-        json.dump(bookings, f, indent=4)
-        f.flush()
-        os.fsync(f.fileno())  # guarantee bytes hit disk
-    shutil.move(tmp_path, BOOKINGS_FILE)
+def _resolve_slot(slot: str | datetime) -> datetime | None:
+    return slot if isinstance(slot, datetime) else parse_slot_dt(slot)
 
 
-BASE_DIR = Path(__file__).resolve().parents[2]
-BOOKINGS_FILE = BASE_DIR / "data" / "bookings.json"
+def _sync_indexes(store) -> None:
+    """Apply other worker processes' writes to the in-memory indexes.
 
+    The store replays them to its listeners (the indexes) one user at a
+    time; only if it can no longer do so are the indexes rebuilt.
+    """
+    if not store.sync_external():
+        for index in (_slot_index, _availability):
+            if index is not None and index.store is store:
+                index.rebuild()
+
+
+def get_slot_index() -> SlotIndex:
+    """Return the occupancy index for the active store, building it once."""
+    global _slot_index
+    store = get_store()
+    _sync_indexes(store)
+    if _slot_index is None or _slot_index.store is not store:
+        with _slot_index_lock:
+            if _slot_index is None or _slot_index.store is not store:
+                if _slot_index is not None:
+                    _slot_index.close()
+                _slot_index = SlotIndex(store, claim_of)
+    return _slot_index
+
+
+_availability: AvailabilityIndex | None = None
+_availability_calendar: BusinessCalendar | None = None
+
+
+def _span_of(record: dict[str, Any]) -> int:
+    return get_calendar().span(record.get("service"))
 
-def load_bookings() -> dict[str, Any]:
-    BOOKINGS_FILE.parent.mkdir(exist_ok=True, parents=True)
-    if not BOOKINGS_FILE.exists():
-        BOOKINGS_FILE.write_text("{}")
-    try:
-        return json.loads(BOOKINGS_FILE.read_text())
-    except json.JSONDecodeError:
-        return {}
 
+def _blocked_minutes(service: str | None = None) -> int:
+    """Minutes a *service* booking keeps its resource busy (length + buffer),
+    stored on the record so the store can reject overlaps atomically."""
+    calendar = get_calendar()
+    return calendar.span(service) * calendar.slot_minutes
 
-def save_all_bookings(bookings: dict[str, Any]) -> None:
-    fd, tmp = tempfile.mkstemp(dir=BOOKINGS_FILE.parent, suffix=".tmp")
-    with os.fdopen(fd, "w") as f:
-        json.dump(bookings, f, indent=2)
-    shutil.move(tmp, BOOKINGS_FILE)
+
+def get_availability() -> AvailabilityIndex:
+    """Return the per-day free-slot bitmaps for the active store.
+
+    Rebuilt when the store is swapped or the business calendar recompiles
+    (the slot grid and appointment lengths may have changed).
+    """
+    global _availability, _availability_calendar
+    store = get_store()
+    calendar = get_calendar()
+    _sync_indexes(store)
+
+    def stale() -> bool:
+        return (
+            _availability is None
+            or _availability.store is not store
+            or _availability_calendar is not calendar
+        )
+
+    if stale():
+        with _slot_index_lock:
+            if not stale():
+                return _availability
+            if _availability is not None:
+                _availability.close()
+            _availability = AvailabilityIndex(
+                store,
+                slot_at_of,
+                tz=BUSINESS_TZ,
+                start_hour=0,
+                end_hour=24,
+                interval=calendar.slot_minutes,
+                resources=RESOURCES,
+                span_of=_span_of,
+            )
+            _availability_calendar = calendar
+    return _availability
+
+
+def free_slots(
+    after: datetime | None = None,
+    limit: int | None = None,
+    weekdays: set[int] | None = None,
+    service: str | None = None,
+) -> list[datetime]:
+    """Free, open slots for *service* from *after* (default: now) over the
+    calendar's booking horizon."""
+    calendar = get_calendar()
+    return get_availability().free_slots(
+        after or now_local(),
+        days=calendar.days_ahead,
+        limit=limit,
+        weekdays=weekdays,
+        span=calendar.span(service),
+        open_mask=lambda day: calendar.open_mask(day, service),
+    )
+
+
+def next_free_slot(after: datetime, service: str | None = None) -> datetime | None:
+    """First free, open slot for *service* strictly after *after*."""
+    calendar = get_calendar()
+    return get_availability().next_free(
+        after,
+        days=calendar.days_ahead,
+        span=calendar.span(service),
+        open_mask=lambda day: calendar.open_mask(day, service),
+    )
+
+
+def free_resources(
+    slot: str | datetime,
+    exclude_user: str | None = None,
+    service: str | None = None,
+) -> list[str]:
+    """Resources that can take a *service* appointment at this slot.
+
+    Empty when the business is closed then; *exclude_user*'s own booking
+    does not count as occupying anything.
+    """
+    dt = _resolve_slot(slot)
+    if dt is None:
+        return []
+    calendar = get_calendar()
+    if not calendar.is_open(dt, service):
+        return []
+    fits = get_availability().free_resources(dt, calendar.span(service), exclude_user)
+    key = slot_key(dt)
+    index = get_slot_index()
+    return [r for r in fits if not index.is_taken((key, r), exclude_user)]
+
+
+def remaining_capacity(slot: str | datetime, service: str | None = None) -> int:
+    """How many more *service* bookings this slot can take."""
+    return len(free_resources(slot, service=service))
 
 
 def slot_taken(
-    slot: str,
+    slot: str | datetime,
     bookings: dict[str, Any] | None = None,
     exclude_user: str | None = None,
 ) -> bool:
-    """Return True if this slot is already booked by someone else."""
+    """Return True if this slot cannot be booked: the business is closed or
+    every resource is booked by someone else.
+
+    Uses the occupancy index; pass *bookings* only to check an explicit
+    snapshot instead.
+    """
+    dt = _resolve_slot(slot)
+    if dt is None:
+        return False
     if bookings is None:
-        bookings = load_bookings()
-    canon = parse_slot(slot) or slot
-    for user, data in bookings.items():
-        if user == exclude_user:
-            continue
-        booked = data.get("time")
-        if not booked:
-            continue
-        if (parse_slot(booked) or booked) == canon:
-            return True
-    return False
+        return not free_resources(dt, exclude_user)
+    if not get_calendar().is_open(dt):
+        return True
+    key = slot_key(dt)
+    held = {
+        resource_of(data)
+        for user, data in bookings.items()
+        if user != exclude_user and slot_key_of(data) == key
+    }
+    return all(r in held for r in RESOURCES)
 
 
 def save_individual_booking(
     user_number: str,
-    slot: str,
+    slot: str | datetime,
     email: str | None = None,
+    resource: str | None = None,
+    service: str | None = None,
 ) -> None:
-    """Atomically load, check, save a new booking."""
-    bookings = load_bookings()
-    # collision check
-    if slot_taken(slot, bookings, exclude_user=user_number):
-        raise ValueError("Slot already booked")
-
-    # write the booking
-    bookings[user_number] = {
-        "time": slot,
-        "email": email or bookings.get(user_number, {}).get("email"),
-        "awaiting_selection": False,
-        "reminder_sent_sms": False,
-        "reminder_sent_email": False,
-    }
-    save_all_bookings(bookings)
+    """Book *slot* for the user, writing only this user's booking row.
+
+    The booking takes *resource* if given, else the user's current resource
+    at that slot or the first free one, and blocks the calendar length of
+    *service* plus the buffer. Raises :class:`PastSlot` for a time that
+    has already started and :class:`SlotConflict` (both ``ValueError``) if
+    the business is closed or no resource is free; the
+    store checks the slot claim atomically with the write (on commit,
+    inside a booking session).
+    """
+    dt = _resolve_slot(slot)
+    if dt is None:
+        raise ValueError(f"Unrecognised slot: {slot!r}")
+    if dt < now_local():
+        raise PastSlot()
+    minutes = _blocked_minutes(service)
+
+    def book(existing: dict[str, Any]) -> dict[str, Any]:
+        # cheap pre-check against the index before touching the store; runs
+        # again when a session replays the booking after a slot conflict
+        free = free_resources(dt, exclude_user=user_number, service=service)
+        if resource is not None:
+            free = [resource] if resource in free else []
+        if not free:
+            raise SlotConflict()
+        keep = resource_of(existing)
+        same_slot = existing.get("slot_at") == dt.isoformat()
+        return {
+            "time": format_slot(dt),
+            "slot_at": dt.isoformat(),
+            "resource": keep if same_slot and keep in free else free[0],
+            "minutes": minutes,
+            "service": service,
+            "email": email or existing.get("email"),
+            "awaiting_selection": False,
+            "reminder_sent_sms": False,
+            "reminder_sent_email": False,
+        }
+
+    for _ in RESOURCES:
+        try:
+            mutate_booking(user_number, book)
+            return
+        except SlotConflict:
+            continue  # another request just took that resource; try the next
+    raise SlotConflict()
 
 
 def initialize_bookings_file():
-    load_bookings()
+    """Open the store and give any legacy label-only bookings a ``slot_at``."""
+    canonicalize(get_store(), resolve=parse_slot_dt, resource=RESOURCES[0])
 
 
 def detect_booking_intent(message: str) -> bool:
@@ -136,80 +349,53 @@ def detect_cancel_intent(message: str) -> bool:
 
 
 def generate_upcoming_slots():
-    slots = []
-    now = datetime.now()
-    for i in range(DAYS_AHEAD):
-        day = now + timedelta(days=i)
-        for hour in range(WORKING_HOURS_START, WORKING_HOURS_END):
-            slot_time = day.replace(hour=hour, minute=0, second=0, microsecond=0)
-            if slot_time > now:
-                slots.append(slot_time.strftime("%A %m/%d %I:%M %p").lstrip("0"))
-    return slots
+    """Every open slot over the booking horizon, e.g. ``'Monday 10/19 09:00 AM'``."""
+    return [
+        dt.strftime("%A %m/%d %I:%M %p").lstrip("0")
+        for dt in get_calendar().slots(now_local())
+    ]
 
 
 def get_user_booking(customer_id: str) -> str | None:
-    bookings = load_bookings()
-    booking = bookings.get(customer_id)
+    session = current_session(customer_id)
+    booking = session.record if session else get_store().get(customer_id)
     if booking and "time" in booking:
         return booking["time"]
     return None
 
 
-def _quarter_hour_range(start_h, end_h):
-    for h in range(start_h, end_h):
-        for m in (0, 15, 30, 45):
-            yield h, m
+def get_booking_options(
+    desired_day: str = "",
+    raw: bool = False,
+    limit: int = 5,
+    service: str | None = None,
+):
+    """Return the next free slots as a list or a pretty menu message.
 
+    Slots come from the business calendar and the availability bitmaps,
+    earliest first, so only open, genuinely free times are offered and a
+    menu number maps to the same slot until it is booked.
+    """
+    weekdays = None
+    if desired_day:
+        weekdays = {
+            i for i, day in enumerate(WEEKDAYS) if desired_day.lower() in day
+        }
 
-import random
-
-
-# helper used earlier
-def _quarter_hour_range(start_h, end_h):
-    for h in range(start_h, end_h):
-        for m in (0, 15, 30, 45):
-            yield h, m
-
-
-def get_booking_options(desired_day: str = "", raw: bool = False, limit: int = 5):
-    """Return a list of slots or a pretty menu message."""
-    weekdays = [
-        "monday",
-        "tuesday",
-        "wednesday",
-        "thursday",
-        "friday",
-        "saturday",
-        "sunday",
-    ]
-
-    # Build every 15-minute slot in working hours
-    all_slots = [
-        (day, f"{hour%12 or 12}:{minute:02d} {'AM' if hour < 12 else 'PM'}")
-        for day in weekdays
-        for hour, minute in _quarter_hour_range(WORKING_HOURS_START, WORKING_HOURS_END)
+    slots = [
+        format_slot(dt)
+        for dt in free_slots(limit=limit, weekdays=weekdays, service=service)
     ]
 
-    # Filter by requested day (if any)
-    if desired_day:
-        filtered = [
-            f"{d.title()} {t}" for d, t in all_slots if desired_day.lower() in d.lower()
-        ]
-    else:
-        filtered = [f"{d.title()} {t}" for d, t in all_slots]
-
     # No matches → return safe empty value
-    if not filtered:
+    if not slots:
         return [] if raw else "⚠️ No available slots for the day you requested."
 
-    random.shuffle(filtered)
-    limited = filtered[:limit]
-
     if raw:
-        return limited
+        return slots
 
     message = "🔎 Available times:\n" + "\n".join(
-        f"{idx+1}. {slot}" for idx, slot in enumerate(limited)
+        f"{idx+1}. {slot}" for idx, slot in enumerate(slots)
     )
     return message
 
@@ -240,13 +426,26 @@ def handle_booking_response(
         return "⚠️ Invalid selection. Please reply with a valid number from the list."
 
     chosen_slot = slots[selection - 1]
+    chosen_dt = _resolve_slot(chosen_slot)
+    if chosen_dt is None:
+        return "⚠️ Invalid selection. Please reply with a valid number from the list."
 
-    bookings = load_bookings()
-    bookings[user_number] = {
-        "time": chosen_slot,
-        "reminder_time": None,
-    }
-    save_all_bookings(bookings)
+    free = free_resources(chosen_dt, exclude_user=user_number)
+    try:
+        if not free:
+            raise SlotConflict()
+        mutate_booking(
+            user_number,
+            lambda _: {
+                "time": format_slot(chosen_dt),
+                "slot_at": chosen_dt.isoformat(),
+                "resource": free[0],
+                "minutes": _blocked_minutes(),
+                "reminder_time": None,
+            },
+        )
+    except SlotConflict:
+        return "⚠️ That slot was just taken, please pick another."
 
     if user_number in shown_slots:
         del shown_slots[user_number]
@@ -254,13 +453,15 @@ def handle_booking_response(
     return f"✅ Awesome! You're booked for {chosen_slot}. We'll remind you 24 hours before!"
 
 
-def cancel_booking(customer_id: str):
-    bookings = load_bookings()
-    if customer_id in bookings:
-        del bookings[customer_id]
-        save_all_bookings(bookings)
-        return True
-    return False
+def cancel_booking(customer_id: str) -> bool:
+    existed = False
+
+    def drop(record: dict[str, Any]) -> None:
+        nonlocal existed
+        existed = bool(record)
+
+    mutate_booking(customer_id, drop)
+    return existed
 
 
 def count_current_booking_options() -> int:
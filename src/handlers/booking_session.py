@@ -0,0 +1,156 @@
+"""handlers/booking_session.py
+Request-scoped unit of work for one user's booking.
+
+A :class:`BookingSession` reads the user's record once, lets handlers stage
+changes against that copy and writes the result back with a single
+compare-and-swap when the request finishes. While a session is active (see
+:func:`booking_session`), the per-user helpers in ``booking_handler`` join it
+instead of going to the store, so a reschedule (cancel + book) becomes one
+atomic write.
+
+If another request wrote the record in the meantime, the staged changes are
+replayed on the fresh copy and the swap retried, so nothing is lost. A slot
+conflict is replayed the same way, so a booking that picks its resource when
+it runs moves to one that is still free.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+from src.storage import BookingStore, get_store
+from src.storage.base import Record, SlotConflict, VersionConflict, version_of
+from src.utils.metrics import timed
+
+Change = Callable[[Record], "Record | None"]
+
+CAS_RETRIES = 20
+
+_current: ContextVar["BookingSession | None"] = ContextVar(
+    "booking_session", default=None
+)
+
+
+class BookingSession:
+    """Staged changes to *user*'s booking, committed with one write."""
+
+    def __init__(self, user: str, store: BookingStore | None = None):
+        self.user = user
+        self.store = store or get_store()
+        self.reads = 0
+        self.writes = 0
+        self._loaded = False
+        self._original: Record | None = None
+        self._record: Record | None = None
+        self._changes: list[Change] = []
+
+    # ------------------------------------------------------------------ reads
+
+    def _load(self) -> None:
+        with timed("bookings_read"):
+            self._original = self.store.get(self.user)
+        self._record = dict(self._original) if self._original is not None else None
+        self._loaded = True
+        self.reads += 1
+
+    @property
+    def record(self) -> Record | None:
+        """The staged record (``None`` if the user has no booking)."""
+        if not self._loaded:
+            self._load()
+        return dict(self._record) if self._record is not None else None
+
+    def get(self, field: str, default: Any = None) -> Any:
+        return (self.record or {}).get(field, default)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._changes) and self._record != self._original
+
+    # ------------------------------------------------------------------ writes
+
+    def apply(self, change: Change) -> Record | None:
+        """Stage *change* (``record -> record | None``) and return the result.
+
+        *change* receives a copy of the staged record (``{}`` if none) and may
+        be called again if the commit has to be replayed.
+        """
+        if not self._loaded:
+            self._load()
+        self._record = change(dict(self._record or {}))
+        self._changes.append(change)
+        return dict(self._record) if self._record is not None else None
+
+    def update(self, **fields: Any) -> Record:
+        return self.apply(lambda record: {**record, **fields})
+
+    def delete(self) -> None:
+        self.apply(lambda record: None)
+
+    def commit(self, *, retries: int = CAS_RETRIES) -> Record | None:
+        """Write the staged record; a no-op when nothing changed.
+
+        On :class:`~src.storage.base.SlotConflict` the changes are replayed
+        against the fresh record; it propagates once a replay stages the same
+        record again (or a change raises it), leaving the staged changes in
+        place so the caller can :meth:`rollback`.
+        """
+        for _ in range(retries):
+            if not self.dirty:
+                self._changes.clear()
+                return self.record
+            try:
+                with timed("bookings_write"):
+                    stored = self.store.cas(
+                        self.user, version_of(self._original), self._record
+                    )
+            except VersionConflict:
+                self._replay()
+                continue
+            except SlotConflict:
+                conflicted = self._record
+                self._replay()
+                if self._record == conflicted:
+                    raise
+                continue
+            self.writes += 1
+            self._original = stored
+            self._record = dict(stored) if stored is not None else None
+            self._changes.clear()
+            return self.record
+        raise VersionConflict(self.user)
+
+    def _replay(self) -> None:
+        changes, self._changes = self._changes, []
+        self._load()
+        for change in changes:
+            self.apply(change)
+
+    def rollback(self) -> None:
+        """Drop every staged change."""
+        self._record = dict(self._original) if self._original is not None else None
+        self._changes.clear()
+
+
+def current_session(user: str | None = None) -> BookingSession | None:
+    """Return the active session, optionally only if it belongs to *user*."""
+    session = _current.get()
+    if session is None or (user is not None and session.user != user):
+        return None
+    return session
+
+
+@contextmanager
+def booking_session(
+    user: str, store: BookingStore | None = None
+) -> Iterator[BookingSession]:
+    """Run a block as one unit of work for *user*; commit on normal exit."""
+    session = BookingSession(user, store)
+    token = _current.set(session)
+    try:
+        yield session
+        session.commit()
+    finally:
+        _current.reset(token)
@@ -0,0 +1,164 @@
+"""
+Immediate-ack ingestion for ``/incoming``.
+
+The webhook validates a message, drops it on one of ``INGEST_WORKERS``
+queues and answers 202 straight away; one worker per queue then runs the
+full pipeline. Users are hash-partitioned onto queues, so messages from
+different users are processed concurrently while each user's messages are
+handled strictly in arrival order. The handler runs in a copy of the
+submitter's context, so context variables such as the request's trace
+follow the message onto the worker.
+
+The queues are bounded (``INGEST_QUEUE_MAX`` messages in total). When a
+user's queue is full the webhook waits up to ``INGEST_ENQUEUE_TIMEOUT``
+seconds for room and then rejects the message, so the bridge backs off
+instead of the server buffering without limit.
+
+Env vars
+--------
+INGEST_WORKERS          queues / workers (default 32; 0 = process inline)
+INGEST_QUEUE_MAX        messages queued across all workers (default 10000)
+INGEST_ENQUEUE_TIMEOUT  seconds to wait for room before rejecting (default 1)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import time
+import zlib
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+# ------------------------------------------------------------------ env config
+INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", 32))
+INGEST_QUEUE_MAX: int = int(os.getenv("INGEST_QUEUE_MAX", 10_000))
+INGEST_ENQUEUE_TIMEOUT: float = float(os.getenv("INGEST_ENQUEUE_TIMEOUT", 1))
+
+Handler = Callable[[str, str], Awaitable[Any]]
+
+
+class IngestQueue:
+    """Hash-partitioned, bounded message queues with one worker each."""
+
+    def __init__(
+        self,
+        handler: Handler,
+        *,
+        workers: int = INGEST_WORKERS,
+        maxsize: int = INGEST_QUEUE_MAX,
+        enqueue_timeout: float = INGEST_ENQUEUE_TIMEOUT,
+    ):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.partition_size = max(1, -(-maxsize // self.workers))
+        self.enqueue_timeout = enqueue_timeout
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queues: list[asyncio.Queue] = []
+        self._put_locks: list[asyncio.Lock] = []
+        self._tasks: list[asyncio.Task] = []
+        self._enqueued = self._processed = self._failed = self._rejected = 0
+        self._busy = 0
+        self._waits: deque[float] = deque(maxlen=2048)
+        self._runs: deque[float] = deque(maxlen=2048)
+
+    def partition(self, user: str) -> int:
+        """Stable queue number for *user* (the same across restarts)."""
+        return zlib.crc32(user.encode("utf-8")) % self.workers
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # first use on this loop: queues and tasks are bound to it
+        self._loop = loop
+        self._queues = [asyncio.Queue(self.partition_size) for _ in range(self.workers)]
+        self._put_locks = [asyncio.Lock() for _ in range(self.workers)]
+        self._tasks = [
+            loop.create_task(self._work(queue), name=f"ingest-{n}")
+            for n, queue in enumerate(self._queues)
+        ]
+
+    # ------------------------------------------------------------------ producer
+
+    async def submit(self, user: str, message: str) -> bool:
+        """Queue a message; ``False`` if its queue stayed full (backpressure)."""
+        self._ensure_started()
+        n = self.partition(user)
+        item = (user, message, time.perf_counter(), contextvars.copy_context())
+        try:
+            await asyncio.wait_for(self._put(n, item), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            return False
+        self._enqueued += 1
+        return True
+
+    async def _put(self, n: int, item: tuple) -> None:
+        # the lock is FIFO, so a user's waiting messages keep their order
+        async with self._put_locks[n]:
+            await self._queues[n].put(item)
+
+    # ------------------------------------------------------------------ workers
+
+    async def _work(self, queue: asyncio.Queue) -> None:
+        while True:
+            user, message, queued_at, context = await queue.get()
+            started = time.perf_counter()
+            self._waits.append(started - queued_at)
+            self._busy += 1
+            try:
+                # a task created inside the submitter's context runs in a copy of it
+                await context.run(asyncio.ensure_future, self.handler(user, message))
+            except Exception as exc:
+                self._failed += 1
+                print(f"❌ Ingest worker failed on message from {user}: {exc}")
+            finally:
+                self._busy -= 1
+                self._processed += 1
+                self._runs.append(time.perf_counter() - started)
+                queue.task_done()
+
+    async def join(self) -> None:
+        """Wait until every queued message has been processed."""
+        for queue in list(self._queues):
+            await queue.join()
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Drain for up to *timeout* seconds, then cancel the workers."""
+        if self._loop is not asyncio.get_running_loop():
+            return
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Ingest queue stopped with {self.depth()} message(s) unprocessed")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._loop, self._queues, self._put_locks, self._tasks = None, [], [], []
+
+    # ------------------------------------------------------------------ metrics
+
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def stats(self) -> dict[str, float | int]:
+        depths = [queue.qsize() for queue in self._queues]
+        stats = {
+            "workers": self.workers,
+            "capacity": self.partition_size * self.workers,
+            "depth": sum(depths),
+            "depth_max_partition": max(depths, default=0),
+            "busy": self._busy,
+            "enqueued": self._enqueued,
+            "processed": self._processed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+        }
+        for name, samples in (("wait", self._waits), ("processing", self._runs)):
+            ordered = sorted(samples)
+            for label, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+                value = ordered[int(q * (len(ordered) - 1))] if ordered else 0.0
+                stats[f"{name}_ms_{label}"] = round(value * 1000, 3)
+        return stats
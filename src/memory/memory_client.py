@@ -1,23 +1,35 @@
 # File: src/memory/memory_client.py
+import os
+
+import httpx
 import requests
 
-MCP_BASE_URL = "http://localhost:9000"
+from src.utils.aio import http_client
+from src.utils import tracing
+from src.utils.metrics import timed
+
+MCP_BASE_URL = os.getenv("MCP_BASE_URL", "http://localhost:9000")
 
 
+@timed("memory")
 def get_user_memory(user_id: str) -> dict:
     try:
-        resp = requests.get(f"{MCP_BASE_URL}/memory/{user_id}")
+        resp = requests.get(
+            f"{MCP_BASE_URL}/memory/{user_id}", headers=tracing.headers()
+        )
         resp.raise_for_status()
         return resp.json()
     except requests.RequestException:
         return {}
 
 
+@timed("memory")
 def save_user_memory(user_id: str, memory: dict) -> dict:
     try:
         resp = requests.post(
             f"{MCP_BASE_URL}/memory/{user_id}",
             json={"memory": memory},
+            headers=tracing.headers(),
         )
         resp.raise_for_status()
         return resp.json()
@@ -25,10 +37,29 @@ def save_user_memory(user_id: str, memory: dict) -> dict:
         return {"error": str(e)}
 
 
+@timed("memory")
 def delete_user_memory(user_id: str) -> dict:
     try:
-        resp = requests.delete(f"{MCP_BASE_URL}/memory/{user_id}")
+        resp = requests.delete(
+            f"{MCP_BASE_URL}/memory/{user_id}", headers=tracing.headers()
+        )
         resp.raise_for_status()
         return resp.json()
     except requests.RequestException as e:
         return {"error": str(e)}
+
+
+# ------------------------------------------------------------------ async twins
+
+
+@timed("memory")
+async def aget_user_memory(user_id: str) -> dict:
+    try:
+        resp = await http_client().get(
+            f"{MCP_BASE_URL}/memory/{user_id}", headers=tracing.headers()
+        )
+        resp.raise_for_status()
+        return resp.json()
+    except httpx.HTTPError:
+        return {}
+
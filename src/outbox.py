@@ -0,0 +1,485 @@
+"""
+Durable outbound WhatsApp queue.
+
+Senders call :func:`queue_message`, which writes the message to SQLite
+(``OUTBOX_DB``, default ``data/outbox.db``) and returns at once; a
+background dispatcher – in one process only, when several workers share
+the file – delivers it to the bridge. Delivery is:
+
+* **ordered per recipient** – only the oldest undelivered message of a
+  number is ever in flight, so a retrying message holds back the ones
+  queued after it;
+* **rate limited** – a global token bucket (``OUTBOX_RATE`` msg/s, burst
+  ``OUTBOX_BURST``) and one per recipient (``OUTBOX_RECIPIENT_RATE``,
+  burst ``OUTBOX_RECIPIENT_BURST``);
+* **retried** with exponential backoff and jitter (``OUTBOX_BACKOFF_BASE``
+  doubling up to ``OUTBOX_BACKOFF_MAX`` seconds) until
+  ``OUTBOX_MAX_ATTEMPTS`` failures, after which the message is parked as
+  ``dead`` (the dead-letter store) for inspection or :meth:`Outbox.requeue`.
+
+Every message keeps its status (``pending`` / ``sent`` / ``dead``),
+attempt count, last error and the ``traceparent`` of the request that
+queued it, which is sent to the bridge with the message. Delivery is at-least-once: a crash between
+the bridge accepting a message and the status update resends it.
+
+The dispatcher deletes ``sent`` messages once they are ``OUTBOX_RETENTION``
+seconds old (default 7 days; 0 keeps them), so the table only holds recent
+history.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from src.utils import tracing
+from src.utils.metrics import timed
+from src.utils.whatsapp import post_message
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+# ------------------------------------------------------------------ env config
+OUTBOX_DB = Path(os.getenv("OUTBOX_DB", BASE_DIR / "data" / "outbox.db"))
+OUTBOX_RATE: float = float(os.getenv("OUTBOX_RATE", 20))
+OUTBOX_BURST: int = int(os.getenv("OUTBOX_BURST", 40))
+OUTBOX_RECIPIENT_RATE: float = float(os.getenv("OUTBOX_RECIPIENT_RATE", 1))
+OUTBOX_RECIPIENT_BURST: int = int(os.getenv("OUTBOX_RECIPIENT_BURST", 5))
+OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+OUTBOX_BACKOFF_BASE: float = float(os.getenv("OUTBOX_BACKOFF_BASE", 1))
+OUTBOX_BACKOFF_MAX: float = float(os.getenv("OUTBOX_BACKOFF_MAX", 300))
+OUTBOX_SENDERS: int = int(os.getenv("OUTBOX_SENDERS", 8))
+OUTBOX_RETENTION: float = float(os.getenv("OUTBOX_RETENTION", 7 * 24 * 3600))
+
+PENDING, SENT, DEAD = "pending", "sent", "dead"
+
+# longest idle sleep; bounds the delay for messages queued by other processes
+IDLE_POLL = 0.25
+# seconds between retention sweeps, and rows deleted per statement
+PRUNE_INTERVAL = 60
+PRUNE_BATCH = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    number TEXT NOT NULL,
+    message TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    last_error TEXT,
+    trace TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox(status, number, id);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_outbox_sent ON outbox(status, sent_at);
+"""
+
+# the oldest pending message of each recipient that is due
+_DUE = """
+SELECT id, number, message, attempts, trace FROM outbox
+WHERE id IN (SELECT MIN(id) FROM outbox WHERE status = 'pending' GROUP BY number)
+  AND next_attempt_at <= ?
+ORDER BY next_attempt_at, id
+LIMIT ?
+"""
+
+
+class TokenBucket:
+    """``rate`` tokens per second, holding at most ``burst``."""
+
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.stamp = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def ready(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= 1
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class Outbox:
+    """Persistent queue plus the dispatcher thread that drains it.
+
+    ``send(number, message)`` delivers one message and raises on failure;
+    it defaults to the pooled bridge client.
+    """
+
+    def __init__(
+        self,
+        path: Path | str = OUTBOX_DB,
+        *,
+        send: Callable[[str, str], Any] = post_message,
+        rate: float = OUTBOX_RATE,
+        burst: int = OUTBOX_BURST,
+        recipient_rate: float = OUTBOX_RECIPIENT_RATE,
+        recipient_burst: int = OUTBOX_RECIPIENT_BURST,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+        backoff_base: float = OUTBOX_BACKOFF_BASE,
+        backoff_max: float = OUTBOX_BACKOFF_MAX,
+        senders: int = OUTBOX_SENDERS,
+        retention: float = OUTBOX_RETENTION,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.send = send
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.recipient_rate = recipient_rate
+        self.recipient_burst = recipient_burst
+        self.retention = retention
+        self._next_prune = 0.0
+        self._bucket = TokenBucket(rate, burst)
+        self._recipients: dict[str, TokenBucket] = {}
+        self._db = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.executescript(_SCHEMA)
+        self._add_trace_column()
+        self._db_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._inflight: set[str] = set()
+        self._wake = False
+        self._closed = False
+        self._counters = {
+            "delivered": 0,
+            "retried": 0,
+            "dead": 0,
+            "throttled": 0,
+            "pruned": 0,
+        }
+        self._pool = ThreadPoolExecutor(max(1, senders), thread_name_prefix="outbox")
+        self._thread: threading.Thread | None = None
+
+    def _add_trace_column(self) -> None:
+        # outbox.db files from before traces were stored
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        if "trace" not in columns:
+            try:
+                self._db.execute("ALTER TABLE outbox ADD COLUMN trace TEXT")
+            except sqlite3.OperationalError:  # another worker got there first
+                pass
+
+    # ------------------------------------------------------------------ producer
+
+    def enqueue(self, number: str, message: str) -> int:
+        """Persist one message and return its id."""
+        return self.enqueue_many(number, [message])[0]
+
+    @timed("outbox_enqueue")
+    def enqueue_many(self, number: str, messages: Iterable[str]) -> list[int]:
+        """Persist several messages for *number* in one transaction."""
+        now = time.time()
+        trace = tracing.traceparent()
+        ids = []
+        with self._db_lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for message in messages:
+                    cur = self._db.execute(
+                        "INSERT INTO outbox"
+                        " (number, message, next_attempt_at, created_at, trace)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        (number, message, now, now, trace),
+                    )
+                    ids.append(cur.lastrowid)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        self._notify()
+        return ids
+
+    # ------------------------------------------------------------------ status
+
+    def status(self, message_id: int) -> dict[str, Any] | None:
+        """Delivery status of one message (``None`` if unknown)."""
+        rows = self._query("SELECT * FROM outbox WHERE id = ?", (message_id,))
+        return rows[0] if rows else None
+
+    def dead_letters(self, limit: int = 100) -> list[dict[str, Any]]:
+        return self._query(
+            "SELECT * FROM outbox WHERE status = 'dead' ORDER BY id DESC LIMIT ?",
+            (limit,),
+        )
+
+    def requeue(self, message_id: int) -> bool:
+        """Give a dead message a fresh set of attempts."""
+        with self._db_lock:
+            cur = self._db.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0,"
+                " next_attempt_at = ? WHERE id = ? AND status = 'dead'",
+                (time.time(), message_id),
+            )
+        self._notify()
+        return cur.rowcount == 1
+
+    def stats(self) -> dict[str, int]:
+        # one index range per status, so each count touches only its rows
+        counts = {
+            status: self._count_status(status) for status in (PENDING, SENT, DEAD)
+        }
+        with self._cond:
+            inflight = len(self._inflight)
+            counters = dict(self._counters)
+        return {**counts, "inflight": inflight, **counters}
+
+    def prune(self, older_than: float | None = None) -> int:
+        """Delete messages sent more than *older_than* seconds ago.
+
+        Defaults to the outbox's retention; returns how many were deleted.
+        Runs in batches so senders never wait long for the database.
+        """
+        cutoff = time.time() - (self.retention if older_than is None else older_than)
+        deleted = 0
+        while True:
+            with self._db_lock:
+                cur = self._db.execute(
+                    "DELETE FROM outbox WHERE id IN (SELECT id FROM outbox"
+                    " WHERE status = 'sent' AND sent_at < ? LIMIT ?)",
+                    (cutoff, PRUNE_BATCH),
+                )
+            deleted += cur.rowcount
+            if cur.rowcount < PRUNE_BATCH:
+                break
+        if deleted:
+            with self._cond:
+                self._counters["pruned"] += deleted
+        return deleted
+
+    def _count_status(self, status: str) -> int:
+        return self._query_raw(
+            "SELECT COUNT(*) FROM outbox WHERE status = ?", (status,)
+        )[0][0]
+
+    def _has_pending(self) -> bool:
+        return bool(
+            self._query_raw("SELECT 1 FROM outbox WHERE status = 'pending' LIMIT 1")
+        )
+
+    def _query(self, sql: str, args: tuple = ()) -> list[dict[str, Any]]:
+        with self._db_lock:
+            cur = self._db.execute(sql, args)
+            names = [col[0] for col in cur.description]
+            return [dict(zip(names, row)) for row in cur.fetchall()]
+
+    def _query_raw(self, sql: str, args: tuple = ()) -> list[tuple]:
+        with self._db_lock:
+            return self._db.execute(sql, args).fetchall()
+
+    # ------------------------------------------------------------------ dispatcher
+
+    def start(self) -> "Outbox":
+        """Start the dispatcher thread (idempotent)."""
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="outbox-dispatcher", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until nothing is pending or in flight; ``False`` on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                inflight = bool(self._inflight)
+            if not inflight and not self._has_pending():
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self._pool.shutdown(wait=True)
+        with self._db_lock:
+            self._db.close()
+
+    def _notify(self) -> None:
+        with self._cond:
+            self._wake = True
+            self._cond.notify_all()
+
+    def _count(self, name: str) -> None:
+        with self._cond:
+            self._counters[name] += 1
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                self._wake = False
+            if self.retention > 0 and time.monotonic() >= self._next_prune:
+                self._next_prune = time.monotonic() + PRUNE_INTERVAL
+                self.prune()
+            delay = self._dispatch()
+            with self._cond:
+                # anything that happened during the dispatch set _wake
+                if not self._wake and not self._closed:
+                    self._cond.wait(delay)
+
+    def _dispatch(self) -> float:
+        """Hand every due, unthrottled head message to a sender.
+
+        Returns how long to sleep before looking again; new messages and
+        finished sends wake the dispatcher early.
+        """
+        now, mono = time.time(), time.monotonic()
+        with self._cond:
+            busy = set(self._inflight)
+        rows = self._query_raw(_DUE, (now, 500))
+        delay = self._next_due(now)
+        for message_id, number, message, attempts, trace in rows:
+            if number in busy:
+                continue
+            bucket = self._recipients.get(number)
+            if bucket is None:
+                bucket = self._recipients[number] = TokenBucket(
+                    self.recipient_rate, self.recipient_burst
+                )
+            if not self._bucket.ready(mono):
+                self._count("throttled")
+                return min(delay, self._bucket.wait_time(mono))
+            if not bucket.ready(mono):
+                self._count("throttled")
+                delay = min(delay, bucket.wait_time(mono))
+                continue
+            self._bucket.take()
+            bucket.take()
+            with self._cond:
+                self._inflight.add(number)
+            self._pool.submit(
+                self._deliver, message_id, number, message, attempts, trace
+            )
+        self._prune_buckets(mono)
+        return delay
+
+    def _next_due(self, now: float) -> float:
+        (due,) = self._query_raw(
+            "SELECT MIN(next_attempt_at) FROM outbox"
+            " WHERE status = 'pending' AND next_attempt_at > ?",
+            (now,),
+        )[0]
+        return IDLE_POLL if due is None else min(IDLE_POLL, due - now)
+
+    def _prune_buckets(self, mono: float) -> None:
+        if len(self._recipients) > 10_000:
+            for number in [n for n, b in self._recipients.items() if b.full(mono)]:
+                del self._recipients[number]
+
+    def _deliver(
+        self,
+        message_id: int,
+        number: str,
+        message: str,
+        attempts: int,
+        trace: str | None = None,
+    ):
+        try:
+            with tracing.remote(trace):
+                self.send(number, message)
+        except Exception as exc:
+            self._failed(message_id, number, attempts + 1, exc)
+        else:
+            with self._db_lock:
+                self._db.execute(
+                    "UPDATE outbox SET status = 'sent', attempts = ?, sent_at = ?,"
+                    " last_error = NULL WHERE id = ?",
+                    (attempts + 1, time.time(), message_id),
+                )
+            self._count("delivered")
+        finally:
+            with self._cond:
+                self._inflight.discard(number)
+            self._notify()
+
+    def _failed(self, message_id: int, number: str, attempts: int, exc: Exception):
+        if attempts >= self.max_attempts:
+            status, retry_at = DEAD, time.time()
+            self._count("dead")
+            print(f"❌ Outbox gave up on message {message_id} → {number}: {exc}")
+        else:
+            backoff = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+            status, retry_at = PENDING, time.time() + backoff * random.uniform(0.5, 1)
+            self._count("retried")
+            print(f"⚠️ Outbox send {message_id} → {number} failed ({exc}); retrying")
+        with self._db_lock:
+            self._db.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?,"
+                " last_error = ? WHERE id = ?",
+                (status, attempts, retry_at, str(exc), message_id),
+            )
+
+
+_outbox: Outbox | None = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> Outbox:
+    """Return the process-wide outbox, opening it on first use.
+
+    Every worker process can queue messages; only the elected leader calls
+    :meth:`Outbox.start` to deliver them (see ``receiver.py``).
+    """
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = Outbox()
+    return _outbox
+
+
+def set_outbox(outbox: Outbox | None) -> None:
+    """Swap the process-wide outbox (tests); ``None`` resets it."""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is not None and _outbox is not outbox:
+            _outbox.close()
+        _outbox = outbox
+
+
+def queue_message(number: str, message: str) -> int:
+    """Queue one WhatsApp message for delivery; returns its outbox id."""
+    return get_outbox().enqueue(number, message)
+
+
+def queue_messages(number: str, messages: Iterable[str]) -> list[int]:
+    """Queue several messages for *number*, delivered in this order."""
+    messages = list(messages)
+    return get_outbox().enqueue_many(number, messages) if messages else []
@@ -3,42 +3,104 @@
 WhatsApp FastAPI webhook with intent routing, booking,
 natural-language slots, reminders, and LLM fallback
 """
+import asyncio
 import os
 import re
+import secrets
 import socket
 import sys
-from fastapi import FastAPI, Request
-import uvicorn
+import threading
 
 # allow imports from project root
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+# first, so the startup clock covers every import below
+from src.utils.startup import readiness
+
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+import uvicorn
+
 from src.handlers.intent_classifier import classify_intent, Intent
 from src.handlers.booking_handler import (
     initialize_bookings_file,
-    load_bookings,
-    save_all_bookings,
-    is_waiting_for_booking,
-    set_waiting_for_booking,
+    get_availability,
     get_booking_options,
+    get_slot_index,
     get_user_booking,
     cancel_booking,
     save_individual_booking,
     slot_taken,
 )
+from src.handlers.booking_session import BookingSession, booking_session
 from src.handlers.day_detector import detect_day_request
-from tools.whatsapp_snd_tool import SendWhatsappMsg
-from src.agent.agent import Agent
-from reminder_scheduler import start_scheduler
-from tools.booking_tool import BookingTool
-from utils.slot_parser import parse_slot
+from src.reminder_scheduler import start_scheduler, stop_scheduler
+from src.tools.booking_tool import book_appointment
+from src.utils import slot_parser
+from src.utils.slot_parser import parse_slot_dt
+from src.utils.time_utils import format_slot, now_local
+from src.storage import get_store
+from src.storage.base import SlotConflict
+from src.ingest_queue import INGEST_WORKERS, IngestQueue
+from src.outbox import get_outbox, set_outbox
+from src.utils.aio import aclose_http_client, run_blocking
+from src.utils.dedup import DedupCache, message_key
+from src.utils.leader import LeaderElection
+from src.utils import metrics
+from src.utils.metrics import MESSAGES, timed
+from src.utils import profiler, tracing
+from src.utils.reply_buffer import collect_replies
+from src.utils.whatsapp import close_whatsapp_client
+
+# LangChain, ollama and dateparser are only imported on the paths that need
+# them (LLM fallback, dateparser fallback) or by the warm-up after startup
+WARM_LLM = os.getenv("WARM_LLM", "1") != "0"
+# shared secret for the admin endpoints (the profiler); unset = disabled
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_MAX_SECONDS = 300
+
+readiness.mark("imports")
 
 app = FastAPI()
 
-# start the 60s reminder scheduler
-start_scheduler(app)
 # ensure bookings file exists
 initialize_bookings_file()
+readiness.mark("bookings")
+
+
+def _lead():
+    """Singleton jobs: exactly one worker process runs them."""
+    start_scheduler(app)  # the 60s reminder scheduler
+    get_outbox().start()
+
+
+def _resign():
+    stop_scheduler(app)
+    set_outbox(None)
+
+
+leader = LeaderElection(_lead, _resign)
+
+
+def _warm_up():
+    """Build what the first request would otherwise pay for, then go ready."""
+    leader.start()
+    get_slot_index()
+    get_availability()  # calendar + per-day slot bitmaps
+    readiness.set_ready()
+    if "dateparser" in slot_parser.SLOT_FALLBACKS:
+        import dateparser  # noqa: F401  (opt-in fallback)
+    if WARM_LLM:
+        import src.agent.agent  # noqa: F401  (LangChain tools + ollama)
+
+        readiness.mark("llm_warm")
+
+
+@app.on_event("startup")
+async def startup():
+    # serve /ping straight away; /ready flips once the warm-up is done
+    threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
 
 
 @app.get("/ping")
@@ -46,184 +108,334 @@ async def ping():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready():
+    report = readiness.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+SLOT_TAKEN_MSG = "⚠️ Sorry, that time was just booked. Please choose another slot."
+PAST_SLOT_MSG = "⏰ That time has already passed. Please choose a later slot."
+
+
 @app.post("/incoming")
 async def incoming(request: Request):
-    payload = await request.json()
+    try:
+        payload = await request.json()
+    except ValueError:
+        return JSONResponse({"status": "invalid json"}, status_code=400)
+    if not isinstance(payload, dict):
+        return JSONResponse({"status": "invalid payload"}, status_code=400)
     user_number = payload.get("number", "")
-    user_message = payload.get("message", "").strip()
-    bookings = load_bookings()
+    user_message = payload.get("message", "")
+    if not user_number or not isinstance(user_number, str):
+        return JSONResponse({"status": "missing number"}, status_code=400)
+    if not isinstance(user_message, str):
+        return JSONResponse({"status": "invalid message"}, status_code=400)
+    user_message = user_message.strip()
+
+    # redelivered message: answer as we did the first time, don't reprocess
+    key = message_key(payload)
+    if key is not None:
+        seen = dedup.get(key)
+        if seen is not None:
+            status_code, body = seen
+            return JSONResponse({**body, "duplicate": True}, status_code=status_code)
+
+    # finished by process_message, so queue time is part of the trace
+    tracing.start_trace("incoming", number=user_number)
+
+    if INGEST_WORKERS <= 0:
+        # no queue configured: process inline and return the full result
+        if key is None:
+            return await process_message(user_number, user_message)
+        dedup.put(key, (200, {"status": "processing"}))
+        try:
+            result = await process_message(user_number, user_message)
+        except Exception:
+            dedup.discard(key)
+            raise
+        dedup.put(key, (200, jsonable_encoder(result)))
+        return result
+    if key is not None:
+        dedup.put(key, (202, {"status": "queued"}))
+    if not await ingest.submit(user_number, user_message):
+        if key is not None:
+            dedup.discard(key)  # let the bridge's retry through
+        return JSONResponse(
+            {"status": "busy"}, status_code=503, headers={"Retry-After": "1"}
+        )
+    return JSONResponse({"status": "queued"}, status_code=202)
+
+
+@app.get("/ingest/stats")
+async def ingest_stats():
+    return {**ingest.stats(), "dedup": dedup.stats()}
+
+
+@app.get("/outbox/stats")
+async def outbox_stats():
+    return await run_blocking(lambda: get_outbox().stats())
+
+
+@app.get("/outbox/dead")
+async def outbox_dead(limit: int = 100):
+    return await run_blocking(get_outbox().dead_letters, limit)
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    body = await run_blocking(metrics.render)
+    return Response(body, media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/debug/traces")
+async def debug_traces(limit: int = 20, min_ms: float = 0):
+    """The slowest of this worker's recent requests, slowest first."""
+    return tracing.exporter.recent(limit, min_ms)
+
+
+@app.get("/debug/traces/{trace_id}")
+async def debug_trace(trace_id: str):
+    trace = tracing.exporter.get(trace_id)
+    if trace is None:
+        return JSONResponse({"status": "unknown trace"}, status_code=404)
+    return trace
+
+
+def _admin_denied(request: Request) -> JSONResponse | None:
+    token = request.headers.get("x-admin-token", "")
+    if not ADMIN_TOKEN:
+        return JSONResponse({"status": "set ADMIN_TOKEN to enable"}, status_code=403)
+    if not secrets.compare_digest(token, ADMIN_TOKEN):
+        return JSONResponse({"status": "forbidden"}, status_code=403)
+    return None
+
+
+@app.post("/debug/profile")
+async def debug_profile(
+    request: Request,
+    seconds: float = 10,
+    interval_ms: float = 5,
+    every: int = 0,
+    top: int = 30,
+    format: str = "json",
+    include_idle: bool = False,
+):
+    """Sample this worker's stacks for *seconds* (admin only).
+
+    ``every=K`` keeps only samples taken during every K-th message;
+    ``format=collapsed`` returns flamegraph-ready collapsed stacks.
+    """
+    denied = _admin_denied(request)
+    if denied is not None:
+        return denied
+    session = profiler.begin(
+        interval=max(interval_ms, 1) / 1000, every=every, include_idle=include_idle
+    )
+    if session is None:
+        return JSONResponse({"status": "profiler busy"}, status_code=409)
+    try:
+        await asyncio.sleep(min(max(seconds, 0), PROFILE_MAX_SECONDS))
+    finally:
+        result = await run_blocking(profiler.end, session)
+    if format == "collapsed":
+        return PlainTextResponse(result.collapsed())
+    return result.to_dict(top)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await ingest.stop()
+    await run_blocking(leader.stop)
+    await run_blocking(set_outbox, None)
+    await aclose_http_client()
+    close_whatsapp_client()
+    dedup.close()
+    tracing.exporter.close()
+
+
+async def process_message(user_number: str, user_message: str):
+    """Run the whole pipeline for one message and send its replies."""
+    with tracing.request_trace("incoming", number=user_number) as trace:
+        with profiler.profile_request(), timed("incoming", span="pipeline"):
+            result = await _run_pipeline(user_number, user_message)
+        if isinstance(result, dict):
+            MESSAGES.inc(str(result.get("status")))
+            if trace is not None:
+                trace.attrs["status"] = result.get("status")
+    return result
+
+
+async def _run_pipeline(user_number: str, user_message: str):
+    # every reply of this turn (router, agent, tools) is collected and sent
+    # as one message through the durable outbox, so we never wait on the bridge
+    with collect_replies() as outgoing:
+        try:
+            # store I/O and slot parsing block, so they run on the worker pool;
+            # the event loop only awaits network calls
+            result, replies = await run_blocking(
+                handle_message, user_number, user_message
+            )
+            outgoing.extend(user_number, replies)
+            if result is None:
+                result = await run_agent(user_number, user_message)
+        finally:
+            await run_blocking(outgoing.flush)
+    return result
+
+
+ingest = IngestQueue(process_message)
+dedup = DedupCache()
+metrics.register_stats("whatsapp_ingest", ingest.stats)
+metrics.register_stats("whatsapp_dedup", dedup.stats)
+metrics.register_stats("whatsapp_outbox", lambda: get_outbox().stats())
+metrics.register_stats("whatsapp_bookings_store", lambda: get_store().stats())
+
+
+@timed("route")
+def handle_message(user_number: str, user_message: str):
+    """Route one message inside a booking session; return ``(result, replies)``.
+
+    One read of the user's booking, at most one write, and the replies are
+    only sent once it has committed. ``result`` is ``None`` when the message
+    should go to the LLM agent.
+    """
+    replies: list[str] = []
+    with booking_session(user_number) as session:
+        try:
+            result = route_message(session, user_message, replies)
+            session.commit()
+        except SlotConflict:
+            session.rollback()
+            replies = [SLOT_TAKEN_MSG]
+            result = {"status": "slot collision"}
+    return result, replies
+
+
+def _new_agent(user_number: str):
+    from src.agent.agent import Agent  # LangChain + ollama load on first use
+
+    return Agent(user_id=user_number)
+
+
+@timed("agent")
+async def run_agent(user_number: str, user_message: str):
+    """🔟 LLM fallback with memory: await the model, run its tool off-loop."""
+    # a cold import (or one the warm-up thread is still holding) takes seconds
+    agent = await run_blocking(_new_agent, user_number)
+    tool, args = await agent.think_llm_async(user_message)
+    args.setdefault("number", user_number)
+    args.setdefault("user_number", user_number)
+    response = await run_blocking(agent.act, tool, args, user_message)
+    return {"status": "agent", "tool": tool, "args": args, "response": response}
+
+
+def _confirm_booking(session: BookingSession, slot: str, replies: list[str]) -> bool:
+    """Stage the post-booking flags; return True if we should ask for email."""
+    session.update(awaiting_selection=False)
+    replies.append(f"✅ You're booked for {slot}! We'll remind you 24 h before.")
+    if session.get("email"):
+        return False
+    session.update(awaiting_email=True)
+    replies.append("📧 Got an email address? Reply or say 'skip'.")
+    return True
+
+
+def route_message(session: BookingSession, user_message: str, replies: list[str]):
+    """Handle one inbound message against *session*; queue texts in *replies*.
+
+    Returns the response body, or ``None`` to defer to the LLM agent.
+    """
+    user_number = session.user
 
     # 1️⃣ Awaiting email flow
-    if bookings.get(user_number, {}).get("awaiting_email"):
+    if session.get("awaiting_email"):
         text = user_message.lower()
         if "skip" in text:
-            bookings[user_number]["awaiting_email"] = False
-            save_all_bookings(bookings)
-            SendWhatsappMsg.invoke(
-                {
-                    "number": user_number,
-                    "message": "👍 No problem – WhatsApp reminders only.",
-                }
-            )
+            session.update(awaiting_email=False)
+            replies.append("👍 No problem – WhatsApp reminders only.")
             return {"status": "email skipped"}
         if re.fullmatch(r"[^@\s]+@[^@\s]+\.[^@\s]+", user_message):
-            bookings[user_number]["email"] = user_message
-            bookings[user_number]["awaiting_email"] = False
-            save_all_bookings(bookings)
-            SendWhatsappMsg.invoke(
-                {
-                    "number": user_number,
-                    "message": "✅ Great! I’ll email reminders too.",
-                }
-            )
+            session.update(email=user_message, awaiting_email=False)
+            replies.append("✅ Great! I’ll email reminders too.")
             return {"status": "email saved"}
-        SendWhatsappMsg.invoke(
-            {
-                "number": user_number,
-                "message": "⚠️ That doesn’t look like an email. Send a valid address or say 'skip'.",
-            }
+        replies.append(
+            "⚠️ That doesn’t look like an email. Send a valid address or say 'skip'."
         )
         return {"status": "awaiting valid email"}
 
     # classify intent and slot
-    intent = classify_intent(user_message)
-    natural = parse_slot(user_message)
+    with timed("classify_intent"):
+        intent = classify_intent(user_message)
+    with timed("parse_slot"):
+        natural_dt = parse_slot_dt(user_message)
+    natural = format_slot(natural_dt) if natural_dt else None
     digit_sel = bool(re.fullmatch(r"[1-5]", user_message))
 
-    # 2️⃣ Reschedule
+    # 2️⃣ Reschedule (cancel + book commit together)
     if intent is Intent.RESCHEDULE_APPT:
         current = get_user_booking(user_number)
         if current:
             cancel_booking(user_number)
-            SendWhatsappMsg.invoke(
-                {
-                    "number": user_number,
-                    "message": f"🔄 Your previous appointment at {current} has been canceled. Let's pick a new time!",
-                }
+            replies.append(
+                f"🔄 Your previous appointment at {current} has been canceled. Let's pick a new time!"
             )
             intent = Intent.BOOK_APPT
         else:
-            SendWhatsappMsg.invoke(
-                {
-                    "number": user_number,
-                    "message": "😔 I don’t see an appointment to reschedule.",
-                }
-            )
+            replies.append("😔 I don’t see an appointment to reschedule.")
             return {"status": "no booking to reschedule"}
 
     # 3️⃣ Clear stale waiting flag
-    if is_waiting_for_booking(user_number, bookings) and not (
+    waiting = bool(session.get("awaiting_selection"))
+    if waiting and not (
         natural or digit_sel or intent in {Intent.CHECK_DAY, Intent.BOOK_APPT}
     ):
-        set_waiting_for_booking(user_number, bookings, False)
-        save_all_bookings(bookings)
+        session.update(awaiting_selection=False)
+        waiting = False
 
     # 4️⃣ Cancel appointment
     if intent is Intent.CANCEL_APPT:
         ok = cancel_booking(user_number)
-        msg = (
+        replies.append(
             "✅ Your appointment has been canceled."
             if ok
             else "⚠️ You don’t have any appointment to cancel."
         )
-        SendWhatsappMsg.invoke({"number": user_number, "message": msg})
         return {"status": "cancel"}
 
     # 5️⃣ Lookup appointment
     if intent is Intent.LOOKUP_APPT:
         slot = get_user_booking(user_number)
-        msg = (
+        replies.append(
             f"📅 You are booked for {slot}!"
             if slot
             else "😔 I couldn’t find an active booking for you."
         )
-        SendWhatsappMsg.invoke({"number": user_number, "message": msg})
         return {"status": "lookup"}
 
-    # 6️⃣ Natural-language booking
-    if intent is Intent.BOOK_APPT and natural:
-        if slot_taken(natural, bookings, exclude_user=user_number):
-            SendWhatsappMsg.invoke(
-                {
-                    "number": user_number,
-                    "message": "⚠️ Sorry, that time was just booked. Please choose another slot.",
-                }
-            )
+    # 6️⃣ Natural-language booking / 7️⃣ mid-booking override
+    if natural and (intent is Intent.BOOK_APPT or waiting):
+        if natural_dt < now_local():
+            replies.append(PAST_SLOT_MSG)
+            return {"status": "slot in past"}
+        if slot_taken(natural_dt, exclude_user=user_number):
+            replies.append(SLOT_TAKEN_MSG)
             return {"status": "slot collision"}
-        save_individual_booking(user_number, natural)
-        set_waiting_for_booking(user_number, bookings, False)
-        save_all_bookings(bookings)
-        SendWhatsappMsg.invoke(
-            {
-                "number": user_number,
-                "message": f"✅ You're booked for {natural}! We'll remind you 24 h before.",
-            }
-        )
-        # prompt email
-        b = load_bookings()
-        if not b[user_number].get("email"):
-            b[user_number]["awaiting_email"] = True
-            save_all_bookings(b)
-            SendWhatsappMsg.invoke(
-                {
-                    "number": user_number,
-                    "message": "📧 Got an email address? Reply or say 'skip'.",
-                }
-            )
+        save_individual_booking(user_number, natural_dt)
+        if _confirm_booking(session, natural, replies):
             return {"status": "ask email"}
-        return {"status": "booked natural"}
-
-    # 7️⃣ Mid-booking override
-    if is_waiting_for_booking(user_number, bookings) and natural:
-        if slot_taken(natural, bookings, exclude_user=user_number):
-            SendWhatsappMsg.invoke(
-                {
-                    "number": user_number,
-                    "message": "⚠️ Sorry, that time was just booked. Please choose another slot.",
-                }
-            )
-            return {"status": "slot collision"}
-        save_individual_booking(user_number, natural)
-        set_waiting_for_booking(user_number, bookings, False)
-        save_all_bookings(bookings)
-        SendWhatsappMsg.invoke(
-            {
-                "number": user_number,
-                "message": f"✅ You're booked for {natural}! We'll remind you 24 h before.",
-            }
-        )
-        b = load_bookings()
-        if not b[user_number].get("email"):
-            b[user_number]["awaiting_email"] = True
-            save_all_bookings(b)
-            SendWhatsappMsg.invoke(
-                {
-                    "number": user_number,
-                    "message": "📧 Got an email address? Reply or say 'skip'.",
-                }
-            )
-            return {"status": "ask email"}
-        return {"status": "confirmed"}
+        return {"status": "booked natural" if intent is Intent.BOOK_APPT else "confirmed"}
 
     # 8️⃣ BookingTool fallback
     if intent is Intent.BOOK_APPT:
-        result = BookingTool.run({"number": user_number, "user_message": user_message})
+        result = book_appointment(number=user_number, user_message=user_message)
         if result.startswith("booked::"):
             slot = result.split("::", 1)[1]
-            SendWhatsappMsg.invoke(
-                {
-                    "number": user_number,
-                    "message": f"✅ You're booked for {slot}! We'll remind you 24 h before.",
-                }
-            )
+            replies.append(f"✅ You're booked for {slot}! We'll remind you 24 h before.")
             return {"status": "booked"}
         if result == "slot_taken":
-            SendWhatsappMsg.invoke(
-                {
-                    "number": user_number,
-                    "message": "⚠️ Sorry, that time was just booked. Please choose another slot.",
-                }
-            )
+            replies.append(SLOT_TAKEN_MSG)
             return {"status": "slot collision"}
 
     # 9️⃣ Show menu
@@ -231,26 +443,16 @@ async def incoming(request: Request):
         day = detect_day_request(user_message) if intent is Intent.CHECK_DAY else None
         slots = get_booking_options(desired_day=day or "", raw=True)
         if not slots:
-            SendWhatsappMsg.invoke(
-                {"number": user_number, "message": "⚠️ No available slots right now."}
-            )
+            replies.append("⚠️ No available slots right now.")
             return {"status": "no slots"}
         top5 = slots[:5]
-        set_waiting_for_booking(user_number, bookings, True)
-        save_all_bookings(bookings)
+        session.update(awaiting_selection=True)
         menu = "\n".join(f"{i+1}. {s}" for i, s in enumerate(top5))
-        SendWhatsappMsg.invoke(
-            {"number": user_number, "message": f"🔎 Available times:\n{menu}"}
-        )
+        replies.append(f"🔎 Available times:\n{menu}")
         return {"status": "menu shown"}
 
-    # 🔟 LLM fallback with memory
-    agent = Agent(user_id=user_number)
-    tool, args = agent.think_llm(user_message)
-    args.setdefault("number", user_number)
-    args.setdefault("user_number", user_number)
-    response = agent.act(tool, args, user_message)
-    return {"status": "agent", "tool": tool, "args": args, "response": response}
+    # 🔟 nothing matched: hand over to the LLM agent (see run_agent)
+    return None
 
 
 def find_open_port(start: int = 8001) -> int:
@@ -2,53 +2,22 @@
 WhatsApp **and** email reminders:
 • 24‑hour and 1‑hour notices
 • tracks *reminder_sent_sms* / *reminder_sent_email*
-• atomic JSON writes
-• runs every 60 s via APScheduler (bootstrapped from `receiver.py`)
+• per-user flag updates through the bookings store
+• runs every 60 s via APScheduler in the elected leader worker
+  (bootstrapped from `receiver.py`)
 """
 
 from __future__ import annotations
 
-import json
-import os
-import shutil
-import tempfile
 from datetime import datetime, timedelta
-from pathlib import Path
-
-import requests
-import dateparser  # lightweight natural‑language dt parser
-from apscheduler.schedulers.background import BackgroundScheduler
 
+from src.handlers.booking_session import CAS_RETRIES
+from src.outbox import queue_message
+from src.storage import BookingStore, get_store
+from src.storage.base import VersionConflict, version_of
 from src.utils.email import send_email  # thin SMTP helper
-
-# -----------------------------------------------------------------------------
-# paths & constants
-# -----------------------------------------------------------------------------
-BASE_DIR = Path(__file__).resolve().parents[1]
-BOOKINGS_FILE = BASE_DIR / "data" / "bookings.json"
-WHATSAPP_URL = "http://localhost:3000/send"  # Node sender
-
-# -----------------------------------------------------------------------------
-# tiny JSON helpers (load / atomic save)
-# -----------------------------------------------------------------------------
-
-
-def _load() -> dict:
-    if not BOOKINGS_FILE.exists():
-        return {}
-    with BOOKINGS_FILE.open(encoding="utf-8") as f:
-        return json.load(f)
-
-
-def _atomic_save(data: dict) -> None:
-    BOOKINGS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    fd, tmp = tempfile.mkstemp(dir=BOOKINGS_FILE.parent, suffix=".tmp")
-    with os.fdopen(fd, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-        f.flush()
-        os.fsync(f.fileno())
-    shutil.move(tmp, BOOKINGS_FILE)
-
+from src.utils.metrics import timed
+from src.utils.time_utils import format_slot, now_local
 
 # -----------------------------------------------------------------------------
 # send helpers
@@ -56,13 +25,10 @@ def _atomic_save(data: dict) -> None:
 
 
 def _send_sms(number: str, msg: str) -> bool:
+    # queued durably: the outbox retries delivery, so the flag can be set now
     try:
-        requests.post(
-            WHATSAPP_URL,
-            json={"number": number, "message": msg},
-            timeout=5,
-        )
-        print(f"✅ SMS reminder → {number}")
+        queue_message(number, msg)
+        print(f"✅ SMS reminder queued → {number}")
         return True
     except Exception as e:
         print(f"❌ SMS reminder failed → {number}: {e}")
@@ -90,16 +56,23 @@ def _send_email(address: str, slot_str: str, when: str) -> bool:
 # -----------------------------------------------------------------------------
 
 
-def _parse_slot(slot_str: str) -> datetime | None:
-    """Convert stored 'Wednesday 3:15 PM' into the *next* datetime in the future."""
-    dt = dateparser.parse(slot_str)
-    if not dt:
-        return None
+def _slot_datetime(info: dict) -> datetime | None:
+    """Absolute slot time from the stored ISO ``slot_at`` (no NL parsing)."""
+    slot_at = info.get("slot_at")
+    return datetime.fromisoformat(slot_at) if slot_at else None
+
 
-    now = datetime.now()
-    while dt < now:  # bump to the next occurrence
-        dt += timedelta(days=7)
-    return dt
+def _stamp(store: BookingStore, phone: str, info: dict, sent: dict) -> None:
+    """Set the *sent* flags, unless the booking moved or went since loaded."""
+    record: dict | None = info
+    for _ in range(CAS_RETRIES):
+        if record is None or record.get("slot_at") != info.get("slot_at"):
+            return  # cancelled or rescheduled meanwhile: not our reminder
+        try:
+            store.cas(phone, version_of(record), {**record, **sent})
+            return
+        except VersionConflict:
+            record = store.get(phone)
 
 
 # -----------------------------------------------------------------------------
@@ -107,18 +80,16 @@ def _parse_slot(slot_str: str) -> datetime | None:
 # -----------------------------------------------------------------------------
 
 
+@timed("check_reminders")
 def check_reminders() -> None:
-    now = datetime.now()
-    bookings = _load()
-
-    for phone, info in bookings.items():
-        slot_str: str | None = info.get("time")
-        if not slot_str:
-            continue
+    now = now_local()
+    store = get_store()
 
-        slot_dt = _parse_slot(slot_str)
-        if not slot_dt:
+    for phone, info in store.load_all().items():
+        slot_dt = _slot_datetime(info)
+        if slot_dt is None or slot_dt <= now:
             continue
+        slot_str: str = info.get("time") or format_slot(slot_dt)
 
         # 24‑hour and 1‑hour windows
         for hrs, sms_flag, email_flag in (
@@ -130,17 +101,22 @@ def check_reminders() -> None:
                 when_txt = "tomorrow" if hrs == 24 else "in 1 hour"
                 sms_msg = f"🔔 Friendly reminder: your appointment is {when_txt} at {slot_str}."
 
+                sent: dict[str, bool] = {}
+
                 # --- SMS ---
                 if not info.get(sms_flag) and _send_sms(phone, sms_msg):
-                    info[sms_flag] = True
+                    sent[sms_flag] = True
 
                 # --- Email ---
                 email_addr: str | None = info.get("email")
                 if email_addr and not info.get(email_flag):
                     if _send_email(email_addr, slot_str, when_txt):
-                        info[email_flag] = True
+                        sent[email_flag] = True
 
-    _atomic_save(bookings)
+                # only touch this customer's row, and only when a flag flipped
+                if sent:
+                    _stamp(store, phone, info, sent)
+                    info.update(sent)
 
 
 # -----------------------------------------------------------------------------
@@ -149,8 +125,18 @@ def check_reminders() -> None:
 
 
 def start_scheduler(app):
+    # imported here: only the leader process ever runs the scheduler
+    from apscheduler.schedulers.background import BackgroundScheduler
+
     sched = BackgroundScheduler()
     sched.add_job(check_reminders, "interval", minutes=1, id="reminders")
     sched.start()
     app.state._reminder_sched = sched  # survive autoreload during dev
     print("🚀 Reminder scheduler running (checks every 60 s)")
+
+
+def stop_scheduler(app):
+    sched = getattr(app.state, "_reminder_sched", None)
+    if sched is not None:
+        sched.shutdown(wait=False)
+        app.state._reminder_sched = None
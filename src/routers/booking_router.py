@@ -13,8 +13,8 @@ from src.handlers.booking_handler import (
     slot_taken,
 )
 from src.handlers.intent_classifier import classify_intent, Intent
-from tools.whatsapp_snd_tool import SendWhatsappMsg
-from utils.slot_parser import parse_slot
+from src.tools.whatsapp_snd_tool import SendWhatsappMsg
+from src.utils.slot_parser import parse_slot
 
 router = APIRouter()
 
@@ -32,7 +32,7 @@ async def handle_booking(request: Request):
         # a) natural time parse
         natural = parse_slot(user_message)
         if natural:
-            if slot_taken(natural, bookings, exclude_user=user_number):
+            if slot_taken(natural, exclude_user=user_number):
                 SendWhatsappMsg.invoke(
                     {
                         "number": user_number,
@@ -69,7 +69,7 @@ async def handle_booking(request: Request):
                 # fall through to invalid-reply below
                 pass
             else:
-                if slot_taken(choice, bookings, exclude_user=user_number):
+                if slot_taken(choice, exclude_user=user_number):
                     SendWhatsappMsg.invoke(
                         {
                             "number": user_number,
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Request
 import re
 from src.handlers.booking_handler import load_bookings, save_all_bookings
-from tools.whatsapp_snd_tool import SendWhatsappMsg
+from src.tools.whatsapp_snd_tool import SendWhatsappMsg
 
 router = APIRouter()
 
@@ -1,7 +1,7 @@
 # src/routers/fallback.py
 from fastapi import APIRouter, Request
 from agent.agent import Agent
-from tools.whatsapp_snd_tool import SendWhatsappMsg
+from src.tools.whatsapp_snd_tool import SendWhatsappMsg
 
 router = APIRouter()
 agent = Agent()
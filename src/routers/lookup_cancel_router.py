@@ -1,7 +1,7 @@
 # src/routers/lookup_cancel_router.py
 from fastapi import APIRouter, Request
 from src.handlers.booking_handler import cancel_booking, get_user_booking
-from tools.whatsapp_snd_tool import SendWhatsappMsg
+from src.tools.whatsapp_snd_tool import SendWhatsappMsg
 
 router = APIRouter()
 
@@ -0,0 +1,142 @@
+"""
+Production entry point: several uvicorn worker processes, no reload.
+
+    python -m src.server --workers 4 --port 8001
+
+Workers share the bookings database and the outbox, so more than one
+worker needs the ``sqlite`` bookings backend (chosen automatically when
+``BOOKINGS_BACKEND`` is unset). The first time it is used, bookings kept by
+the single-process journal (``data/bookings.json`` plus ``bookings.log``)
+are copied into it, so switching to several workers loses none of them.
+The reminder scheduler and the outbox dispatcher run in one elected leader
+process (see :mod:`src.utils.leader`). uvloop and httptools are used when
+installed.
+
+Some state stays per worker, because each process keeps its own copy:
+
+* the ``/incoming`` dedup cache (:mod:`src.utils.dedup`): a redelivery that
+  lands on another worker is processed again. Booking writes stay safe
+  (compare-and-swap), but the customer may get a reply twice.
+  ``DEDUP_FILE`` is refused with more than one worker, because concurrent
+  appends would interleave and corrupt it.
+* per-user ordering (:mod:`src.ingest_queue`): it holds inside a worker
+  only. Put a sticky proxy (hash on the sender) in front when ordering
+  across workers matters.
+* the booking indexes: each worker replays the others' writes from the
+  SQLite change log rather than rebuilding.
+
+Env vars
+--------
+WEB_CONCURRENCY   worker processes (default: CPU count)
+HOST / PORT       bind address (default 0.0.0.0:8001)
+LOG_LEVEL         uvicorn log level (default info)
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+import uvicorn
+
+# the app's modules import both as ``src.x`` and as top-level ``utils.x``;
+# spawned workers inherit this path
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+for path in (os.path.dirname(SRC_DIR), SRC_DIR):
+    if path not in sys.path:
+        sys.path.append(path)
+
+MULTI_PROCESS_BACKENDS = {"sqlite"}
+
+
+def _has(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def configure_backend(workers: int) -> None:
+    """Make sure the bookings backend can be shared by *workers* processes."""
+    if workers <= 1:
+        return
+    backend = os.getenv("BOOKINGS_BACKEND")
+    if backend is None:
+        os.environ["BOOKINGS_BACKEND"] = "sqlite"
+        print("🗄️ Using the sqlite bookings backend for multiple workers")
+    elif backend.lower() not in MULTI_PROCESS_BACKENDS:
+        sys.exit(
+            f"❌ BOOKINGS_BACKEND={backend} is single-process; "
+            "use sqlite or run with --workers 1"
+        )
+    adopt_journal()
+
+
+def adopt_journal(db: Path | None = None, journal: Path | None = None) -> int:
+    """Copy the journal's bookings into a new (or still empty) sqlite file.
+
+    Returns how many were copied. The journal is only read, so going back
+    to one worker finds it as it was (without the writes made since).
+    """
+    from src.storage import BOOKINGS_DB, BOOKINGS_FILE, open_store
+    from src.storage.migrate import copy_bookings
+
+    db, journal = db or BOOKINGS_DB, journal or BOOKINGS_FILE
+    if not (journal.exists() or journal.with_suffix(".log").exists()):
+        return 0
+    if db.exists():
+        store = open_store("sqlite", db)
+        try:
+            if store.load_all():
+                return 0  # already in use; never overwrite it
+        finally:
+            store.close()
+    count = copy_bookings(journal, db)
+    print(f"🗄️ Copied {count} booking(s) from {journal} into {db}")
+    return count
+
+
+def check_per_process_state(workers: int) -> None:
+    """Refuse settings that assume one process when running *workers*."""
+    if workers > 1 and os.getenv("DEDUP_FILE"):
+        sys.exit(
+            "❌ DEDUP_FILE is written by one process only; "
+            "unset it or run with --workers 1"
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the webhook in production")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+    )
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8001)))
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    args = parser.parse_args(argv)
+
+    configure_backend(args.workers)
+    check_per_process_state(args.workers)
+    loop = "uvloop" if _has("uvloop") else "asyncio"
+    http = "httptools" if _has("httptools") else "h11"
+    print(
+        f"🚀 Serving on {args.host}:{args.port} with {args.workers} worker(s) "
+        f"(loop={loop}, http={http})"
+    )
+    uvicorn.run(
+        "src.receiver:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=loop,
+        http=http,
+        log_level=args.log_level,
+        access_log=False,
+        reload=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
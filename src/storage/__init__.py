@@ -0,0 +1,91 @@
+"""Pluggable persistence for customer bookings.
+
+The backend is chosen with ``BOOKINGS_BACKEND``:
+
+* ``journal`` (default) – ``data/bookings.json`` as a snapshot plus an
+  append-only ``data/bookings.log``; single process.
+* ``json`` – the historical whole-file rewrite of ``data/bookings.json``.
+* ``sqlite`` – one row per customer in ``data/bookings.db`` (override with
+  ``BOOKINGS_DB``); safe to share between worker processes.
+
+Use ``python -m src.storage.migrate`` to copy existing journal (or JSON) bookings across.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+
+from src.storage.availability import AvailabilityIndex
+from src.storage.base import BookingStore, Record
+from src.storage.journal_store import JournalStore
+from src.storage.json_store import JsonStore
+from src.storage.slot_index import SlotIndex
+from src.storage.sqlite_store import SqliteStore
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DATA_DIR = BASE_DIR / "data"
+BOOKINGS_FILE = DATA_DIR / "bookings.json"
+BOOKINGS_DB = Path(os.getenv("BOOKINGS_DB", DATA_DIR / "bookings.db"))
+
+BACKENDS: dict[str, type[BookingStore]] = {
+    "journal": JournalStore,
+    "json": JsonStore,
+    "sqlite": SqliteStore,
+}
+_DEFAULT_PATHS = {
+    "journal": BOOKINGS_FILE,
+    "json": BOOKINGS_FILE,
+    "sqlite": BOOKINGS_DB,
+}
+
+_store: BookingStore | None = None
+_store_lock = threading.Lock()
+
+
+def open_store(backend: str, path: Path | str | None = None) -> BookingStore:
+    """Create a new store for *backend* at *path* (or its default location)."""
+    try:
+        cls = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Unknown bookings backend {backend!r}; choose from {sorted(BACKENDS)}"
+        ) from None
+    return cls(path or _DEFAULT_PATHS[backend])
+
+
+def get_store() -> BookingStore:
+    """Return the process-wide store, opening it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = open_store(os.getenv("BOOKINGS_BACKEND", "journal").lower())
+    return _store
+
+
+def set_store(store: BookingStore | None) -> None:
+    """Swap the process-wide store (tests, migrations); ``None`` resets it."""
+    global _store
+    with _store_lock:
+        if _store is not None and _store is not store:
+            _store.close()
+        _store = store
+
+
+__all__ = [
+    "AvailabilityIndex",
+    "BACKENDS",
+    "BOOKINGS_DB",
+    "BOOKINGS_FILE",
+    "BookingStore",
+    "JournalStore",
+    "JsonStore",
+    "Record",
+    "SlotIndex",
+    "SqliteStore",
+    "get_store",
+    "open_store",
+    "set_store",
+]
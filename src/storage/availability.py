@@ -0,0 +1,270 @@
+"""Per-day availability bitmaps kept in sync with a :class:`BookingStore`.
+
+Each (resource, calendar day) pair is one integer whose bit ``i`` is set
+when the ``i``-th slot of that day (``start_hour`` + ``i`` × ``interval``
+minutes) is taken on that staff member or room; a booking sets one bit per
+slot it blocks. A slot is free when any resource's bit is clear, so "first
+N free slots after T" is a handful of word-wide bit operations per day
+instead of one lookup per slot; appointments longer than one slot AND the
+bitmap with shifted copies of itself, and remaining capacity for a whole
+day is a bit-sliced sum across the resources' bitmaps. Opening hours come
+in as a per-day mask (see :mod:`src.config.calendar`). Bookings outside the
+grid are ignored here; collisions for those are still caught by
+:class:`~src.storage.slot_index.SlotIndex` and the store itself.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import Counter
+from datetime import date, datetime, time, timedelta, tzinfo
+from typing import Callable, Container, Iterator, Sequence
+
+from src.storage.base import DEFAULT_RESOURCE, BookingStore, Record, resource_of
+
+# (resource, day, bit)
+Cell = tuple[str, date, int]
+
+
+class AvailabilityIndex:
+    """Bitmaps of taken slots per resource and day, updated from store writes.
+
+    ``slot_of(record)`` returns the aware datetime a record occupies (or
+    ``None``) and ``span_of(record)`` how many grid slots it blocks; both
+    run once per write. Capacity queries count only the configured
+    ``resources``.
+    """
+
+    def __init__(
+        self,
+        store: BookingStore,
+        slot_of: Callable[[Record], datetime | None],
+        *,
+        tz: tzinfo,
+        start_hour: int,
+        end_hour: int,
+        interval: int = 15,
+        resources: Sequence[str] = (DEFAULT_RESOURCE,),
+        span_of: Callable[[Record], int] | None = None,
+    ):
+        self.store = store
+        self.tz = tz
+        self.resources = tuple(resources)
+        self.start = time(start_hour)
+        self.interval = interval
+        self.slots_per_day = (end_hour - start_hour) * 60 // interval
+        self.day_mask = (1 << self.slots_per_day) - 1
+        self._slot_of = slot_of
+        self._span_of = span_of or (lambda record: 1)
+        self._lock = threading.Lock()
+        self._taken: dict[tuple[str, date], int] = {}
+        self._holders: Counter[Cell] = Counter()
+        self._by_user: dict[str, list[Cell]] = {}
+        store.subscribe(self._on_write)
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """Recompute every bitmap from a full scan of the store."""
+        by_user = {}
+        for user, record in self.store.load_all().items():
+            cells = self._cells(record)
+            if cells:
+                by_user[user] = cells
+        holders = Counter(cell for cells in by_user.values() for cell in cells)
+        taken: dict[tuple[str, date], int] = {}
+        for resource, day, bit in holders:
+            taken[resource, day] = taken.get((resource, day), 0) | (1 << bit)
+        with self._lock:
+            self._taken, self._holders, self._by_user = taken, holders, by_user
+
+    def close(self) -> None:
+        self.store.unsubscribe(self._on_write)
+
+    # ------------------------------------------------------------------ grid
+
+    def cell_of(self, dt: datetime) -> tuple[date, int] | None:
+        """Map an aware datetime to ``(day, bit)``, or ``None`` if off-grid."""
+        dt = dt.astimezone(self.tz)
+        offset = dt - datetime.combine(dt.date(), self.start, self.tz)
+        minutes, rest = divmod(int(offset.total_seconds()), 60)
+        bit, off = divmod(minutes, self.interval)
+        if rest or off or not 0 <= bit < self.slots_per_day:
+            return None
+        return dt.date(), bit
+
+    def slot_at(self, day: date, bit: int) -> datetime:
+        start = datetime.combine(day, self.start, self.tz)
+        return start + timedelta(minutes=bit * self.interval)
+
+    def _cells(self, record: Record | None) -> list[Cell]:
+        dt = self._slot_of(record) if record else None
+        cell = self.cell_of(dt) if dt is not None else None
+        if cell is None:
+            return []
+        day, bit = cell
+        last = min(bit + self._span_of(record), self.slots_per_day)
+        return [(resource_of(record), day, b) for b in range(bit, last)]
+
+    # ------------------------------------------------------------------ queries
+
+    def free_masks(
+        self, day: date, span: int = 1, exclude_user: str | None = None
+    ) -> dict[str, int]:
+        """Per configured resource, the slots of *day* that start *span*
+        consecutive free slots (treating *exclude_user*'s booking as free)."""
+        with self._lock:
+            taken = {r: self._taken.get((r, day), 0) for r in self.resources}
+            for resource, d, bit in self._by_user.get(exclude_user, ()):
+                if (
+                    d == day
+                    and resource in taken
+                    and self._holders[resource, d, bit] == 1
+                ):
+                    taken[resource] &= ~(1 << bit)
+        masks = {r: ~mask & self.day_mask for r, mask in taken.items()}
+        if span > 1:
+            for r, free in masks.items():
+                fit = free
+                for shift in range(1, span):
+                    fit &= free >> shift
+                masks[r] = fit
+        return masks
+
+    def free_mask(self, day: date, span: int = 1) -> int:
+        """Slots of *day* where at least one resource is free for *span*."""
+        mask = 0
+        for free in self.free_masks(day, span).values():
+            mask |= free
+        return mask
+
+    def capacity(self, day: date, span: int = 1) -> list[int]:
+        """Remaining capacity of every slot of *day*.
+
+        The resources' free bitmaps are summed bit-sliced: ``planes[k]``
+        holds bit ``k`` of every slot's count, so adding one resource costs
+        a few big-int operations however many slots a day has.
+        """
+        planes: list[int] = []
+        for free in self.free_masks(day, span).values():
+            carry = free
+            for k, plane in enumerate(planes):
+                planes[k], carry = plane ^ carry, plane & carry
+                if not carry:
+                    break
+            if carry:
+                planes.append(carry)
+        return [
+            sum((plane >> bit & 1) << k for k, plane in enumerate(planes))
+            for bit in range(self.slots_per_day)
+        ]
+
+    def free_resources(
+        self, dt: datetime, span: int = 1, exclude_user: str | None = None
+    ) -> list[str]:
+        """Resources free for *span* slots from *dt* (``[]`` if off-grid)."""
+        cell = self.cell_of(dt)
+        if cell is None:
+            return []
+        day, bit = cell
+        masks = self.free_masks(day, span, exclude_user)
+        return [r for r, free in masks.items() if free >> bit & 1]
+
+    def is_free(self, dt: datetime, span: int = 1) -> bool:
+        cell = self.cell_of(dt)
+        return cell is not None and bool(self.free_mask(cell[0], span) >> cell[1] & 1)
+
+    def free_slots(
+        self,
+        after: datetime,
+        *,
+        days: int,
+        limit: int | None = None,
+        weekdays: Container[int] | None = None,
+        span: int = 1,
+        open_mask: Callable[[date], int] | None = None,
+    ) -> list[datetime]:
+        """Free slots starting at or after *after*, over the next *days* days.
+
+        ``weekdays`` restricts the scan to those ``date.weekday()`` values;
+        ``open_mask(day)`` limits it to the slots where the business is open.
+        """
+        return list(self._iter_free(after, days, limit, weekdays, span, open_mask))
+
+    def next_free(
+        self,
+        after: datetime,
+        *,
+        days: int,
+        span: int = 1,
+        open_mask: Callable[[date], int] | None = None,
+    ) -> datetime | None:
+        """First free slot strictly after *after* within *days* days."""
+        found = self._iter_free(
+            after + timedelta(seconds=1), days, 1, None, span, open_mask
+        )
+        return next(found, None)
+
+    def _iter_free(
+        self,
+        after: datetime,
+        days: int,
+        limit: int | None,
+        weekdays: Container[int] | None,
+        span: int,
+        open_mask: Callable[[date], int] | None,
+    ) -> Iterator[datetime]:
+        after = after.astimezone(self.tz)
+        first_day = after.date()
+        remaining = limit
+        for n in range(days):
+            day = first_day + timedelta(days=n)
+            if weekdays is not None and day.weekday() not in weekdays:
+                continue
+            free = self.free_mask(day, span)
+            if open_mask is not None:
+                free &= open_mask(day)
+            if n == 0:
+                free &= ~self._before_mask(after)
+            while free and remaining != 0:
+                low = free & -free
+                yield self.slot_at(day, low.bit_length() - 1)
+                free ^= low
+                if remaining is not None:
+                    remaining -= 1
+            if remaining == 0:
+                return
+
+    def _before_mask(self, dt: datetime) -> int:
+        """Bits of the slots on *dt*'s day that start before *dt*."""
+        offset = dt - datetime.combine(dt.date(), self.start, self.tz)
+        seconds = offset.total_seconds()
+        if seconds <= 0:
+            return 0
+        passed = min(math.ceil(seconds / (self.interval * 60)), self.slots_per_day)
+        return (1 << passed) - 1
+
+    # ------------------------------------------------------------------ updates
+
+    def _on_write(self, user: str, record: Record | None) -> None:
+        cells = self._cells(record)
+        with self._lock:
+            for old in self._by_user.pop(user, ()):
+                self._holders[old] -= 1
+                if self._holders[old] <= 0:
+                    del self._holders[old]
+                    self._set(old, False)
+            if cells:
+                self._by_user[user] = cells
+                for cell in cells:
+                    self._holders[cell] += 1
+                    self._set(cell, True)
+
+    def _set(self, cell: Cell, taken: bool) -> None:
+        resource, day, bit = cell
+        mask = self._taken.get((resource, day), 0)
+        mask = mask | (1 << bit) if taken else mask & ~(1 << bit)
+        if mask:
+            self._taken[resource, day] = mask
+        else:
+            self._taken.pop((resource, day), None)
@@ -0,0 +1,169 @@
+"""Storage engine interface shared by every bookings backend."""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Callable
+
+from src.utils.time_utils import slot_key
+
+Record = dict[str, Any]
+# (slot key, resource) pair a booking occupies
+Claim = tuple[int, str]
+# (first minute, end minute, resource) a booking blocks; minutes are slot keys
+Block = tuple[int, int, str]
+# called as listener(user, record) after every write; record is None on delete
+Listener = Callable[[str, "Record | None"], None]
+
+
+class VersionConflict(Exception):
+    """The record changed since it was read; re-read it and try again."""
+
+
+# resource assumed for records that predate multi-resource bookings
+DEFAULT_RESOURCE = "default"
+
+
+class SlotConflict(ValueError):
+    """Another customer's booking overlaps the requested time (and resource)."""
+
+    def __init__(self, message: str = "Slot already booked"):
+        super().__init__(message)
+
+
+def version_of(record: Record | None) -> int:
+    """Write counter of a record; absent and pre-versioning records are 0."""
+    return record.get("version", 0) if record else 0
+
+
+def slot_at_of(record: Record | None) -> datetime | None:
+    """The aware datetime stored in a record's ISO ``slot_at`` field."""
+    slot_at = record.get("slot_at") if record else None
+    return datetime.fromisoformat(slot_at) if slot_at else None
+
+
+def slot_key_of(record: Record | None) -> int | None:
+    """Canonical slot key of a record, read from its ISO ``slot_at`` field."""
+    dt = slot_at_of(record)
+    return slot_key(dt) if dt is not None else None
+
+
+def resource_of(record: Record | None) -> str:
+    """Staff member or room a booking consumes (``DEFAULT_RESOURCE`` if unset)."""
+    return (record.get("resource") if record else None) or DEFAULT_RESOURCE
+
+
+def claim_of(record: Record | None) -> Claim | None:
+    """The ``(slot_key, resource)`` a record starts on."""
+    key = slot_key_of(record)
+    return (key, resource_of(record)) if key is not None else None
+
+
+def block_of(record: Record | None) -> Block | None:
+    """The ``[start, end)`` minutes and resource a record blocks.
+
+    ``minutes`` (appointment length plus buffer) is written with each
+    booking; records without it block only their start minute.
+    """
+    key = slot_key_of(record)
+    if key is None:
+        return None
+    return key, key + max(1, int(record.get("minutes") or 1)), resource_of(record)
+
+
+def overlaps(a: Block, b: Block) -> bool:
+    """True if two blocks share a resource and at least one minute."""
+    return a[2] == b[2] and a[0] < b[1] and b[0] < a[1]
+
+
+class BookingStore(ABC):
+    """Per-user access to booking records.
+
+    Records are plain dicts keyed by the customer's WhatsApp number.
+    ``slot_at`` holds the booked slot as an aware ISO-8601 timestamp and is
+    what slot lookups index on; ``time`` is its customer-facing label and
+    ``resource`` the staff member or room it consumes and ``minutes`` how
+    long it blocks that resource. ``version`` is bumped by the store on
+    every write and backs :meth:`cas`.
+    """
+
+    name = "base"
+    _listeners: tuple[Listener, ...] = ()
+
+    @abstractmethod
+    def get(self, user: str) -> Record | None:
+        """Return the record for *user* or ``None``."""
+
+    @abstractmethod
+    def put(self, user: str, record: Record) -> None:
+        """Insert or replace the record for *user*."""
+
+    @abstractmethod
+    def delete(self, user: str) -> bool:
+        """Remove *user*'s record; return ``True`` if one existed."""
+
+    @abstractmethod
+    def cas(self, user: str, expected: int, record: Record | None) -> Record | None:
+        """Compare-and-swap *user*'s record.
+
+        Writes *record* (or deletes the row when it is ``None``) only if the
+        stored version still equals *expected* (0 for "no record"), and only
+        if no other user's booking overlaps it on the same resource (see
+        :func:`block_of`); both checks and the write are atomic. Returns the stored record with its new ``version``.
+
+        Raises :class:`VersionConflict` or :class:`SlotConflict`.
+        """
+
+    @abstractmethod
+    def load_all(self) -> dict[str, Record]:
+        """Return every record keyed by user."""
+
+    @abstractmethod
+    def users_for_slot(self, key: int) -> list[str]:
+        """Return the users whose booking has canonical slot *key*."""
+
+    def update(self, user: str, **fields: Any) -> Record:
+        """Merge *fields* into *user*'s record (creating it) and return it."""
+        record = self.get(user) or {}
+        record.update(fields)
+        self.put(user, record)
+        return record
+
+    def replace_all(self, bookings: dict[str, Record]) -> None:
+        """Make the store match *bookings*, writing only rows that changed."""
+        current = self.load_all()
+        for user, record in bookings.items():
+            if current.get(user) != record:
+                self.put(user, record)
+        for user in current.keys() - bookings.keys():
+            self.delete(user)
+
+    def subscribe(self, listener: Listener) -> None:
+        """Call *listener* after every write made through this store."""
+        self._listeners = (*self._listeners, listener)
+
+    def unsubscribe(self, listener: Listener) -> None:
+        self._listeners = tuple(l for l in self._listeners if l is not listener)
+
+    def _notify(self, user: str, record: Record | None) -> None:
+        for listener in self._listeners:
+            listener(user, record)
+
+    def sync_external(self) -> bool:
+        """Pass writes other processes made since the last call to listeners.
+
+        Listeners otherwise only see writes made through this object, so
+        callers that cache store contents call this before reading them.
+        Returns ``False`` when the missed writes can no longer be replayed;
+        the caller then rebuilds its cache. Stores that are single-process
+        by design have nothing to replay.
+        """
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        """Backend-specific counters (commit latency, batch sizes, ...)."""
+        return {}
+
+    def close(self) -> None:
+        """Release any handles held by the backend."""
@@ -0,0 +1,167 @@
+"""Group commit: coalesce concurrent durable writes into one flush.
+
+Writers hand a payload to :meth:`GroupCommitter.submit` and get a future
+that resolves once the payload is on disk. Depending on ``mode``:
+
+* ``fsync``   – every submit is flushed (and fsynced) immediately, inline.
+* ``batched`` – a flusher thread waits ``window_ms`` after the first pending
+  payload, then writes everything queued so far with one flush; callers
+  block until their batch is durable.
+* ``async``   – like ``batched`` but callers do not wait, so a crash can lose
+  the last window of writes.
+
+Submission order is flush order, so callers that submit while holding their
+own lock get a log that matches the order they applied changes in.
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+MODES = ("fsync", "batched", "async")
+DURABILITY = os.getenv("BOOKINGS_DURABILITY", "batched").lower()
+COMMIT_WINDOW_MS = float(os.getenv("BOOKINGS_COMMIT_WINDOW_MS", 2))
+
+
+class GroupCommitter(Generic[T]):
+    def __init__(
+        self,
+        flush: Callable[[list[T]], None],
+        *,
+        mode: str = DURABILITY,
+        window_ms: float = COMMIT_WINDOW_MS,
+        max_batch: int = 512,
+        name: str = "group-commit",
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown durability mode {mode!r}; choose from {MODES}")
+        self.mode = mode
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._flush = flush
+        self._cond = threading.Condition()
+        self._pending: list[tuple[T, Future, float]] = []
+        self._inflight = 0
+        self._closed = False
+
+        # metrics
+        self._commits = 0
+        self._flushes = 0
+        self._batch_max = 0
+        self._latencies: deque[float] = deque(maxlen=2048)
+        self._batch_sizes: deque[int] = deque(maxlen=2048)
+
+        self._thread: threading.Thread | None = None
+        if mode != "fsync":
+            self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+            self._thread.start()
+
+    # ------------------------------------------------------------------ api
+
+    def submit(self, item: T) -> Future:
+        """Queue *item* for the next flush and return its commit future."""
+        fut: Future = Future()
+        submitted = time.perf_counter()
+        if self.mode == "fsync":
+            with self._cond:
+                self._run_batch([(item, fut, submitted)])
+            return fut
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("GroupCommitter is closed")
+            self._pending.append((item, fut, submitted))
+            self._cond.notify_all()
+        return fut
+
+    def wait(self, fut: Future) -> None:
+        """Block until *fut* is durable (a no-op in ``async`` mode)."""
+        if self.mode != "async":
+            fut.result()
+
+    def commit(self, item: T) -> None:
+        self.wait(self.submit(item))
+
+    def drain(self) -> None:
+        """Block until every submitted item has been flushed."""
+        with self._cond:
+            while self._pending or self._inflight:
+                self._cond.wait()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def stats(self) -> dict[str, float | int | str]:
+        with self._cond:
+            latencies = sorted(self._latencies)
+            sizes = list(self._batch_sizes)
+            stats = {
+                "mode": self.mode,
+                "commits": self._commits,
+                "flushes": self._flushes,
+                "pending": len(self._pending),
+                "batch_size_max": self._batch_max,
+            }
+        stats["batch_size_avg"] = round(statistics.fmean(sizes), 2) if sizes else 0
+        for label, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+            value = latencies[int(q * (len(latencies) - 1))] if latencies else 0.0
+            stats[f"commit_latency_ms_{label}"] = round(value * 1000, 3)
+        return stats
+
+    # ------------------------------------------------------------------ flusher
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return  # closed and drained
+                # give concurrent writers a moment to join this batch
+                deadline = time.perf_counter() + self.window
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[: self.max_batch]
+                del self._pending[: self.max_batch]
+                self._inflight += 1
+            try:
+                self._run_batch(batch)
+            finally:
+                with self._cond:
+                    self._inflight -= 1
+                    self._cond.notify_all()
+
+    def _run_batch(self, batch: list[tuple[T, Future, float]]) -> None:
+        error: BaseException | None = None
+        try:
+            self._flush([item for item, _, _ in batch])
+        except BaseException as exc:  # surface to every waiter
+            error = exc
+        done = time.perf_counter()
+        with self._cond:
+            self._latencies.extend(done - submitted for _, _, submitted in batch)
+            self._commits += len(batch)
+            self._flushes += 1
+            self._batch_max = max(self._batch_max, len(batch))
+            self._batch_sizes.append(len(batch))
+        for _, fut, _ in batch:
+            if error is None:
+                fut.set_result(None)
+            else:
+                fut.set_exception(error)
+        if error is not None:
+            print(f"❌ Bookings flush failed ({len(batch)} write(s)): {error}")
@@ -0,0 +1,373 @@
+"""Append-only journal backend: snapshot file + mutation log.
+
+State lives in memory. Each change is applied in memory and appended to
+``bookings.log`` as one small JSON line (``put``, ``patch`` or ``del``), so a
+write costs the size of the change rather than the size of the dataset.
+Appends go through a :class:`~src.storage.group_commit.GroupCommitter`:
+concurrent writers share one write + fsync and, unless the durability mode
+is ``async``, return only once their line is on disk. If an append fails,
+the torn bytes are cut from the log and the in-memory state is reloaded from
+disk (listeners are told of every record that reverts), so nothing the caller
+was told failed stays visible. Once the log holds ``compact_every`` records a background thread
+writes a fresh snapshot to ``bookings.json`` (the same format the JSON
+backend uses) and drops the log prefix it covers.
+
+Recovery reads the snapshot and replays the log; a torn final line left by a
+crash mid-append is discarded. Replaying entries already folded into the
+snapshot is harmless because every entry sets absolute values.
+
+The journal is owned by a single process; run the SQLite backend when
+several workers share the bookings.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any
+
+from src.storage.base import (
+    BookingStore,
+    Record,
+    Block,
+    SlotConflict,
+    VersionConflict,
+    block_of,
+    version_of,
+)
+from src.storage.group_commit import COMMIT_WINDOW_MS, DURABILITY, GroupCommitter
+from src.storage.json_store import read_json, write_json_atomic
+
+Entry = dict[str, Any]
+
+COMPACT_EVERY = int(os.getenv("BOOKINGS_COMPACT_EVERY", 1000))
+
+
+class JournalStore(BookingStore):
+    name = "journal"
+
+    def __init__(
+        self,
+        path: Path | str,
+        *,
+        compact_every: int = COMPACT_EVERY,
+        durability: str = DURABILITY,
+        window_ms: float = COMMIT_WINDOW_MS,
+    ):
+        self.path = Path(path)
+        self.log_path = self.path.with_suffix(".log")
+        self.compact_every = compact_every
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._compactor: threading.Thread | None = None
+        self._failed = False  # an append failed; memory is ahead of the disk
+        self._data, self._log_records = self._recover()
+        # start slot key -> {user: (resource, end key)}, for atomic overlap
+        # checks in cas(); no block is longer than _longest minutes
+        self._claims: dict[int, dict[str, tuple[str, int]]] = {}
+        self._longest = 1
+        for user, record in self._data.items():
+            self._claim(user, None, block_of(record))
+        self._log = open(self.log_path, "ab")
+        self._committer: GroupCommitter[bytes] = GroupCommitter(
+            self._write_log,
+            mode=durability,
+            window_ms=window_ms,
+            name="bookings-journal",
+        )
+        if not self.path.exists():
+            write_json_atomic(self.path, self._data)
+
+    # ------------------------------------------------------------------ recovery
+
+    def _recover(self) -> tuple[dict[str, Record], int]:
+        data = read_json(self.path)
+        if not self.log_path.exists():
+            return data, 0
+
+        applied, good_bytes = _replay(data, self.log_path)
+        if good_bytes < self.log_path.stat().st_size:
+            print(
+                f"⚠️ Journal: discarding torn tail of {self.log_path.name} "
+                f"after {applied} record(s)"
+            )
+            os.truncate(self.log_path, good_bytes)
+        return data, applied
+
+    @staticmethod
+    def _apply(data: dict[str, Record], entry: Entry) -> None:
+        op, user = entry["op"], entry["user"]
+        if op == "put":
+            data[user] = entry["rec"]
+        elif op == "patch":
+            data.setdefault(user, {}).update(entry["fields"])
+        elif op == "del":
+            data.pop(user, None)
+
+    # ------------------------------------------------------------------ log io
+
+    def _write_log(self, payloads: list[bytes]) -> None:
+        """Flush callback: one write + fsync for a whole batch of appends."""
+        start = self._log.tell()
+        try:
+            self._log.write(b"".join(payloads))
+            self._log.flush()
+            os.fsync(self._log.fileno())
+        except BaseException:
+            # cut the torn batch so later appends follow whole lines
+            self._failed = True
+            with contextlib.suppress(OSError):
+                self._log.close()
+            try:
+                os.truncate(self.log_path, start)
+            finally:
+                self._log = open(self.log_path, "ab")
+            raise
+
+    def _restore(self) -> None:
+        """Reload the on-disk state after a failed append.
+
+        Call with the lock held once the committer has drained.
+        """
+        if not self._failed:
+            return
+        self._failed = False
+        data = read_json(self.path)
+        self._log_records = _replay(data, self.log_path)[0]
+        changed = [
+            user
+            for user in self._data.keys() | data.keys()
+            if self._data.get(user) != data.get(user)
+        ]
+        self._data, self._claims, self._longest = data, {}, 1
+        for user, record in data.items():
+            self._claim(user, None, block_of(record))
+        for user in changed:
+            self._notify(user, data.get(user))
+
+    def _enqueue(self, entries: list[Entry]) -> Future | None:
+        """Apply *entries* and queue their log line; call with the lock held.
+
+        Submitting under the lock keeps the log in the order changes were
+        applied; waiting for the flush happens in :meth:`_commit`, outside it,
+        which rolls everything back if the flush fails.
+        """
+        if not entries:
+            return None
+        payload = b"".join(
+            json.dumps(e, separators=(",", ":")).encode() + b"\n" for e in entries
+        )
+        for entry in entries:
+            user = entry["user"]
+            old = block_of(self._data.get(user))
+            self._apply(self._data, entry)
+            self._claim(user, old, block_of(self._data.get(user)))
+        self._log_records += len(entries)
+        fut = self._committer.submit(payload)
+        for entry in entries:
+            self._notify(entry["user"], self._data.get(entry["user"]))
+        return fut
+
+    def _claim(self, user: str, old: Block | None, new: Block | None) -> None:
+        if old == new:
+            return
+        if old is not None:
+            holders = self._claims.get(old[0])
+            if holders is not None:
+                holders.pop(user, None)
+                if not holders:
+                    del self._claims[old[0]]
+        if new is not None:
+            start, end, resource = new
+            self._claims.setdefault(start, {})[user] = (resource, end)
+            self._longest = max(self._longest, end - start)
+
+    def _claimed(self, block: Block, user: str) -> bool:
+        """True if someone other than *user* blocks time that *block* needs."""
+        start, end, resource = block
+        # only bookings starting in this window can reach into the block
+        for key in range(start - self._longest + 1, end):
+            holders = self._claims.get(key)
+            if holders and any(
+                r == resource and other_end > start and u != user
+                for u, (r, other_end) in holders.items()
+            ):
+                return True
+        return False
+
+    def _versioned(self, user: str, record: Record) -> Record:
+        return {**record, "version": version_of(self._data.get(user)) + 1}
+
+    def _commit(self, fut: Future | None) -> None:
+        if fut is None:
+            return
+        try:
+            self._committer.wait(fut)
+        finally:
+            if self._failed:
+                with self._lock:
+                    self._committer.drain()
+                    self._restore()
+        if self._log_records >= self.compact_every:
+            self._compact_in_background()
+
+    def _append(self, entries: list[Entry]) -> None:
+        with self._lock:
+            fut = self._enqueue(entries)
+        self._commit(fut)
+
+    # ------------------------------------------------------------------ api
+
+    def get(self, user: str) -> Record | None:
+        with self._lock:
+            record = self._data.get(user)
+            return dict(record) if record is not None else None
+
+    def put(self, user: str, record: Record) -> None:
+        with self._lock:
+            rec = self._versioned(user, record)
+            fut = self._enqueue([{"op": "put", "user": user, "rec": rec}])
+        self._commit(fut)
+
+    def delete(self, user: str) -> bool:
+        with self._lock:
+            if user not in self._data:
+                return False
+            fut = self._enqueue([{"op": "del", "user": user}])
+        self._commit(fut)
+        return True
+
+    def update(self, user: str, **fields: Any) -> Record:
+        with self._lock:
+            fields["version"] = version_of(self._data.get(user)) + 1
+            fut = self._enqueue([{"op": "patch", "user": user, "fields": fields}])
+            record = dict(self._data[user])
+        self._commit(fut)
+        return record
+
+    def cas(self, user: str, expected: int, record: Record | None) -> Record | None:
+        with self._lock:
+            current = self._data.get(user)
+            if version_of(current) != expected:
+                raise VersionConflict(user)
+            if record is None:
+                if current is None:
+                    return None
+                fut = self._enqueue([{"op": "del", "user": user}])
+                stored = None
+            else:
+                block = block_of(record)
+                if block is not None and self._claimed(block, user):
+                    raise SlotConflict()
+                stored = self._versioned(user, record)
+                fut = self._enqueue([{"op": "put", "user": user, "rec": stored}])
+        self._commit(fut)
+        return dict(stored) if stored is not None else None
+
+    def load_all(self) -> dict[str, Record]:
+        with self._lock:
+            return {user: dict(rec) for user, rec in self._data.items()}
+
+    def users_for_slot(self, key: int) -> list[str]:
+        with self._lock:
+            return sorted(self._claims.get(key, ()))
+
+    def replace_all(self, bookings: dict[str, Record]) -> None:
+        with self._lock:
+            entries: list[Entry] = [
+                {"op": "put", "user": user, "rec": self._versioned(user, record)}
+                for user, record in bookings.items()
+                if self._data.get(user) != record
+            ]
+            entries += [
+                {"op": "del", "user": user}
+                for user in self._data.keys() - bookings.keys()
+            ]
+            fut = self._enqueue(entries)
+        self._commit(fut)
+
+    def stats(self) -> dict[str, Any]:
+        return {"log_records": self._log_records, **self._committer.stats()}
+
+    def close(self) -> None:
+        self._committer.close()
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        if self._log_records:
+            self.compact()
+        self._log.close()
+
+    # ------------------------------------------------------------------ compaction
+
+    def _compact_in_background(self) -> None:
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(
+                target=self.compact, name="bookings-compactor", daemon=True
+            )
+            self._compactor.start()
+
+    def compact(self) -> None:
+        """Fold the log into a new snapshot and keep only the uncovered tail."""
+        with self._lock:
+            self._committer.drain()
+            self._restore()
+            snapshot = {user: dict(rec) for user, rec in self._data.items()}
+            covered_bytes = self._log.tell()
+            covered_records = self._log_records
+
+        # the slow part (serialising everything) runs without the lock
+        write_json_atomic(self.path, snapshot)
+
+        with self._lock:
+            self._committer.drain()
+            self._log.close()
+            with open(self.log_path, "rb") as f:
+                f.seek(covered_bytes)
+                tail = f.read()
+            tmp = self.log_path.with_suffix(".log.tmp")
+            with open(tmp, "wb") as f:
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.log_path)
+            self._log = open(self.log_path, "ab")
+            self._log_records -= covered_records
+
+
+def _replay(data: dict[str, Record], log_path: Path) -> tuple[int, int]:
+    """Apply *log_path*'s entries to *data* up to the first torn line.
+
+    Returns the number of entries applied and the bytes they span.
+    """
+    applied = good_bytes = 0
+    with open(log_path, "rb") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            JournalStore._apply(data, entry)
+            applied += 1
+            good_bytes += len(line)
+    return applied, good_bytes
+
+
+def read_journal(path: Path | str) -> dict[str, Record]:
+    """The bookings a journal at *path* holds: snapshot plus log.
+
+    Read-only, unlike opening a :class:`JournalStore`: a torn final log line
+    is skipped rather than truncated, and nothing is compacted.
+    """
+    path = Path(path)
+    data = read_json(path)
+    log_path = path.with_suffix(".log")
+    if log_path.exists():
+        _replay(data, log_path)
+    return data
@@ -0,0 +1,141 @@
+"""Legacy single-file JSON backend (``data/bookings.json``).
+
+Every mutation rewrites the whole file, so this backend is kept for
+compatibility and for tools that read the file directly; the journal backend
+(:mod:`src.storage.journal_store`) uses the same file as its snapshot.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+from src.storage.base import (
+    BookingStore,
+    Record,
+    SlotConflict,
+    VersionConflict,
+    block_of,
+    overlaps,
+    slot_key_of,
+    version_of,
+)
+
+
+def read_json(path: Path) -> dict[str, Record]:
+    """Load a bookings dict from *path*; missing or corrupt files read as empty."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def write_json_atomic(path: Path, bookings: dict[str, Record]) -> None:
+    """Write *bookings* to a temp file, fsync it, then rename over *path*."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(bookings, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())  # guarantee bytes hit disk
+    shutil.move(tmp, path)
+
+
+class JsonStore(BookingStore):
+    name = "json"
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.path.exists():
+            self._write({})
+
+    # ------------------------------------------------------------------ file io
+
+    def _read(self) -> dict[str, Record]:
+        return read_json(self.path)
+
+    def _write(self, bookings: dict[str, Record]) -> None:
+        write_json_atomic(self.path, bookings)
+
+    # ------------------------------------------------------------------ api
+
+    def get(self, user: str) -> Record | None:
+        return self._read().get(user)
+
+    def put(self, user: str, record: Record) -> None:
+        with self._lock:
+            data = self._read()
+            record = {**record, "version": version_of(data.get(user)) + 1}
+            data[user] = record
+            self._write(data)
+        self._notify(user, record)
+
+    def cas(self, user: str, expected: int, record: Record | None) -> Record | None:
+        # atomic within this process only; share bookings between processes
+        # with the SQLite backend
+        with self._lock:
+            data = self._read()
+            current = data.get(user)
+            if version_of(current) != expected:
+                raise VersionConflict(user)
+            if record is None:
+                if current is None:
+                    return None
+                del data[user]
+            else:
+                block = block_of(record)
+                if block is not None and any(
+                    (other := block_of(rec)) is not None and overlaps(block, other)
+                    for u, rec in data.items()
+                    if u != user
+                ):
+                    raise SlotConflict()
+                record = {**record, "version": expected + 1}
+                data[user] = record
+            self._write(data)
+        self._notify(user, record)
+        return record
+
+    def delete(self, user: str) -> bool:
+        with self._lock:
+            data = self._read()
+            if user not in data:
+                return False
+            del data[user]
+            self._write(data)
+        self._notify(user, None)
+        return True
+
+    def load_all(self) -> dict[str, Record]:
+        return self._read()
+
+    def users_for_slot(self, key: int) -> list[str]:
+        return [u for u, rec in self._read().items() if slot_key_of(rec) == key]
+
+    def update(self, user: str, **fields) -> Record:
+        with self._lock:
+            return super().update(user, **fields)
+
+    def replace_all(self, bookings: dict[str, Record]) -> None:
+        with self._lock:
+            current = self._read()
+            bookings = {
+                user: (
+                    record
+                    if current.get(user) == record
+                    else {**record, "version": version_of(current.get(user)) + 1}
+                )
+                for user, record in bookings.items()
+            }
+            self._write(bookings)
+        for user, record in bookings.items():
+            if current.get(user) != record:
+                self._notify(user, record)
+        for user in current.keys() - bookings.keys():
+            self._notify(user, None)
@@ -0,0 +1,140 @@
+"""Copy bookings between storage backends.
+
+Usage::
+
+    python -m src.storage.migrate        # data/bookings.json + .log -> data/bookings.db
+    python -m src.storage.migrate --source old.json --source-backend json --dest new.db
+    python -m src.storage.migrate --in-place   # only add slot_at to legacy rows
+
+The source defaults to the journal backend (the runtime default): its
+snapshot plus every write still in ``bookings.log``. The destination is
+overwritten so the command can be re-run safely; the source files are
+never modified (the journal is replayed read-only, without compaction).
+Copied bookings are canonicalized: legacy rows that only carry a label such
+as ``"Wednesday 3:15 PM"`` get an absolute ``slot_at`` timestamp for the
+next occurrence of that label.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+from src.storage import (
+    BOOKINGS_DB,
+    BOOKINGS_FILE,
+    BookingStore,
+    Record,
+    get_store,
+    open_store,
+)
+from src.storage.journal_store import read_journal
+from src.storage.json_store import read_json
+from src.utils.time_utils import format_slot
+
+
+def migrate(source: BookingStore | dict[str, Record], dest: BookingStore) -> int:
+    """Copy every record from *source* (a store or the bookings it holds) into
+    *dest*; return how many moved."""
+    bookings = source if isinstance(source, dict) else source.load_all()
+    dest.replace_all(bookings)
+    return len(bookings)
+
+
+def read_source(backend: str, path: Path) -> dict[str, Record]:
+    """Every booking stored at *path* by *backend*, without writing to it."""
+    if backend == "journal":
+        return read_journal(path)
+    if backend == "json":
+        return read_json(path)
+    source = open_store(backend, path)
+    try:
+        return source.load_all()
+    finally:
+        source.close()
+
+
+def copy_bookings(
+    source: Path,
+    dest: Path,
+    source_backend: str = "journal",
+    dest_backend: str = "sqlite",
+) -> int:
+    """Copy the bookings at *source* into a canonicalized store at *dest*."""
+    bookings = read_source(source_backend, source)
+    store = open_store(dest_backend, dest)
+    try:
+        count = migrate(bookings, store)
+        canonicalize(store)
+    finally:
+        store.close()
+    return count
+
+
+def canonicalize(
+    store: BookingStore,
+    resolve: Callable[[str], datetime | None] | None = None,
+    resource: str | None = None,
+) -> int:
+    """Give every legacy booking an absolute ``slot_at``; return how many changed.
+
+    ``resolve`` turns a stored label into a datetime and defaults to the slot
+    parser. With *resource*, bookings that predate resources are assigned
+    to it. Rows that are already canonical are left alone, so this is cheap
+    to run on every startup.
+    """
+    if resolve is None:
+        from src.utils.slot_parser import parse_slot_dt as resolve
+
+    changed = 0
+    for user, record in store.load_all().items():
+        fields = {}
+        label = record.get("time")
+        if label and not record.get("slot_at"):
+            dt = resolve(label)
+            if dt is None:
+                print(f"⚠️ Could not resolve booking for {user}: {label!r}")
+            else:
+                fields.update(slot_at=dt.isoformat(), time=format_slot(dt))
+        if resource and label and "resource" not in record:
+            fields["resource"] = resource
+        if fields:
+            store.update(user, **fields)
+            changed += 1
+    return changed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", type=Path, default=BOOKINGS_FILE)
+    parser.add_argument("--source-backend", default="journal")
+    parser.add_argument("--dest", type=Path, default=BOOKINGS_DB)
+    parser.add_argument("--dest-backend", default="sqlite")
+    parser.add_argument(
+        "--in-place",
+        action="store_true",
+        help="canonicalize the configured store instead of copying",
+    )
+    args = parser.parse_args(argv)
+
+    if args.in_place:
+        count = canonicalize(get_store())
+        print(f"✅ Canonicalized {count} legacy booking(s)")
+        return 0
+
+    if not args.source.exists():
+        print(f"⚠️ Nothing to migrate: {args.source} does not exist.")
+        return 1
+
+    count = copy_bookings(
+        args.source, args.dest, args.source_backend, args.dest_backend
+    )
+    print(f"✅ Migrated {count} booking(s) {args.source} → {args.dest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
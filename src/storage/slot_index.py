@@ -0,0 +1,84 @@
+"""In-memory slot → occupant index kept in sync with a :class:`BookingStore`.
+
+The index is built once from the store and then updated from the store's
+write notifications, so collision checks never rescan or re-parse stored
+bookings.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable, Hashable
+
+from src.storage.base import BookingStore, Record
+
+
+class SlotIndex:
+    """Maps a canonical slot key to the users holding it.
+
+    ``key_of(record)`` turns a booking record into its canonical slot key (or
+    ``None`` when the record holds no slot); it runs once per write.
+    """
+
+    def __init__(
+        self, store: BookingStore, key_of: Callable[[Record], Hashable | None]
+    ):
+        self.store = store
+        self._key_of = key_of
+        self._lock = threading.Lock()
+        self._by_slot: dict[Hashable, set[str]] = {}
+        self._by_user: dict[str, Hashable] = {}
+        store.subscribe(self._on_write)
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """Recompute the index from a full scan of the store."""
+        by_slot: dict[Hashable, set[str]] = {}
+        by_user: dict[str, Hashable] = {}
+        for user, record in self.store.load_all().items():
+            key = self._key_of(record)
+            if key is not None:
+                by_slot.setdefault(key, set()).add(user)
+                by_user[user] = key
+        with self._lock:
+            self._by_slot, self._by_user = by_slot, by_user
+
+    def close(self) -> None:
+        self.store.unsubscribe(self._on_write)
+
+    # ------------------------------------------------------------------ queries
+
+    def occupants(self, key: Hashable) -> frozenset[str]:
+        with self._lock:
+            return frozenset(self._by_slot.get(key, ()))
+
+    def is_taken(self, key: Hashable, exclude_user: str | None = None) -> bool:
+        with self._lock:
+            users = self._by_slot.get(key)
+            if not users:
+                return False
+            return bool(users - {exclude_user}) if exclude_user else True
+
+    def slot_of(self, user: str) -> Hashable | None:
+        with self._lock:
+            return self._by_user.get(user)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._by_user)
+
+    # ------------------------------------------------------------------ updates
+
+    def _on_write(self, user: str, record: Record | None) -> None:
+        key = self._key_of(record) if record else None
+        with self._lock:
+            old = self._by_user.pop(user, None)
+            if old is not None:
+                users = self._by_slot.get(old)
+                if users is not None:
+                    users.discard(user)
+                    if not users:
+                        del self._by_slot[old]
+            if key is not None:
+                self._by_slot.setdefault(key, set()).add(user)
+                self._by_user[user] = key
@@ -0,0 +1,301 @@
+"""Embedded SQLite backend running in WAL mode.
+
+One row per customer, so booking writes touch a single row regardless of how
+many customers exist. Every write also appends the user to a ``change_log``
+table, tagged with the writing store, so each process can replay what
+*another* process wrote (see :meth:`SqliteStore.sync_external`); the log
+keeps the last ``BOOKINGS_CHANGE_LOG`` entries. ``slot_key`` (minutes since
+the epoch, derived from ``record["slot_at"]``), ``end_key`` (where the
+booking's blocked time ends) and ``resource`` are indexed for collision and
+overlap lookups; ``slot`` keeps the display label for people poking at the
+database by hand.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from src.storage.base import (
+    BookingStore,
+    Record,
+    SlotConflict,
+    VersionConflict,
+    block_of,
+    resource_of,
+    slot_key_of,
+    version_of,
+)
+from src.storage.group_commit import DURABILITY
+
+# SQLite already batches WAL syncs itself; map our durability modes onto it
+_SYNCHRONOUS = {"fsync": "FULL", "batched": "NORMAL", "async": "OFF"}
+
+SCHEMA_VERSION = 1
+
+# change-log entries kept for other processes to catch up from
+CHANGE_LOG_KEEP = int(os.getenv("BOOKINGS_CHANGE_LOG", 10_000))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    user TEXT PRIMARY KEY,
+    slot TEXT,
+    slot_key INTEGER,
+    resource TEXT,
+    end_key INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bookings_slot_key ON bookings(slot_key, resource);
+CREATE INDEX IF NOT EXISTS idx_bookings_resource_end ON bookings(resource, end_key);
+CREATE TABLE IF NOT EXISTS change_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL,
+    writer TEXT NOT NULL
+);
+"""
+
+
+class SqliteStore(BookingStore):
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: Path | str,
+        *,
+        durability: str = DURABILITY,
+        change_log_keep: int = CHANGE_LOG_KEEP,
+    ):
+        self.path = Path(path)
+        self.durability = durability
+        self._synchronous = _SYNCHRONOUS[durability]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # one connection per thread: the webhook, the reminder job and any
+        # executor threads each get their own handle onto the WAL
+        self._local = threading.local()
+        self._conns: list[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+        self.change_log_keep = max(1, change_log_keep)
+        # tags this store's change-log entries so sync_external skips them
+        self._writer = uuid.uuid4().hex
+        self._sync_lock = threading.Lock()
+        self._init_schema()
+        self._seen_seq = self._last_seq()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA busy_timeout=5000")  # first: workers start together
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self._synchronous}")
+            self._local.conn = conn
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    def _init_schema(self) -> None:
+        """Create the schema, or check that an existing database matches it.
+
+        Runs under ``BEGIN IMMEDIATE`` so workers starting together cannot
+        race; an upgrade step, should one ever be needed, belongs inside the
+        same transaction.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, SCHEMA_VERSION):
+                raise RuntimeError(
+                    f"{self.path} has bookings schema v{version}; "
+                    f"this release reads v{SCHEMA_VERSION}"
+                )
+            for statement in _SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        """Run the block in one write transaction (joining an open one).
+
+        ``BEGIN IMMEDIATE`` takes SQLite's write lock up front, so the
+        read-check-write sequences below are atomic across threads *and*
+        processes. Listeners are notified only after ``COMMIT``.
+        """
+        conn = self._conn()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.notify = []
+        try:
+            yield conn
+            self._log_changes(conn, [user for user, _ in self._local.notify])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            pending, self._local.notify = self._local.notify, []
+        for user, record in pending:
+            self._notify(user, record)
+
+    def _write(self, conn: sqlite3.Connection, user: str, record: Record) -> Record:
+        record = {**record, "version": version_of(self.get(user)) + 1}
+        self._upsert(conn, user, record)
+        self._local.notify.append((user, record))
+        return record
+
+    # ------------------------------------------------------------------ api
+
+    def get(self, user: str) -> Record | None:
+        row = (
+            self._conn()
+            .execute("SELECT data FROM bookings WHERE user = ?", (user,))
+            .fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    def put(self, user: str, record: Record) -> None:
+        with self._tx() as conn:
+            self._write(conn, user, record)
+
+    def delete(self, user: str) -> bool:
+        with self._tx() as conn:
+            cur = conn.execute("DELETE FROM bookings WHERE user = ?", (user,))
+            if cur.rowcount:
+                self._local.notify.append((user, None))
+        return cur.rowcount > 0
+
+    def cas(self, user: str, expected: int, record: Record | None) -> Record | None:
+        with self._tx() as conn:
+            current = self.get(user)
+            if version_of(current) != expected:
+                raise VersionConflict(user)
+            if record is None:
+                if current is not None:
+                    conn.execute("DELETE FROM bookings WHERE user = ?", (user,))
+                    self._local.notify.append((user, None))
+                return None
+            block = block_of(record)
+            if (
+                block is not None
+                and conn.execute(
+                    # the (resource, end_key) index limits the scan to
+                    # bookings that end after this one starts
+                    "SELECT 1 FROM bookings WHERE resource = ? AND end_key > ? "
+                    "AND slot_key < ? AND user != ? LIMIT 1",
+                    (block[2], block[0], block[1], user),
+                ).fetchone()
+            ):
+                raise SlotConflict()
+            return self._write(conn, user, record)
+
+    def load_all(self) -> dict[str, Record]:
+        rows = self._conn().execute("SELECT user, data FROM bookings").fetchall()
+        return {user: json.loads(data) for user, data in rows}
+
+    def users_for_slot(self, key: int) -> list[str]:
+        rows = (
+            self._conn()
+            .execute("SELECT user FROM bookings WHERE slot_key = ?", (key,))
+            .fetchall()
+        )
+        return [r[0] for r in rows]
+
+    def update(self, user: str, **fields) -> Record:
+        with self._tx() as conn:
+            record = self.get(user) or {}
+            record.update(fields)
+            return self._write(conn, user, record)
+
+    def replace_all(self, bookings: dict[str, Record]) -> None:
+        with self._tx():
+            super().replace_all(bookings)
+
+    def sync_external(self) -> bool:
+        """Replay other processes' writes since the last call to the listeners.
+
+        Reads the change-log entries past the last one seen (one primary-key
+        range read, empty when nothing changed) and passes each foreign
+        user's current record on. Returns ``False`` if entries were pruned
+        before this store saw them.
+        """
+        with self._sync_lock:
+            rows = (
+                self._conn()
+                .execute(
+                    "SELECT seq, user, writer FROM change_log WHERE seq > ? "
+                    "ORDER BY seq",
+                    (self._seen_seq,),
+                )
+                .fetchall()
+            )
+            if not rows:
+                return True
+            complete = rows[0][0] == self._seen_seq + 1
+            self._seen_seq = rows[-1][0]
+            users = dict.fromkeys(u for _, u, w in rows if w != self._writer)
+            for user in users:
+                self._notify(user, self.get(user))
+        return complete
+
+    def close(self) -> None:
+        with self._conns_lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns.clear()
+        self._local = threading.local()
+
+    # ------------------------------------------------------------------ helpers
+
+    def _last_seq(self) -> int:
+        row = self._conn().execute("SELECT MAX(seq) FROM change_log").fetchone()
+        return row[0] or 0
+
+    def _log_changes(self, conn: sqlite3.Connection, users: list[str]) -> None:
+        """Record *users* as written by this store; trim the log's head."""
+        if not users:
+            return
+        conn.executemany(
+            "INSERT INTO change_log (user, writer) VALUES (?, ?)",
+            [(user, self._writer) for user in users],
+        )
+        last = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        # prune in batches rather than on every write
+        if last % 256 < len(users):
+            conn.execute(
+                "DELETE FROM change_log WHERE seq <= ?",
+                (last - self.change_log_keep,),
+            )
+
+    @staticmethod
+    def _upsert(conn: sqlite3.Connection, user: str, record: Record) -> None:
+        block = block_of(record)
+        conn.execute(
+            "INSERT INTO bookings (user, slot, slot_key, resource, end_key, data) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(user) DO UPDATE SET slot = excluded.slot, "
+            "slot_key = excluded.slot_key, resource = excluded.resource, "
+            "end_key = excluded.end_key, data = excluded.data",
+            (
+                user,
+                record.get("time"),
+                slot_key_of(record),
+                resource_of(record),
+                block[1] if block is not None else None,
+                json.dumps(record),
+            ),
+        )
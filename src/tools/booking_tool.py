@@ -1,12 +1,12 @@
 import re
 from typing import Optional
 
-from langchain.tools import StructuredTool
 from pydantic import BaseModel, Field
 
 from src.handlers.booking_handler import get_booking_options, save_individual_booking
 from src.tools.check_availability_tool import check_availability
-from src.utils.slot_parser import parse_slot
+from src.utils.slot_parser import parse_slot_dt
+from src.utils.time_utils import format_slot
 
 
 class BookingInput(BaseModel):
@@ -32,9 +32,7 @@ def book_appointment(
       - If neither: ask for day/time.
     """
     # 1️⃣ Load current options
-    raw = get_booking_options(desired_day=day)
-    options = [line.strip() for line in raw.split("\n") if re.match(r"^\s*\d", line)]
-    slots = [re.sub(r"^\s*\d+\.?\s*", "", s) for s in options]
+    slots = get_booking_options(desired_day=day or "", raw=True)
 
     # 2️⃣ First-contact: show menu
     if not user_message:
@@ -55,12 +53,12 @@ def book_appointment(
                 return "slot_taken"
 
     # 4️⃣ Natural-language parsing
-    natural = parse_slot(text)
+    natural = parse_slot_dt(text)
     if natural:
         avail = check_availability(natural, user_number=number)
         if avail == "available":
             save_individual_booking(number, natural)
-            return f"booked::{natural}"
+            return f"booked::{format_slot(natural)}"
         if avail.startswith("nearest::"):
             # suggest alternative
             alt = avail.split("::", 1)[1]
@@ -71,13 +69,20 @@ def book_appointment(
     return "ask_day"
 
 
-# Wrap as a StructuredTool for LangChain agents
-BookingTool = StructuredTool.from_function(
-    func=book_appointment,
-    name="BookingTool",
-    args_schema=BookingInput,
-    description=(
-        "Handles appointment bookings, interprets natural-language times and numeric selections, "
-        "and suggests nearest available slots when requested time is taken."
-    ),
-)
+def __getattr__(name: str):
+    # Wrap as a StructuredTool for LangChain agents, on first use, so that
+    # importing the booking logic (receiver.py) doesn't load LangChain
+    if name != "BookingTool":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from langchain.tools import StructuredTool
+
+    tool = globals()["BookingTool"] = StructuredTool.from_function(
+        func=book_appointment,
+        name="BookingTool",
+        args_schema=BookingInput,
+        description=(
+            "Handles appointment bookings, interprets natural-language times and numeric selections, "
+            "and suggests nearest available slots when requested time is taken."
+        ),
+    )
+    return tool
@@ -2,69 +2,71 @@
 
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional
 
-from langchain.tools import StructuredTool
 from pydantic import BaseModel, Field
 
-from src.handlers.booking_handler import load_bookings, slot_taken
+from src.handlers.booking_handler import next_free_slot, slot_taken
+from src.utils.slot_parser import parse_slot_dt
+from src.utils.time_utils import format_slot, now_local
 
 
 class CheckAvailInput(BaseModel):
     """Input schema used by :data:`CheckAvailabilityTool`."""
 
     slot: str = Field(
-        ..., description="Desired slot formatted as 'Wednesday 3:30 PM'."
+        ..., description="Desired slot formatted as 'Wednesday 11 March 3:30 PM'."
     )
     user_number: str = Field(
         ..., description="Caller phone number (used to ignore their own booking)."
     )
 
 
-def _nearest_free_slot(
-    start: datetime, bookings: dict, *, max_checks: int = 16
-) -> Optional[str]:
-    """Return the first untaken 15-minute slot after ``start``.
+def _nearest_free_slot(start: datetime) -> Optional[str]:
+    """Return the first free bookable slot after ``start``.
 
-    ``max_checks`` bounds the search to roughly four hours.
+    One scan over the business calendar and the per-day availability
+    bitmaps, up to the booking horizon.
     """
 
-    step = timedelta(minutes=15)
-    dt = start
-    for _ in range(max_checks):
-        dt += step
-        candidate = dt.strftime("%A %I:%M %p").replace(" 0", " ")
-        if not slot_taken(candidate, bookings):
-            return candidate
-    return None
+    dt = next_free_slot(start)
+    return format_slot(dt) if dt else None
 
 
-def check_availability(slot: str, user_number: str) -> str:
-    """Check whether *slot* is free for booking."""
+def check_availability(slot: str | datetime, user_number: str) -> str:
+    """Check whether *slot* (a label or an already-parsed datetime) is free."""
 
-    bookings = load_bookings()
-    try:
-        requested_dt = datetime.strptime(slot, "%A %I:%M %p")
-    except ValueError:
+    requested_dt = slot if isinstance(slot, datetime) else parse_slot_dt(slot)
+    if requested_dt is None:
         return "taken"
 
-    if not slot_taken(slot, bookings, exclude_user=user_number):
+    past = requested_dt < now_local()
+    if not past and not slot_taken(requested_dt, exclude_user=user_number):
         return "available"
 
-    alternative = _nearest_free_slot(requested_dt, bookings)
-    if alternative and not slot_taken(alternative, bookings):
+    # a time that has already passed is offered the next free slot from now
+    alternative = _nearest_free_slot(now_local() if past else requested_dt)
+    if alternative:
         return f"nearest::{alternative}"
 
     return "taken"
 
 
-CheckAvailabilityTool = StructuredTool.from_function(
-    func=check_availability,
-    name="CheckAvailabilityTool",
-    args_schema=CheckAvailInput,
-    description=(
-        "Report whether a given appointment slot is available. "
-        "Returns 'available', 'taken', or 'nearest::<alternative>'."
-    ),
-)
+def __getattr__(name: str):
+    # built on first use: booking_tool imports check_availability without
+    # needing LangChain
+    if name != "CheckAvailabilityTool":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from langchain.tools import StructuredTool
+
+    tool = globals()["CheckAvailabilityTool"] = StructuredTool.from_function(
+        func=check_availability,
+        name="CheckAvailabilityTool",
+        args_schema=CheckAvailInput,
+        description=(
+            "Report whether a given appointment slot is available. "
+            "Returns 'available', 'taken', or 'nearest::<alternative>'."
+        ),
+    )
+    return tool
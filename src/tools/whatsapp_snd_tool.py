@@ -1,8 +1,7 @@
 # src/tools/whatsapp_snd_tool.py
 from langchain.tools import StructuredTool
-import requests
 from pydantic import BaseModel
-from src.utils.whatsapp import send_whatsapp_message as real_send_whatsapp_message
+from src.utils.reply_buffer import send_reply
 
 
 class WhatsAppInput(BaseModel):
@@ -12,19 +11,12 @@ class WhatsAppInput(BaseModel):
 
 def send_whatsapp_message(number: str, message: str):
     """
-    Send a WhatsApp message via the local Node.js sender.
-    On failure, log the error but do not raise, to keep the FastAPI server running.
+    Queue a WhatsApp message for the local Node.js sender.
+    Inside a webhook request it joins the request's combined reply; the
+    outbox delivers it in the background with retries, so a slow or
+    failing bridge never holds up (or crashes) the FastAPI server.
     """
-    payload = {"number": number, "message": message}
-    print("📤 Attempting to send WhatsApp message with payload:", payload)
-
-    try:
-        response = requests.post("http://localhost:3000/send", json=payload, timeout=5)
-        response.raise_for_status()
-        print("✅ Message sent successfully!")
-    except requests.exceptions.RequestException as e:
-        print("❌ Failed to send WhatsApp message:", e)
-        # swallow exception to avoid crashing the webhook
+    send_reply(number, message)
     # No exception is raised, tool returns None
 
 
@@ -0,0 +1,76 @@
+"""
+Helpers for keeping the webhook's event loop free.
+
+Blocking work (booking store I/O, slot parsing, LangChain tools) runs on a
+dedicated thread pool sized for I/O-bound waits, and outbound HTTP goes
+through one pooled ``httpx.AsyncClient`` per event loop.
+
+Env vars
+--------
+BLOCKING_WORKERS   threads for :func:`run_blocking` (default 64)
+HTTP_TIMEOUT       seconds for outbound async requests (default 5)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+# ------------------------------------------------------------------ env config
+BLOCKING_WORKERS: int = int(os.getenv("BLOCKING_WORKERS", 64))
+HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", 5))
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_clients: dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+
+def blocking_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking"
+                )
+    return _executor
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run ``func(*args, **kwargs)`` on the blocking pool and await it.
+
+    The caller's context variables travel with the call, like
+    :func:`asyncio.to_thread`.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(blocking_executor(), call)
+
+
+def http_client() -> httpx.AsyncClient:
+    """The pooled async HTTP client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+        )
+    return client
+
+
+async def aclose_http_client() -> None:
+    """Close this loop's client (call from the app's shutdown hook)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,83 @@
+"""
+Circuit breaker for an optional dependency.
+
+After ``failures`` consecutive errors the circuit opens and callers skip
+the dependency outright. Once ``reset_after`` seconds have passed it goes
+half-open and lets a single probe call through: success closes the
+circuit, failure opens it for another ``reset_after`` seconds.
+
+    breaker = CircuitBreaker("duckling")
+    if breaker.allow():
+        try:
+            call()
+        except OSError:
+            breaker.failure()
+        else:
+            breaker.success()
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failures: int = 5, reset_after: float = 30):
+        self.name = name
+        self.threshold = max(1, failures)
+        self.reset_after = reset_after
+        self.state = CLOSED
+        self.opened = self.rejected = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether to make the call now (and, if half-open, be the probe)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_after:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+            if self._probing:  # one probe at a time
+                self.rejected += 1
+                return False
+            self._probing = True
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"✅ {self.name} is back; closing its circuit")
+            self.state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self._failures >= self.threshold:
+                if self.state != OPEN:
+                    print(
+                        f"⚠️ {self.name} failing; skipping it for {self.reset_after:.0f} s"
+                    )
+                self.state = OPEN
+                self.opened += 1
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "open": int(self.state == OPEN),
+            "half_open": int(self.state == HALF_OPEN),
+            "consecutive_failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,158 @@
+"""
+Duplicate-delivery guard for ``/incoming``.
+
+The bridge can deliver the same WhatsApp message twice (reconnects, client
+retries). Each message is keyed by its WhatsApp id, or failing that by a
+fingerprint of sender, timestamp and text, and the webhook's answer is
+remembered in a bounded LRU with a TTL; a repeat gets the stored answer
+back without touching the pipeline.
+
+With ``DEDUP_FILE`` set, entries are also appended to that file and
+replayed on startup, so duplicates are still caught across a restart.
+The cache and its file belong to one process; ``src.server`` refuses
+``DEDUP_FILE`` when running several workers.
+
+Env vars
+--------
+DEDUP_MAX_ENTRIES   keys kept in memory (default 50000)
+DEDUP_TTL           seconds a key is remembered (default 86400)
+DEDUP_FILE          optional JSON-lines file for persistence
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+# ------------------------------------------------------------------ env config
+DEDUP_MAX_ENTRIES: int = int(os.getenv("DEDUP_MAX_ENTRIES", 50_000))
+DEDUP_TTL: float = float(os.getenv("DEDUP_TTL", 24 * 3600))
+DEDUP_FILE: str | None = os.getenv("DEDUP_FILE") or None
+
+
+def message_key(payload: dict[str, Any]) -> str | None:
+    """Dedup key for an ``/incoming`` payload, or ``None`` if there is none.
+
+    Prefers the bridge's message ``id``; otherwise a fingerprint of number,
+    ``timestamp`` and text. Without either, identical texts could be two
+    genuine messages, so they are not deduplicated.
+    """
+    message_id = payload.get("id")
+    if message_id:
+        return f"id:{message_id}"
+    timestamp = payload.get("timestamp")
+    if timestamp in (None, ""):
+        return None
+    raw = f"{payload.get('number', '')}\x1f{timestamp}\x1f{payload.get('message', '')}"
+    return "fp:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class DedupCache:
+    """LRU of ``key -> value`` whose entries expire after ``ttl`` seconds."""
+
+    def __init__(
+        self,
+        maxsize: int = DEDUP_MAX_ENTRIES,
+        ttl: float = DEDUP_TTL,
+        path: Path | str | None = DEDUP_FILE,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+        self.hits = self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._log = None
+        self._log_lines = 0
+        if self.path is not None:
+            self._load()
+            self._log = self.path.open("a", encoding="utf-8")
+
+    def get(self, key: str) -> Any | None:
+        """The stored value for *key*, or ``None`` if unseen or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._append({"k": key, "e": expires, "v": value})
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._append({"k": key, "d": 1})
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, int]:
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    # ------------------------------------------------------------------ persistence
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            return
+        now = time.time()
+        with self.path.open(encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line after a crash
+                if entry.get("d"):
+                    self._entries.pop(entry["k"], None)
+                elif entry["e"] > now:
+                    self._entries[entry["k"]] = (entry["e"], entry["v"])
+                    self._entries.move_to_end(entry["k"])
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        self._rewrite()
+
+    def _append(self, entry: dict[str, Any]) -> None:
+        if self._log is None:
+            return
+        self._log.write(json.dumps(entry, default=str) + "\n")
+        self._log.flush()
+        self._log_lines += 1
+        if self._log_lines > 2 * self.maxsize:
+            self._log.close()
+            self._rewrite()
+            self._log = self.path.open("a", encoding="utf-8")
+
+    def _rewrite(self) -> None:
+        """Compact the file down to the live entries."""
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with tmp.open("w", encoding="utf-8") as fh:
+            for key, (expires, value) in self._entries.items():
+                fh.write(json.dumps({"k": key, "e": expires, "v": value}, default=str))
+                fh.write("\n")
+        os.replace(tmp, self.path)
+        self._log_lines = len(self._entries)
@@ -0,0 +1,138 @@
+"""
+Duckling client for the slot parser's last-resort fallback.
+
+Most texts that reach it ("hi", "thanks", an email address) have no date
+in them, and when Duckling isn't running every one of them used to pay a
+connection attempt. Before a request goes out:
+
+1. a lexical gate skips texts with no digit and no time-like word;
+2. a negative cache skips texts Duckling already found no time in
+   (that answer doesn't depend on the reference time);
+3. a circuit breaker skips Duckling entirely after ``DUCKLING_FAILURES``
+   consecutive errors, probing again every ``DUCKLING_RETRY_AFTER`` s.
+
+Requests share one pooled keep-alive client.
+
+Env vars
+--------
+DUCKLING_URL          parse endpoint (default http://localhost:8000/parse)
+DUCKLING_TIMEOUT      seconds per request (default 2)
+DUCKLING_FAILURES     consecutive errors that open the circuit (default 3)
+DUCKLING_RETRY_AFTER  seconds before probing an open circuit (default 30)
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from datetime import datetime
+
+import httpx
+
+from src.utils import metrics
+from src.utils.circuit_breaker import CircuitBreaker
+from src.utils.dedup import DedupCache
+from src.utils.metrics import timed
+
+# ------------------------------------------------------------------ env config
+DUCKLING_URL = os.getenv("DUCKLING_URL", "http://localhost:8000/parse")
+DUCKLING_TIMEOUT: float = float(os.getenv("DUCKLING_TIMEOUT", 2))
+DUCKLING_FAILURES: int = int(os.getenv("DUCKLING_FAILURES", 3))
+DUCKLING_RETRY_AFTER: float = float(os.getenv("DUCKLING_RETRY_AFTER", 30))
+
+NEGATIVE_CACHE_SIZE = 10_000
+NEGATIVE_CACHE_TTL = 24 * 3600
+
+_IGNORED = re.compile(r"\S+@\S+|https?://\S+", re.I)
+_TEMPORAL = re.compile(
+    r"\d"
+    r"|\b(?:mon|tue|wed|thu|fri|sat|sun)[a-z]*\b"
+    r"|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\b"
+    r"|\b(?:today|tonight|tomorrow|tmrw?|yesterday|morning|afternoon|evening"
+    r"|night|noon|midday|midnight|week|weekend|month|hour|minute|now|later"
+    r"|next|this|o'?clock|half|quarter|am|pm"
+    r"|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve)\b",
+    re.I,
+)
+
+breaker = CircuitBreaker(
+    "Duckling", failures=DUCKLING_FAILURES, reset_after=DUCKLING_RETRY_AFTER
+)
+negative_cache = DedupCache(NEGATIVE_CACHE_SIZE, NEGATIVE_CACHE_TTL, path=None)
+counters = {"requests": 0, "errors": 0, "gated": 0, "negative_hits": 0}
+
+_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+
+
+def duckling_client() -> httpx.Client:
+    """The pooled client (thread-safe; parsing runs on the blocking pool)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    timeout=httpx.Timeout(DUCKLING_TIMEOUT, connect=0.5),
+                    limits=httpx.Limits(max_keepalive_connections=16),
+                )
+    return _client
+
+
+def might_have_time(text: str) -> bool:
+    """Cheap check for anything Duckling could read as a time."""
+    return bool(_TEMPORAL.search(_IGNORED.sub(" ", text)))
+
+
+def parse(text: str, reftime: datetime) -> datetime | None:
+    """First time entity Duckling finds in *text*, or ``None``."""
+    if not might_have_time(text):
+        counters["gated"] += 1
+        return None
+    if negative_cache.get(text) is not None:
+        counters["negative_hits"] += 1
+        return None
+    if not breaker.allow():
+        return None
+    counters["requests"] += 1
+    try:
+        with timed("duckling"):
+            resp = duckling_client().post(
+                DUCKLING_URL,
+                json={
+                    "text": text,
+                    "locale": "en_US",
+                    "tz": "UTC",
+                    "reftime": reftime.isoformat(),
+                },
+            )
+        resp.raise_for_status()
+        data = resp.json()
+    except (httpx.HTTPError, ValueError):
+        counters["errors"] += 1
+        breaker.failure()
+        return None
+    breaker.success()
+    try:
+        for ent in data:
+            if ent.get("dim") in ("time", "datetime"):
+                iso = ent["value"]["value"]
+                # handle 'Z' suffix
+                if iso.endswith("Z"):
+                    iso = iso[:-1] + "+00:00"
+                return datetime.fromisoformat(iso)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None  # unexpected answer shape: not a reason to cache
+    negative_cache.put(text, True)
+    return None
+
+
+def stats() -> dict[str, int]:
+    return {
+        **counters,
+        "negative_entries": len(negative_cache),
+        **{f"breaker_{k}": v for k, v in breaker.stats().items()},
+    }
+
+
+metrics.register_stats("whatsapp_duckling", stats)
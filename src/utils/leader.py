@@ -0,0 +1,120 @@
+"""
+Single-leader election between worker processes on one host.
+
+Every worker tries to take an exclusive, non-blocking lock on
+``LEADER_LOCK`` (default ``data/leader.lock``). The one that gets it is the
+leader and runs the singleton jobs (reminder scheduler, outbox dispatcher);
+the others retry every ``LEADER_RETRY`` seconds. The OS drops the lock when
+the leader exits or crashes, so a follower takes over within one retry
+interval – no stale lease to expire. The holder's pid is written to the
+file for whoever is debugging.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Callable, IO
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+# ------------------------------------------------------------------ env config
+LEADER_LOCK = Path(os.getenv("LEADER_LOCK", BASE_DIR / "data" / "leader.lock"))
+LEADER_RETRY: float = float(os.getenv("LEADER_RETRY", 5))
+
+
+def _try_lock(fh: IO[str]) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(fh: IO[str]) -> None:
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    else:
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class LeaderElection:
+    """Call ``on_elected`` once this process becomes leader.
+
+    ``on_resigned`` runs from :meth:`stop` if we were leader, so the
+    singleton jobs shut down before the lock is handed on.
+    """
+
+    def __init__(
+        self,
+        on_elected: Callable[[], None],
+        on_resigned: Callable[[], None] | None = None,
+        *,
+        path: Path | str = LEADER_LOCK,
+        retry: float = LEADER_RETRY,
+    ):
+        self.path = Path(path)
+        self.retry = retry
+        self.on_elected = on_elected
+        self.on_resigned = on_resigned
+        self.is_leader = False
+        self._fh: IO[str] | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "LeaderElection":
+        """Try now, then keep trying in the background until elected."""
+        if self._stop.is_set():
+            return self
+        if not self._attempt():
+            self._thread = threading.Thread(
+                target=self._run, name="leader-election", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.retry):
+            if self._attempt():
+                return
+
+    def _attempt(self) -> bool:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fh = open(self.path, "a+", encoding="utf-8")
+        if not _try_lock(fh):
+            fh.close()
+            return False
+        fh.seek(0)
+        fh.truncate()
+        fh.write(f"{os.getpid()}\n")
+        fh.flush()
+        self._fh = fh
+        self.is_leader = True
+        print(f"👑 Process {os.getpid()} elected leader ({self.path})")
+        self.on_elected()
+        return True
+
+    def stop(self) -> None:
+        """Stop campaigning and, if leader, resign and release the lock."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.is_leader:
+            if self.on_resigned is not None:
+                self.on_resigned()
+            self.is_leader = False
+            _unlock(self._fh)
+            self._fh.close()
+            self._fh = None
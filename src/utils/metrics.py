@@ -0,0 +1,255 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Every stage of a message's trip – intent classification, slot parsing,
+bookings I/O, the memory service, Ollama, tools, the WhatsApp bridge – is
+timed into ``whatsapp_stage_seconds{stage=...}``, agent tools into
+``whatsapp_tool_seconds{tool=...}``, and ``GET /metrics`` renders them
+together with the ingest queue, outbox, dedup and bookings-store
+``stats()`` as gauges.
+
+Recording is a ``perf_counter`` pair and a bucket increment under a lock;
+all formatting happens at scrape time. Inside a request trace each timed
+stage is also recorded as a span (see :mod:`src.utils.tracing`). Each worker process keeps its own
+numbers, so with ``--workers N`` a scrape describes one worker.
+
+    with timed("parse_slot"):
+        natural_dt = parse_slot_dt(text)
+
+    @timed("check_reminders")
+    def check_reminders(): ...
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+from src.utils import tracing
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds; covers a regex (sub-ms) up to a slow LLM answer
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)  # fmt: skip
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set."""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            lines.append(
+                f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            )
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram per label set."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (+Inf last)], sum
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [
+                (labels, list(counts), total[0])
+                for labels, (counts, total) in self._series.items()
+            ]
+        bounds = [_number(b) for b in self.buckets] + ["+Inf"]
+        for labels, counts, total in snapshot:
+            running = 0
+            for bound, count in zip(bounds, counts):
+                running += count
+                le = _labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {running}")
+            plain = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{plain} {_number(total)}")
+            lines.append(f"{self.name}_count{plain} {running}")
+        return lines
+
+
+# ------------------------------------------------------------------ registry
+
+STAGE_SECONDS = Histogram(
+    "whatsapp_stage_seconds", "Time spent in each pipeline stage.", ["stage"]
+)
+STAGE_ERRORS = Counter(
+    "whatsapp_stage_errors_total", "Stages that ended in an exception.", ["stage"]
+)
+TOOL_SECONDS = Histogram(
+    "whatsapp_tool_seconds", "Time spent running each agent tool.", ["tool"]
+)
+MESSAGES = Counter(
+    "whatsapp_messages_total", "Messages processed, by result status.", ["status"]
+)
+STALE_WRITES = Counter(
+    "whatsapp_bookings_stale_writes_total",
+    "Bulk-saved bookings skipped because they changed after being loaded.",
+)
+
+_metrics: list[Counter | Histogram] = [
+    STAGE_SECONDS,
+    STAGE_ERRORS,
+    TOOL_SECONDS,
+    MESSAGES,
+    STALE_WRITES,
+]
+_stats: dict[str, Callable[[], dict]] = {}
+
+
+def register_stats(prefix: str, stats: Callable[[], dict]) -> None:
+    """Export the numeric values of ``stats()`` as ``<prefix>_<key>`` gauges."""
+    _stats[prefix] = stats
+
+
+class timed:
+    """Time a block or a (sync or async) function into *histogram*.
+
+    Exceptions are counted in ``whatsapp_stage_errors_total`` and re-raised.
+    The trace span is named *span* (default: the label).
+    """
+
+    def __init__(
+        self,
+        label: str,
+        histogram: Histogram = STAGE_SECONDS,
+        *,
+        span: str | None = None,
+    ):
+        self.label = label
+        self.histogram = histogram
+        self.span = span or label
+
+    def __enter__(self) -> "timed":
+        self._span = tracing.open_span(self.span)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._record(self._start, exc)
+        tracing.close_span(self._span, exc)
+
+    def _record(self, start: float, error: BaseException | None) -> None:
+        self.histogram.observe(time.perf_counter() - start, self.label)
+        if error is not None:
+            STAGE_ERRORS.inc(self.label)
+
+    def __call__(self, fn):
+        # a decorated function may run concurrently, so it keeps its own start
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                handle, error = tracing.open_span(self.span), None
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                except BaseException as exc:
+                    error = exc
+                    raise
+                finally:
+                    self._record(start, error)
+                    tracing.close_span(handle, error)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            handle, error = tracing.open_span(self.span), None
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except BaseException as exc:
+                error = exc
+                raise
+            finally:
+                self._record(start, error)
+                tracing.close_span(handle, error)
+
+        return wrapper
+
+
+def render() -> str:
+    """Everything in the Prometheus text exposition format."""
+    lines: list[str] = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for prefix, stats in _stats.items():
+        try:
+            values = stats()
+        except Exception as exc:  # a broken source must not break the scrape
+            print(f"⚠️ metrics: {prefix} stats failed ({exc})")
+            continue
+        for key, value in values.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{prefix}_{key}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_number(value)}")
+    return "\n".join(lines) + "\n"
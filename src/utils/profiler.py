@@ -0,0 +1,210 @@
+"""
+On-demand sampling profiler for the running process.
+
+A background thread snapshots every thread's Python stack with
+``sys._current_frames()`` every ``interval`` seconds; nothing is
+instrumented, so a session can be started in production and costs only
+while it runs. Results come back as collapsed stacks
+(``thread;module:func;module:func count`` – the input format of
+``flamegraph.pl`` and speedscope) and as the top functions by self and
+total samples.
+
+Two modes:
+
+* a window – every thread, for ``seconds``;
+* per request – with ``every=K`` only samples taken while one of every
+  K-th ``/incoming`` request is in flight are kept. Stacks from other
+  requests running at the same time are included too, so use it on
+  moderate traffic.
+
+Sampling is wall-clock: a thread blocked on a socket read counts where it
+blocks, which is what shows slow services next to hot code. Threads parked
+in a wait (idle pool workers, the event loop's ``select``) are left out
+unless ``include_idle`` is set.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+# leaf frames of threads that are waiting, not working
+IDLE_FRAMES = {
+    "threading:Condition.wait",
+    "threading:Event.wait",
+    "threading:Thread._wait_for_tstate_lock",
+    "selectors:EpollSelector.select",
+    "selectors:KqueueSelector.select",
+    "selectors:SelectSelector.select",
+    "selectors:PollSelector.select",
+    "queue:Queue.get",
+    "concurrent.futures.thread:_worker",
+    "socketserver:BaseServer.serve_forever",
+}
+
+MAX_DEPTH = 128
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class Profile:
+    """Collapsed stacks with sample counts."""
+
+    def __init__(self, stacks: Counter, samples: int, duration: float, interval: float):
+        self.stacks = stacks
+        self.samples = samples
+        self.duration = duration
+        self.interval = interval
+
+    def collapsed(self) -> str:
+        return "\n".join(
+            f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()
+        )
+
+    def top(self, n: int = 25) -> list[dict[str, Any]]:
+        """Hottest functions: ``self`` = on top of the stack, ``total`` = anywhere."""
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for name in set(stack[1:]):  # stack[0] is the thread name
+                total[name] += count
+        recorded = sum(self.stacks.values()) or 1
+        return [
+            {
+                "function": name,
+                "self": own[name],
+                "total": count,
+                "self_pct": round(100 * own[name] / recorded, 1),
+                "total_pct": round(100 * count / recorded, 1),
+            }
+            for name, count in sorted(
+                total.items(), key=lambda kv: (-own[kv[0]], -kv[1])
+            )[:n]
+        ]
+
+    def to_dict(self, top: int = 25) -> dict[str, Any]:
+        return {
+            "duration_s": round(self.duration, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "stacks_recorded": sum(self.stacks.values()),
+            "top": self.top(top),
+            "collapsed": self.collapsed(),
+        }
+
+
+class SamplingProfiler:
+    """Samples all thread stacks from a daemon thread between start/stop."""
+
+    def __init__(
+        self, interval: float = 0.005, every: int = 0, include_idle: bool = False
+    ):
+        self.interval = interval
+        self.every = every
+        self.include_idle = include_idle
+        self._stacks: Counter[tuple[str, ...]] = Counter()
+        self._samples = 0
+        self._requests = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started = 0.0
+
+    def start(self) -> "SamplingProfiler":
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        duration = time.perf_counter() - self._started
+        return Profile(Counter(self._stacks), self._samples, duration, self.interval)
+
+    @contextmanager
+    def request(self) -> Iterator[bool]:
+        """Wrap one request; yields whether it is being profiled."""
+        with self._lock:
+            self._requests += 1
+            chosen = self.every > 0 and self._requests % self.every == 0
+            if chosen:
+                self._in_flight += 1
+        try:
+            yield chosen
+        finally:
+            if chosen:
+                with self._lock:
+                    self._in_flight -= 1
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            if self.every and not self._in_flight:
+                continue
+            self._sample(me)
+
+    def _sample(self, me: int) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        self._samples += 1
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(_label(frame))
+                frame = frame.f_back
+            if not stack or (not self.include_idle and stack[0] in IDLE_FRAMES):
+                continue
+            stack.append(names.get(ident, f"thread-{ident}"))
+            stack.reverse()
+            self._stacks[tuple(stack)] += 1
+
+
+# ------------------------------------------------------------------ sessions
+
+_active: SamplingProfiler | None = None
+_active_lock = threading.Lock()
+
+
+def begin(**options: Any) -> SamplingProfiler | None:
+    """Start the process-wide session; ``None`` if one is already running."""
+    global _active
+    with _active_lock:
+        if _active is not None:
+            return None
+        _active = SamplingProfiler(**options).start()
+        return _active
+
+
+def end(profiler: SamplingProfiler) -> Profile:
+    global _active
+    profile = profiler.stop()
+    with _active_lock:
+        if _active is profiler:
+            _active = None
+    return profile
+
+
+@contextmanager
+def profile_request() -> Iterator[bool]:
+    """Let an ``every=K`` session decide whether to sample this request."""
+    profiler = _active
+    if profiler is None or not profiler.every:
+        yield False
+        return
+    with profiler.request() as chosen:
+        yield chosen
@@ -0,0 +1,114 @@
+"""
+Per-request reply buffer.
+
+While a message is being processed, every reply meant for the user –
+from the router, the agent or the ``SendWhatsappMsg`` tool – is collected
+here instead of being sent on its own. Equivalent replies are dropped, and
+at the end of the request each recipient gets the rest as one combined
+WhatsApp message, so a turn costs one outbound send instead of several.
+
+The buffer rides on a context variable, so code running on the blocking
+pool via :func:`src.utils.aio.run_blocking` sees the request's buffer.
+"""
+
+from __future__ import annotations
+
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, Iterator
+
+from src.outbox import queue_message
+
+SEPARATOR = "\n\n"
+
+_current: ContextVar["ReplyBuffer | None"] = ContextVar("reply_buffer", default=None)
+
+# letters and digits only: emoji, punctuation and spacing don't make a reply new
+_NOISE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def _key(message: str) -> str:
+    return _NOISE.sub(" ", message.casefold()).strip()
+
+
+class ReplyBuffer:
+    """Replies collected per recipient, in the order they were added.
+
+    ``"15551234"`` and ``"15551234@c.us"`` are the same recipient; the
+    first spelling seen is the one sent to.
+    """
+
+    def __init__(self):
+        self._numbers: dict[str, str] = {}
+        # user -> {normalised key: message}, in the order added
+        self._replies: dict[str, dict[str, str]] = {}
+
+    def add(self, number: str, message: str) -> bool:
+        """Buffer *message*; ``False`` if an equivalent one is already queued.
+
+        Replies are equivalent when they match ignoring case, emoji and
+        punctuation; a reply that merely contains another is a new one.
+        """
+        message = message.strip()
+        key = _key(message)
+        if not key:
+            return False
+        user = number.split("@", 1)[0]
+        self._numbers.setdefault(user, number)
+        replies = self._replies.setdefault(user, {})
+        if key in replies:
+            return False
+        replies[key] = message
+        return True
+
+    def extend(self, number: str, messages: Iterable[str]) -> None:
+        for message in messages:
+            self.add(number, message)
+
+    def messages(self, number: str) -> list[str]:
+        return list(self._replies.get(number.split("@", 1)[0], {}).values())
+
+    def combined(self) -> dict[str, str]:
+        """One message per recipient."""
+        return {
+            self._numbers[user]: SEPARATOR.join(replies.values())
+            for user, replies in self._replies.items()
+            if replies
+        }
+
+    def flush(self, send: Callable[[str, str], object] = queue_message) -> int:
+        """Send each recipient's combined reply; returns the number of sends."""
+        combined = self.combined()
+        self._numbers.clear()
+        self._replies.clear()
+        for number, message in combined.items():
+            send(number, message)
+        return len(combined)
+
+
+def current_buffer() -> ReplyBuffer | None:
+    return _current.get()
+
+
+@contextmanager
+def collect_replies() -> Iterator[ReplyBuffer]:
+    """Buffer every :func:`send_reply` made inside the block.
+
+    The caller flushes the buffer when the request is done.
+    """
+    buffer = ReplyBuffer()
+    token = _current.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _current.reset(token)
+
+
+def send_reply(number: str, message: str) -> None:
+    """Buffer *message* for this request, or queue it at once outside one."""
+    buffer = _current.get()
+    if buffer is not None:
+        buffer.add(number, message)
+    else:
+        queue_message(number, message)
@@ -0,0 +1,120 @@
+"""
+Startup timing and readiness.
+
+``readiness`` records how long each startup phase took, measured from the
+first import of this module (``receiver.py`` imports it before anything
+heavy), and flips to ready once the process is warm; ``GET /ready``
+reports it. ``/ping`` stays a pure liveness check.
+
+Per-module import cost comes from CPython's ``-X importtime``::
+
+    python -m src.utils.startup              # profile importing src.receiver
+    python -m src.utils.startup --top 40 src.agent.agent
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+STARTED = time.perf_counter()
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+
+class Readiness:
+    """Startup phases (ms since :data:`STARTED`) plus a ready flag."""
+
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+        self._ready = threading.Event()
+
+    def mark(self, phase: str) -> None:
+        self.phases[phase] = round((time.perf_counter() - STARTED) * 1000, 1)
+
+    def set_ready(self) -> None:
+        self.mark("ready")
+        self._ready.set()
+        print(f"✅ Ready in {self.phases['ready']:.0f} ms {self.phases}")
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def report(self) -> dict[str, object]:
+        return {"ready": self.is_ready, "phases_ms": dict(self.phases)}
+
+
+readiness = Readiness()
+
+
+# ------------------------------------------------------------------ import profile
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(module: str = "src.receiver") -> list[tuple[str, int, int, int]]:
+    """Import *module* in a fresh interpreter and return its import tree.
+
+    Rows are ``(module, self_us, cumulative_us, depth)`` in import order.
+    """
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join([str(BASE_DIR), str(BASE_DIR / "src")]),
+    }
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if m:
+            own, total, indent, name = m.groups()
+            rows.append((name, int(own), int(total), len(indent) // 2))
+    if not rows:
+        raise RuntimeError(proc.stderr.strip() or f"could not import {module}")
+    return rows
+
+
+def by_package(rows: list[tuple[str, int, int, int]]) -> dict[str, int]:
+    """Self time (µs) summed per top-level package."""
+    totals: dict[str, int] = {}
+    for name, own, _, _ in rows:
+        top = name.split(".", 1)[0]
+        totals[top] = totals.get(top, 0) + own
+    return dict(sorted(totals.items(), key=lambda kv: -kv[1]))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Per-module import cost")
+    parser.add_argument("module", nargs="?", default="src.receiver")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args(argv)
+
+    rows = import_profile(args.module)
+    total = rows[-1][2]
+    print(f"⏱️ import {args.module}: {total / 1000:.0f} ms\n")
+    print(f"{'package':<28} {'self ms':>8} {'share':>6}")
+    for package, own in list(by_package(rows).items())[: args.top]:
+        print(f"{package:<28} {own / 1000:8.1f} {own / total:6.1%}")
+    print(f"\n{'module (cumulative)':<48} {'ms':>8}")
+    heaviest = sorted(rows, key=lambda row: -row[2])[: args.top]
+    for name, _, cumulative, depth in heaviest:
+        print(f"{name:<48} {cumulative / 1000:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
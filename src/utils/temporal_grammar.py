@@ -0,0 +1,499 @@
+"""
+In-process grammar for the dates and times customers send.
+
+The rules are compiled regexes tried in a fixed order. Each match fills in
+one part of the result: a date, a time, a range or a period of day. Its
+text is then masked, so a later, looser rule can't read the same words
+again. That is what stops "July 1" from also being read as 1 PM. Finally
+the parts are resolved against a reference time:
+
+    dates    July 1 · 1st of July · 3/14 · 2026-07-01 · the 5th ·
+             today · tomorrow · day after tomorrow · (next) Tuesday ·
+             next week · this weekend · in 3 days
+    times    3pm · 3:30 · 15:00 · at 3 · three o'clock · half past 2 ·
+             quarter to 4 · noon · midnight · in 2 hours · in 20 minutes
+    periods  morning · lunchtime · after lunch · afternoon · after work ·
+             evening · tonight
+    ranges   between 2 and 4 · from 10 to 11:30 · 2-4pm
+
+Resolution follows these conventions:
+
+* An hour with no am/pm follows the booking convention: 1–7 is afternoon
+  and everything else is morning, unless a period says otherwise
+  ("8 tonight").
+* A time with no day is today, or tomorrow once it has passed.
+* A weekday is the next one on or after today, or strictly after today
+  for "next Tuesday". It moves on a week if its time has passed.
+* A date with no year is the next one to come.
+
+Only the first expression of each kind counts. A text with a date but no
+time resolves with ``grain="day"``.
+
+    >>> resolve("next tuesday after lunch", now)
+    Temporal(2026-03-10T13:00:00+00:00, grain='minute')
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import date, datetime, time, timedelta
+from typing import Callable
+
+# ------------------------------------------------------------------ vocabulary
+
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}  # fmt: skip
+_WEEKDAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+_NUMBERS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+}  # fmt: skip
+_RELATIVE_DAYS = {"today": 0, "tomorrow": 1, "tmrw": 1, "tmr": 1, "tmw": 1, "tom": 1}
+
+# period of day: its default time and whether a bare hour in it is pm
+_PERIODS = {
+    "morning": (time(9), False),
+    "lunch": (time(12), True),
+    "after lunch": (time(13), True),
+    "afternoon": (time(14), True),
+    "after work": (time(17), True),
+    "evening": (time(18), True),
+    "tonight": (time(19), True),
+    "night": (time(19), True),
+}
+
+_MONTH = (
+    r"(?P<month>jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?"
+    r"|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?"
+    r"|dec(?:ember)?)\b\.?"
+)
+_WEEKDAY = (
+    r"(?P<weekday>mon(?:day)?|tue(?:s(?:day)?)?|wed(?:nesday)?"
+    r"|thu(?:rs?(?:day)?)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?)\b"
+)
+_DIGITS = r"(?:[01]?\d|2[0-3])"
+_HOUR = r"(?:[01]?\d|2[0-3]|" + "|".join(_NUMBERS) + r")"
+_ORDINAL = r"(?:st|nd|rd|th)"
+_NOT_TIME = r"(?!\s*(?:[ap]\.?m\b|[:.]\d|o'?clock))"
+# what a number can count instead of being an hour
+_NOT_HOUR = (
+    r"(?!\s*(?:people|persons?|guests?|kids?|days?|weeks?|months?|years?"
+    r"|hours?|hrs?|min(?:ute)?s?|x\b|%|point|of\b|more|times?\b))"
+)
+
+
+def _ampm(name: str) -> str:
+    return rf"(?:\s*(?P<{name}>[ap])\.?m\b\.?)"
+
+
+def _clock(prefix: str, hour: str = _HOUR) -> str:
+    """An hour with optional minutes and am/pm: "2", "2pm", "10:30am"."""
+    return (
+        rf"(?P<{prefix}h>{hour})(?:[:.](?P<{prefix}m>[0-5]\d))?"
+        + _ampm(prefix + "ap")
+        + "?"
+    )
+
+
+def _number(token: str) -> int:
+    return _NUMBERS.get(token.lower()) or int(token)
+
+
+def _hour(hour: int, ampm: str | None, pm_hint: bool | None = None) -> int:
+    """24-hour clock hour; a bare 1–7 is pm unless a period says otherwise."""
+    if ampm:
+        return hour % 12 + (12 if ampm.lower() == "p" else 0)
+    if hour > 12 or hour == 0:
+        return hour
+    if hour == 12:
+        return 12
+    pm = pm_hint if pm_hint is not None else hour <= 7
+    return hour + 12 if pm else hour
+
+
+class Temporal:
+    """A resolved expression: its start, the end of a range, and its grain."""
+
+    __slots__ = ("start", "end", "grain")
+
+    def __init__(
+        self, start: datetime, end: datetime | None = None, grain: str = "minute"
+    ):
+        self.start = start
+        self.end = end
+        self.grain = grain
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Temporal) and (self.start, self.end, self.grain) == (
+            other.start,
+            other.end,
+            other.grain,
+        )
+
+    def __repr__(self) -> str:
+        end = f", end={self.end.isoformat()}" if self.end else ""
+        return f"Temporal({self.start.isoformat()}{end}, grain={self.grain!r})"
+
+
+class _Parts:
+    """What the rules found in one text."""
+
+    def __init__(self) -> None:
+        self.day: date | None = None
+        self.days_ahead: int | None = None
+        self.weekday: int | None = None
+        self.after_today = False  # "next Tuesday"
+        self.next_week = False
+        self.clock: tuple[int, int, str | None] | None = None  # hour, min, am/pm
+        self.until: tuple[int, int, str | None] | None = None  # end of a range
+        self.period: str | None = None
+        self.offset: timedelta | None = None  # "in 2 hours": exact, from now
+
+
+# ------------------------------------------------------------------ rules
+# Each takes (match, parts, today) and fills in parts that are still empty.
+# Returning False leaves the text unmasked for later rules.
+
+Rule = Callable[[re.Match, _Parts, date], "bool | None"]
+
+
+def _set_day(p: _Parts, year: int, month: int, day: int) -> bool | None:
+    try:
+        value = date(year, month, day)
+    except ValueError:
+        return False
+    if p.day is None:
+        p.day = value
+    return None
+
+
+def _set_upcoming_day(p: _Parts, today: date, month: int, day: int) -> bool | None:
+    for year in range(today.year, today.year + 5):  # 29 Feb waits for a leap year
+        try:
+            value = date(year, month, day)
+        except ValueError:
+            if not 1 <= month <= 12 or not 1 <= day <= 31:
+                return False
+            continue
+        if value >= today:
+            if p.day is None:
+                p.day = value
+            return None
+    return False
+
+
+def _ignored(m: re.Match, p: _Parts, today: date) -> None:
+    pass
+
+
+def _offset(m: re.Match, p: _Parts, today: date) -> None:
+    amount = (m.group("n") or "a").lower()
+    if amount.startswith("half"):
+        n = 0.5
+    elif amount in ("a", "an"):
+        n = 1
+    else:
+        n = _number(amount)
+    unit = m.group("unit").lower()
+    if unit.startswith(("d", "w")):
+        if p.days_ahead is None:
+            p.days_ahead = int(n * (7 if unit.startswith("w") else 1))
+    elif p.offset is None:
+        p.offset = timedelta(hours=n) if unit.startswith("h") else timedelta(minutes=n)
+
+
+def _iso_date(m: re.Match, p: _Parts, today: date) -> bool | None:
+    return _set_day(p, int(m.group("y")), int(m.group("mo")), int(m.group("d")))
+
+
+def _numeric_date(m: re.Match, p: _Parts, today: date) -> bool | None:
+    first, second = int(m.group("a")), int(m.group("b"))
+    month, day = (second, first) if first > 12 else (first, second)  # US m/d
+    year = m.group("y")
+    if year:
+        return _set_day(p, int(year) + (2000 if len(year) == 2 else 0), month, day)
+    return _set_upcoming_day(p, today, month, day)
+
+
+def _day_month(m: re.Match, p: _Parts, today: date) -> bool | None:
+    if m.group("month").lower() == "may" and not (m.group("suffix") or m.group("of")):
+        return False  # "at 3 may I ..." is not the 3rd of May
+    return _month_day(m, p, today)
+
+
+def _month_day(m: re.Match, p: _Parts, today: date) -> bool | None:
+    month, day = _MONTHS[m.group("month")[:3].lower()], int(m.group("d"))
+    if m.group("y"):
+        return _set_day(p, int(m.group("y")), month, day)
+    return _set_upcoming_day(p, today, month, day)
+
+
+def _ordinal_day(m: re.Match, p: _Parts, today: date) -> bool | None:
+    day = int(m.group("d"))
+    if not 1 <= day <= 31:
+        return False
+    if p.day is not None:
+        return None
+    year, month = today.year, today.month + (day < today.day)
+    for _ in range(12):  # the next month that has this day
+        if month > 12:
+            year, month = year + 1, 1
+        try:
+            p.day = date(year, month, day)
+            return None
+        except ValueError:
+            month += 1
+    return None
+
+
+def _relative_day(m: re.Match, p: _Parts, today: date) -> None:
+    word = m.group(0).lower()
+    if p.days_ahead is None:
+        p.days_ahead = 2 if word.startswith("day") else _RELATIVE_DAYS[word]
+
+
+def _next_week(m: re.Match, p: _Parts, today: date) -> None:
+    p.next_week = True
+
+
+def _weekend(m: re.Match, p: _Parts, today: date) -> None:
+    if p.weekday is None:
+        p.weekday = 5
+
+
+def _weekday(m: re.Match, p: _Parts, today: date) -> None:
+    if p.weekday is None:
+        p.weekday = _WEEKDAYS[m.group("weekday")[:3].lower()]
+        p.after_today = (m.group("mod") or "").lower() == "next"
+
+
+def _range(m: re.Match, p: _Parts, today: date) -> None:
+    if p.clock is not None:
+        return
+    start_h, end_h = _number(m.group("sh")), _number(m.group("eh"))
+    start_ap, end_ap = m.group("sap"), m.group("eap")
+    if end_ap and not start_ap and start_h <= 12 and end_h <= 12:
+        # "2-4pm" starts at 2 pm but "11-1pm" at 11 am
+        start_ap = end_ap
+        if start_h % 12 > end_h % 12:
+            start_ap = "a" if end_ap.lower() == "p" else "p"
+    p.clock = (start_h, int(m.group("sm") or 0), start_ap)
+    p.until = (end_h, int(m.group("em") or 0), end_ap)
+
+
+def _named_time(m: re.Match, p: _Parts, today: date) -> None:
+    if p.clock is None:
+        midnight = "midnight" in m.group(0).lower()
+        p.clock = (0, 0, None) if midnight else (12, 0, "p")
+
+
+def _past_to(m: re.Match, p: _Parts, today: date) -> None:
+    if p.clock is not None:
+        return
+    hour, ap = _number(m.group("h")), m.group("ap")
+    minutes = 30 if m.group("part").lower() == "half" else 15
+    if m.group("dir").lower() in ("to", "til", "till"):
+        hour, minutes = hour - 1, 60 - minutes
+        if hour == 0 and not ap:
+            hour = 12
+    p.clock = (hour, minutes, ap)
+
+
+def _time(m: re.Match, p: _Parts, today: date) -> None:
+    if p.clock is None:
+        groups = m.groupdict()
+        p.clock = (_number(m.group("h")), int(groups.get("m") or 0), groups.get("ap"))
+
+
+def _period(m: re.Match, p: _Parts, today: date) -> None:
+    word = " ".join(m.group("period").lower().split())
+    if p.period is None:
+        p.period = "lunch" if word == "lunchtime" else word
+    if word == "tonight" and p.days_ahead is None:
+        p.days_ahead = 0
+
+
+# in order: a match's text is masked before the next rule runs
+RULES: list[tuple[str, re.Pattern[str], Rule]] = [
+    (name, re.compile(pattern, re.I), rule)
+    for name, pattern, rule in [
+        (
+            "iso_date",
+            r"\b(?P<y>\d{4})-(?P<mo>\d{1,2})-(?P<d>\d{1,2})(?:t(?=\d))?",
+            _iso_date,
+        ),
+        # phone numbers, prices, emails and links
+        (
+            "ignored",
+            r"\S+@\S+|https?://\S+|\+?\d(?:[\s-]?\d){6,}|[$£€]\s?\d+(?:[.,]\d+)?",
+            _ignored,
+        ),
+        (
+            "offset",
+            r"\bin\s+(?:(?P<n>\d+|an?|half\s+an?|" + "|".join(_NUMBERS) + r")\s+)?"
+            r"(?P<unit>min(?:ute)?s?|hours?|hrs?|days?|weeks?)\b",
+            _offset,
+        ),
+        (
+            "numeric_date",
+            r"\b(?P<a>\d{1,2})/(?P<b>\d{1,2})(?:/(?P<y>\d{4}|\d{2}))?\b",
+            _numeric_date,
+        ),
+        (
+            "day_month",
+            rf"\b(?P<d>\d{{1,2}})(?P<suffix>{_ORDINAL})?\s+(?P<of>of\s+)?{_MONTH}"
+            r"(?:,?\s+(?P<y>\d{4})\b)?",
+            _day_month,
+        ),
+        (
+            "month_day",
+            rf"\b{_MONTH}\s+(?:the\s+)?(?P<d>\d{{1,2}})(?P<suffix>{_ORDINAL})?\b"
+            rf"{_NOT_TIME}(?:,?\s+(?P<y>\d{{4}})\b)?",
+            _month_day,
+        ),
+        ("ordinal_day", rf"\b(?:the\s+)?(?P<d>\d{{1,2}}){_ORDINAL}\b", _ordinal_day),
+        (
+            "ordinal_day",
+            rf"\bon\s+the\s+(?P<d>\d{{1,2}})\b{_NOT_TIME}{_NOT_HOUR}",
+            _ordinal_day,
+        ),
+        (
+            "relative_day",
+            r"\bday\s+after\s+(?:tomorrow|tmrw?|tmw)\b"
+            r"|\b(?:today|tomorrow|tmrw|tmr|tmw|tom)\b",
+            _relative_day,
+        ),
+        ("next_week", r"\bnext\s+(?:wk|week)\b", _next_week),
+        ("weekend", r"\b(?:this\s+|the\s+)?weekend\b", _weekend),
+        ("weekday", rf"\b(?:(?P<mod>next|this|coming|on)\s+)?{_WEEKDAY}", _weekday),
+        ("named_time", r"\b(?:(?:12\s*)?(?:noon|midday)|midnight)\b", _named_time),
+        (
+            "past_to",
+            rf"\b(?P<part>half|quarter)\s+(?P<dir>past|after|to|til|till)\s+"
+            rf"(?P<h>{_HOUR})\b{_ampm('ap')}?",
+            _past_to,
+        ),
+        (
+            "range",
+            rf"\b(?:between|from)\s+{_clock('s')}\s*(?:and|-|–|to|till|until)\s*"
+            rf"{_clock('e')}\b{_NOT_HOUR}",
+            _range,
+        ),
+        (
+            "range",
+            rf"\b{_clock('s', _DIGITS)}\s*(?:-|–|to|till|until)\s*"
+            rf"{_clock('e', _DIGITS)}\b{_NOT_HOUR}",
+            _range,
+        ),
+        ("clock", rf"\b(?P<h>{_HOUR})(?:[:.](?P<m>[0-5]\d))?{_ampm('ap')}", _time),
+        ("clock", rf"\b(?P<h>{_DIGITS})[:.](?P<m>[0-5]\d)\b", _time),
+        ("clock", rf"\b(?P<h>{_HOUR})\s*o'?clock\b", _time),
+        ("clock", rf"(?:\bat|@)\s*(?P<h>{_HOUR})\b{_NOT_HOUR}", _time),
+        (
+            "period",
+            r"\b(?:this\s+|in\s+the\s+|at\s+)?(?P<period>after\s+lunch|after\s+work"
+            r"|lunch(?:time)?|morning|afternoon|evening|tonight|night)\b",
+            _period,
+        ),
+        ("bare_hour", rf"\b(?P<h>{_DIGITS})\b{_NOT_HOUR}", _time),
+    ]
+]
+
+
+# every rule needs a digit or one of these words; most chat has neither
+_CANDIDATE = re.compile(
+    r"\d|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec|mon|tue|wed|thu"
+    r"|fri|sat|sun|today|tom|tmr|tmw|tonight|noon|midday|midnight|morning|lunch"
+    r"|after|evening|night|week|half|quarter|hour|min|" + "|".join(_NUMBERS) + r")",
+    re.I,
+)
+
+
+def might_have_time(text: str) -> bool:
+    """Cheap check that *text* has anything a rule could match."""
+    return _CANDIDATE.search(text) is not None
+
+
+def _scan(text: str, today: date) -> _Parts:
+    parts = _Parts()
+    for _, pattern, rule in RULES:
+        spans = [
+            m.span()
+            for m in pattern.finditer(text)
+            if rule(m, parts, today) is not False
+        ]
+        for start, end in spans:
+            text = text[:start] + " " * (end - start) + text[end:]
+    return parts
+
+
+def _day(p: _Parts, today: date) -> date | None:
+    if p.day is not None:
+        return p.day
+    if p.days_ahead is not None:
+        return today + timedelta(days=p.days_ahead)
+    if p.weekday is not None:
+        if p.next_week:  # that weekday in the week after this one
+            monday = today - timedelta(days=today.weekday())
+            return monday + timedelta(days=7 + p.weekday)
+        ahead = (p.weekday - today.weekday()) % 7
+        if ahead == 0 and p.after_today:
+            ahead = 7
+        return today + timedelta(days=ahead)
+    if p.next_week:
+        return today + timedelta(days=7)
+    return None
+
+
+# ------------------------------------------------------------------ public API
+
+
+def resolve(text: str, now: datetime) -> Temporal | None:
+    """The first date/time expression in *text*, relative to aware *now*."""
+    now = now.replace(second=0, microsecond=0)
+    today, tz = now.date(), now.tzinfo
+    if not might_have_time(text):
+        return None
+    p = _scan(text, today)
+    if p.offset is not None:
+        return Temporal(now + p.offset)
+
+    day = _day(p, today)
+    if p.clock is None and p.period is None:
+        if day is None:
+            return None
+        return Temporal(datetime.combine(day, time(0), tzinfo=tz), grain="day")
+
+    pm_hint = _PERIODS[p.period][1] if p.period else None
+    if p.clock is None:
+        at = _PERIODS[p.period][0]
+    else:
+        hour, minute, ampm = p.clock
+        at = time(_hour(hour, ampm, pm_hint), minute)
+    start = datetime.combine(day or today, at, tzinfo=tz)
+    if start < now:
+        if day is None:
+            start += timedelta(days=1)
+        elif p.weekday is not None and p.day is None and p.days_ahead is None:
+            if not (p.after_today or p.next_week):
+                start += timedelta(days=7)
+
+    end = None
+    if p.until is not None:
+        hour, minute, ampm = p.until
+        end = datetime.combine(
+            start.date(), time(_hour(hour, ampm, pm_hint), minute), tzinfo=tz
+        )
+        if end <= start and hour < 12 and not ampm:
+            end += timedelta(hours=12)  # "between 11 and 1"
+        if end <= start:
+            end = None
+    return Temporal(start, end)
+
+
+def parse(text: str, now: datetime) -> datetime | None:
+    """Start of the first expression in *text* that names a time of day."""
+    found = resolve(text, now)
+    return found.start if found is not None and found.grain == "minute" else None
@@ -1,5 +1,55 @@
 # src/utils/time_utils.py
 
+from __future__ import annotations
+
+import os
+from datetime import datetime, tzinfo
+from zoneinfo import ZoneInfo
+
+
+def _business_tz() -> tzinfo:
+    """Zone for every stored slot: ``BUSINESS_TZ`` or the host's local zone."""
+    name = os.getenv("BUSINESS_TZ")
+    if name:
+        return ZoneInfo(name)
+    try:
+        from tzlocal import get_localzone
+
+        return get_localzone()
+    except Exception:
+        return datetime.now().astimezone().tzinfo
+
+
+BUSINESS_TZ = _business_tz()
+
+
+def now_local() -> datetime:
+    """Current time as an aware datetime in the business timezone."""
+    return datetime.now(BUSINESS_TZ)
+
+
+def as_local(dt: datetime) -> datetime:
+    """Attach (naive) or convert (aware) *dt* to the business timezone."""
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=BUSINESS_TZ)
+    return dt.astimezone(BUSINESS_TZ)
+
+
+def slot_key(dt: datetime) -> int:
+    """Canonical integer key for a slot: minutes since the Unix epoch."""
+    return int(as_local(dt).timestamp()) // 60
+
+
+def format_slot(dt: datetime) -> str:
+    """Customer-facing label, e.g. ``'Wednesday 11 March 3:15 PM'``.
+
+    The date keeps labels unique (and parseable back to the same slot) when
+    the booking horizon spans more than a week.
+    """
+    dt = as_local(dt)
+    clock = dt.strftime("%I:%M %p").lstrip("0")
+    return f"{dt:%A} {dt.day} {dt:%B} {clock}"
+
 
 def detect_weekday_in_message(message: str) -> bool:
     weekdays = [
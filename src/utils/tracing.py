@@ -0,0 +1,345 @@
+"""
+Per-request tracing.
+
+Each inbound message gets a trace: ``/incoming`` opens it (so time spent
+in the ingest queue counts) and :func:`request_trace` in the pipeline
+finishes it. Every :func:`src.utils.metrics.timed` stage that runs inside
+becomes a span – intent and slot parsing (grammar, dateparser, Duckling),
+bookings reads and writes, the memory service, Ollama, the agent's tools
+and the outbox – nested by context, including code running on the
+blocking pool.
+
+Calls to the memory service and the WhatsApp bridge carry a W3C
+``traceparent`` header; the outbox stores it with each message so the
+bridge sees the request's trace id even though delivery happens later.
+
+The last ``TRACE_KEEP`` finished traces are kept in memory for
+``GET /debug/traces``, which lists the slowest. When ``TRACE_FILE`` is set
+they are also appended to it as JSON lines by a background thread (never on
+the event loop); the file is rotated to ``<name>.1`` once it reaches
+``TRACE_FILE_MAX_MB``. Requests slower than ``TRACE_SLOW_MS`` are also
+logged.
+
+Env vars
+--------
+TRACING            set to 0 to turn tracing off
+TRACE_FILE         JSON-lines export, e.g. data/traces.jsonl (default: none)
+TRACE_FILE_MAX_MB  rotate the export at this size (default 50)
+TRACE_KEEP         finished traces kept in memory (default 500)
+TRACE_SLOW_MS      log requests slower than this (default 5000)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+# ------------------------------------------------------------------ env config
+TRACING = os.getenv("TRACING", "1") != "0"
+TRACE_FILE: str | None = os.getenv("TRACE_FILE") or None
+TRACE_FILE_MAX_MB: float = float(os.getenv("TRACE_FILE_MAX_MB", 50))
+TRACE_KEEP: int = int(os.getenv("TRACE_KEEP", 500))
+TRACE_SLOW_MS: float = float(os.getenv("TRACE_SLOW_MS", 5000))
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "attrs", "error")
+
+    def __init__(self, name: str, parent_id: str | None, attrs: dict[str, Any]):
+        self.name = name
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.attrs = attrs
+        self.error: str | None = None
+
+
+class Trace:
+    """One request: a root plus the spans opened while it was current."""
+
+    def __init__(self, name: str, **attrs: Any):
+        self.trace_id = _new_id(128)
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.root = Span(name, None, {})
+        self.spans: list[Span] = []
+        self.finished = False
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.root.end or time.perf_counter()
+        return (end - self.root.start) * 1000
+
+    def to_dict(self) -> dict[str, Any]:
+        t0 = self.root.start
+
+        def ms(value: float | None) -> float | None:
+            return None if value is None else round((value - t0) * 1000, 3)
+
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "start": datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+            "duration_ms": round(self.duration_ms, 3),
+            "attrs": self.attrs,
+            "spans": [
+                {
+                    "name": span.name,
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id or self.root.span_id,
+                    "start_ms": ms(span.start),
+                    "duration_ms": (
+                        None
+                        if span.end is None
+                        else round((span.end - span.start) * 1000, 3)
+                    ),
+                    **({"attrs": span.attrs} if span.attrs else {}),
+                    **({"error": span.error} if span.error else {}),
+                }
+                for span in self.spans
+            ],
+        }
+
+
+_trace: ContextVar[Trace | None] = ContextVar("trace", default=None)
+_span: ContextVar[Span | None] = ContextVar("trace_span", default=None)
+# a traceparent carried over from elsewhere (outbox delivery)
+_remote: ContextVar[str | None] = ContextVar("trace_remote", default=None)
+
+
+# ------------------------------------------------------------------ exporter
+
+
+class TraceExporter:
+    """Recent traces in memory plus an optional, size-rotated JSON-lines file.
+
+    File writes happen on a writer thread; when it falls ``backlog`` traces
+    behind, further traces are counted in ``dropped`` instead of queued.
+    """
+
+    def __init__(
+        self,
+        path: Path | str | None = TRACE_FILE,
+        keep: int = TRACE_KEEP,
+        max_bytes: int = int(TRACE_FILE_MAX_MB * 1024 * 1024),
+        backlog: int = 10_000,
+    ):
+        self.path = Path(path) if path else None
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._recent: deque[Trace] = deque(maxlen=keep)
+        self._lock = threading.Lock()
+        self._queue: queue.Queue[Trace | None] = queue.Queue(maxsize=backlog)
+        self._writer: threading.Thread | None = None
+        self._fh = None
+
+    def export(self, trace: Trace) -> None:
+        with self._lock:
+            self._recent.append(trace)
+            if self.path is None:
+                return
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_loop, name="trace-export", daemon=True
+                )
+                self._writer.start()
+            try:
+                self._queue.put_nowait(trace)
+            except queue.Full:
+                self.dropped += 1
+
+    def _write_loop(self) -> None:
+        while (trace := self._queue.get()) is not None:
+            try:
+                self._write(json.dumps(trace.to_dict(), default=str) + "\n")
+            except OSError as exc:
+                print(f"⚠️ Trace export to {self.path} failed: {exc}")
+
+    def _write(self, line: str) -> None:
+        if self._fh is not None and not _same_file(self.path, self._fh):
+            self._fh.close()  # another worker rotated it
+            self._fh = None
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = self.path.open("a", encoding="utf-8")
+        self._fh.write(line)
+        if self._queue.empty():
+            self._fh.flush()
+        if self._fh.tell() >= self.max_bytes:
+            self._fh.close()
+            self._fh = None
+            os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+
+    def recent(self, limit: int = 20, min_ms: float = 0) -> list[dict[str, Any]]:
+        """The slowest recent traces, slowest first."""
+        with self._lock:
+            traces = [t for t in self._recent if t.duration_ms >= min_ms]
+        traces.sort(key=lambda t: t.duration_ms, reverse=True)
+        return [t.to_dict() for t in traces[:limit]]
+
+    def get(self, trace_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            for trace in self._recent:
+                if trace.trace_id == trace_id:
+                    return trace.to_dict()
+        return None
+
+    def close(self) -> None:
+        """Write out what is queued and close the file."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def _same_file(path: Path, fh) -> bool:
+    try:
+        return os.stat(path).st_ino == os.fstat(fh.fileno()).st_ino
+    except FileNotFoundError:
+        return False
+
+
+exporter = TraceExporter()
+
+
+# ------------------------------------------------------------------ traces
+
+
+def current_trace() -> Trace | None:
+    return _trace.get()
+
+
+def start_trace(name: str, **attrs: Any) -> Trace | None:
+    """Open a trace for the current request context (finished by
+    :func:`request_trace`)."""
+    if not TRACING:
+        return None
+    trace = Trace(name, **attrs)
+    _trace.set(trace)
+    _span.set(None)
+    return trace
+
+
+@contextmanager
+def request_trace(name: str, **attrs: Any) -> Iterator[Trace | None]:
+    """Run the block inside the request's trace and finish it at the end.
+
+    Adopts the trace :func:`start_trace` opened for this message (the gap
+    becomes an ``ingest_wait`` span), or starts one.
+    """
+    if not TRACING:
+        yield None
+        return
+    trace = _trace.get()
+    if trace is None or trace.finished:
+        trace = Trace(name, **attrs)
+    else:
+        trace.attrs.update(attrs)
+        wait = Span("ingest_wait", None, {})
+        wait.start, wait.end = trace.root.start, time.perf_counter()
+        trace.spans.append(wait)
+    trace_token, span_token = _trace.set(trace), _span.set(None)
+    try:
+        yield trace
+    except BaseException as exc:
+        trace.root.error = repr(exc)
+        trace.attrs["error"] = repr(exc)
+        raise
+    finally:
+        _trace.reset(trace_token)
+        _span.reset(span_token)
+        finish(trace)
+
+
+def finish(trace: Trace) -> None:
+    trace.root.end = time.perf_counter()
+    trace.finished = True
+    exporter.export(trace)
+    if trace.duration_ms >= TRACE_SLOW_MS:
+        print(
+            f"🐢 Slow request {trace.trace_id} ({trace.duration_ms:.0f} ms): "
+            f"{trace.attrs} – see /debug/traces/{trace.trace_id}"
+        )
+
+
+# ------------------------------------------------------------------ spans
+
+
+def open_span(name: str, **attrs: Any) -> tuple[Span, Any] | None:
+    """Start a span under the current one; ``None`` outside a trace."""
+    trace = _trace.get()
+    if trace is None or trace.finished:
+        return None
+    parent = _span.get()
+    span = Span(name, parent.span_id if parent else None, attrs)
+    trace.spans.append(span)
+    return span, _span.set(span)
+
+
+def close_span(handle: tuple[Span, Any] | None, error: BaseException | None = None):
+    if handle is None:
+        return
+    span, token = handle
+    span.end = time.perf_counter()
+    if error is not None:
+        span.error = repr(error)
+    _span.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span | None]:
+    handle = open_span(name, **attrs)
+    try:
+        yield handle[0] if handle else None
+    except BaseException as exc:
+        close_span(handle, exc)
+        raise
+    close_span(handle)
+
+
+# ------------------------------------------------------------------ propagation
+
+
+def traceparent() -> str | None:
+    """W3C ``traceparent`` for the current span, if there is one."""
+    trace = _trace.get()
+    if trace is None or trace.finished:
+        return _remote.get()
+    current = _span.get() or trace.root
+    return f"00-{trace.trace_id}-{current.span_id}-01"
+
+
+def headers() -> dict[str, str]:
+    """Headers that carry the current trace to another service."""
+    value = traceparent()
+    return {"traceparent": value} if value else {}
+
+
+@contextmanager
+def remote(value: str | None) -> Iterator[None]:
+    """Make :func:`headers` return *value* (a stored ``traceparent``)."""
+    token = _remote.set(value)
+    try:
+        yield
+    finally:
+        _remote.reset(token)
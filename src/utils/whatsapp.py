@@ -1,4 +1,75 @@
-import requests
+"""
+Outbound WhatsApp client shared by every sender.
+
+All messages go to the Node bridge's ``/send`` endpoint over one
+thread-safe, pooled keep-alive ``httpx.Client``. The outbox dispatcher
+(which delivers the webhook's replies), tools and the reminder scheduler
+all send through it.
+
+Env vars
+--------
+WHATSAPP_SEND_URL   bridge endpoint (default http://localhost:3000/send)
+WHATSAPP_TIMEOUT    seconds per send (default 5)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+
+import httpx
+
+from src.utils import tracing
+from src.utils.metrics import timed
+
+# ------------------------------------------------------------------ env config
+WHATSAPP_SEND_URL = os.getenv("WHATSAPP_SEND_URL", "http://localhost:3000/send")
+WHATSAPP_TIMEOUT: float = float(os.getenv("WHATSAPP_TIMEOUT", 5))
+
+SENT_MSG = "✅ WhatsApp message sent successfully."
+
+_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+
+
+def whatsapp_client() -> httpx.Client:
+    """The process-wide pooled client for synchronous sends."""
+    global _client
+    if _client is None or _client.is_closed:
+        with _client_lock:
+            if _client is None or _client.is_closed:
+                _client = httpx.Client(
+                    timeout=WHATSAPP_TIMEOUT,
+                    limits=httpx.Limits(
+                        max_connections=100, max_keepalive_connections=20
+                    ),
+                )
+    return _client
+
+
+def close_whatsapp_client() -> None:
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+# ------------------------------------------------------------------ raw sends
+
+
+@timed("bridge")
+def post_message(number: str, message: str) -> None:
+    """POST one message to the bridge; raises ``httpx.HTTPError`` on failure."""
+    res = whatsapp_client().post(
+        WHATSAPP_SEND_URL,
+        json={"number": number, "message": message},
+        headers=tracing.headers(),
+    )
+    res.raise_for_status()
+
+
+# ------------------------------------------------------------------ senders
 
 
 def send_whatsapp_message(number: str, message: str) -> str:
@@ -10,19 +81,14 @@ def send_whatsapp_message(number: str, message: str) -> str:
         message (str): The message text to send
 
     Returns:
-        str: Status message
+        str: Status message (failures are logged, never raised)
     """
-    url = "http://localhost:3000/send"
-    payload = {"number": number, "message": message}
-
-    print(f"🛠️ Inside send_whatsapp_message with payload: {payload}")
-
+    print(f"📤 Sending WhatsApp message to {number}: {message!r}")
     try:
-        res = requests.post(url, json=payload)
-        res.raise_for_status()
-        print("✅ WhatsApp message sent successfully.")
-        return "✅ WhatsApp message sent successfully."
+        post_message(number, message)
     except Exception as e:
         error_msg = f"❌ Failed to send WhatsApp message: {e}"
         print(error_msg)
         return error_msg
+    print(SENT_MSG)
+    return SENT_MSG
@@ -0,0 +1,92 @@
+# tests/test_availability.py
+# Per-day free-slot bitmaps
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from datetime import datetime, timedelta, timezone
+
+from src.storage import AvailabilityIndex, open_store
+from src.storage.base import slot_at_of
+
+# Friday 3 May 2030, 9:00 UTC
+OPEN = datetime(2030, 5, 3, 9, tzinfo=timezone.utc)
+Q = timedelta(minutes=15)
+
+
+@pytest.fixture
+def availability(tmp_path):
+    store = open_store("journal", tmp_path / "bookings.json")
+    store.put("early", {"slot_at": OPEN.isoformat()})
+    index = AvailabilityIndex(
+        store, slot_at_of, tz=timezone.utc, start_hour=9, end_hour=17
+    )
+    yield index
+    index.close()
+    store.close()
+
+
+def test_free_slots_skip_taken_and_past(availability):
+    store = availability.store
+    store.put("a", {"slot_at": (OPEN + Q).isoformat()})
+
+    assert availability.slots_per_day == 32
+    assert not availability.is_free(OPEN)
+    assert availability.free_slots(OPEN, days=1, limit=2) == [
+        OPEN + 2 * Q,
+        OPEN + 3 * Q,
+    ]
+    assert availability.free_slots(
+        OPEN + 2 * Q + timedelta(seconds=1), days=1, limit=1
+    ) == [OPEN + 3 * Q]
+    assert availability.next_free(OPEN - Q, days=1) == OPEN + 2 * Q
+
+
+def test_bitmaps_follow_writes(availability):
+    store = availability.store
+    store.put("early", {"slot_at": (OPEN + Q).isoformat()})
+    assert availability.is_free(OPEN)
+    assert not availability.is_free(OPEN + Q)
+
+    store.delete("early")
+    assert availability.free_mask(OPEN.date()) == availability.day_mask
+
+    # off-grid and after-hours bookings never touch the bitmaps
+    store.put("odd", {"slot_at": (OPEN + timedelta(minutes=7)).isoformat()})
+    store.put("late", {"slot_at": (OPEN + timedelta(hours=9)).isoformat()})
+    assert availability.free_mask(OPEN.date()) == availability.day_mask
+
+
+def test_scan_rolls_over_days_and_filters_weekdays(availability):
+    last = OPEN + 31 * Q
+    assert availability.next_free(last, days=2) == OPEN + timedelta(days=1)
+
+    monday = availability.free_slots(OPEN, days=7, limit=1, weekdays={0})
+    assert monday == [OPEN + timedelta(days=3)]
+
+
+def test_capacity_counts_free_resources(availability):
+    store = availability.store
+    index = AvailabilityIndex(
+        store,
+        slot_at_of,
+        tz=timezone.utc,
+        start_hour=9,
+        end_hour=17,
+        resources=["default", "alice", "room-2"],
+    )
+    store.put("a", {"slot_at": OPEN.isoformat(), "resource": "alice"})
+    store.put("b", {"slot_at": (OPEN + Q).isoformat(), "resource": "room-2"})
+
+    capacity = index.capacity(OPEN.date())
+    assert capacity[:3] == [1, 2, 3]
+    assert index.free_resources(OPEN) == ["room-2"]
+    assert index.free_slots(OPEN, days=1, limit=1) == [OPEN]
+
+    store.put("c", {"slot_at": OPEN.isoformat(), "resource": "room-2"})
+    assert index.free_slots(OPEN, days=1, limit=1) == [OPEN + Q]
+    index.close()
@@ -0,0 +1,84 @@
+# tests/test_booking_session.py
+# One read and at most one write per request, with atomic reschedules
+
+import sys
+import os
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import pytest
+
+from datetime import datetime
+
+from src.config.calendar import BusinessCalendar, set_calendar
+from src.storage import open_store, set_store
+from src.storage.base import SlotConflict
+from src.handlers import booking_handler
+from src.utils.time_utils import BUSINESS_TZ
+from src.handlers.booking_session import BookingSession, booking_session
+
+NINE = datetime(2030, 5, 3, 9, tzinfo=BUSINESS_TZ)
+TEN = datetime(2030, 5, 3, 10, tzinfo=BUSINESS_TZ)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = open_store("journal", tmp_path / "bookings.json")
+    set_store(store)
+    set_calendar(BusinessCalendar({}))
+    yield store
+    set_store(None)
+    set_calendar(None)
+
+
+def test_reschedule_is_one_read_and_one_write(store):
+    booking_handler.save_individual_booking("a", NINE, email="a@x.io")
+
+    with booking_session("a") as session:
+        assert booking_handler.get_user_booking("a")
+        assert booking_handler.cancel_booking("a")
+        booking_handler.save_individual_booking("a", TEN)
+        session.update(awaiting_selection=False)
+        assert store.get("a")["slot_at"] == NINE.isoformat()
+
+    assert (session.reads, session.writes) == (1, 1)
+    record = store.get("a")
+    assert record["slot_at"] == TEN.isoformat()
+    assert record["version"] == 2
+
+
+def test_unchanged_session_does_not_write(store):
+    with booking_session("nobody") as session:
+        assert booking_handler.get_user_booking("nobody") is None
+        session.update(awaiting_selection=True)
+        session.update(awaiting_selection=False)
+        session.delete()
+
+    assert (session.reads, session.writes) == (1, 0)
+
+
+def test_failed_reschedule_keeps_old_booking(store):
+    booking_handler.save_individual_booking("a", NINE)
+    session = BookingSession("a")
+    session.delete()
+    session.apply(lambda rec: {"slot_at": TEN.isoformat()})
+    booking_handler.save_individual_booking("b", TEN)
+
+    with pytest.raises(SlotConflict):
+        session.commit()
+    session.rollback()
+    session.commit()
+    assert store.get("a")["slot_at"] == NINE.isoformat()
+
+
+def test_commit_replays_changes_after_concurrent_write(store):
+    store.put("a", {"n": 1})
+    session = BookingSession("a")
+    session.apply(lambda rec: {**rec, "n": rec["n"] + 1})
+    store.update("a", email="a@x.io")
+
+    session.commit()
+    assert session.reads == 2
+    assert store.get("a") == {"n": 2, "email": "a@x.io", "version": 3}
@@ -0,0 +1,111 @@
+# tests/test_calendar.py
+# Business calendar compilation and lookups
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+
+from datetime import date, datetime, timedelta
+
+from src.config import calendar as cal_module
+from src.config.calendar import BusinessCalendar
+from src.utils.time_utils import BUSINESS_TZ
+
+MONDAY = date(2030, 5, 6)
+
+
+def _at(day, hour, minute=0):
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=BUSINESS_TZ)
+
+
+CONFIG = {
+    "buffer_minutes": 5,
+    "default_duration": 30,
+    "services": {"colour": 90},
+    "hours": {"monday": [["09:00", "17:00"]], "saturday": [["10:00", "12:00"]]},
+    "breaks": [["12:00", "12:30"]],
+    "holidays": ["2030-05-13"],
+    "closures": [["2030-05-06T15:00", "2030-05-06T17:00"]],
+}
+
+
+def test_hours_breaks_holidays_and_closures():
+    cal = BusinessCalendar(CONFIG)
+    assert cal.is_open(_at(MONDAY, 9))
+    assert not cal.is_open(_at(MONDAY, 11, 45))  # runs into the break
+    assert cal.is_open(_at(MONDAY, 12, 30))
+    assert not cal.is_open(_at(MONDAY, 15))  # closure
+    assert not cal.is_open(_at(MONDAY + timedelta(days=1), 10))  # tuesday closed
+    assert not cal.is_open(_at(MONDAY + timedelta(days=7), 10))  # holiday
+    assert cal.is_open(_at(MONDAY + timedelta(days=5), 10))
+
+
+def test_services_and_buffers_shape_the_grid():
+    cal = BusinessCalendar(CONFIG)
+    assert cal.span() == 3  # 30 min + 5 min buffer on a 15 min grid
+    assert cal.span("colour") == 7
+    assert not cal.is_open(_at(MONDAY, 11), "colour")
+
+    slots = cal.slots(_at(MONDAY, 0), days=1, service="colour")
+    assert slots[0] == _at(MONDAY, 9)
+    assert slots[-1] == _at(MONDAY, 13, 30)
+    assert _at(MONDAY, 10, 45) not in slots
+
+
+def test_get_calendar_recompiles_when_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / "calendar.json"
+    path.write_text(json.dumps({"slot_minutes": 30}))
+    monkeypatch.setattr(cal_module, "CALENDAR_FILE", path)
+    cal_module.set_calendar(None)
+
+    first = cal_module.get_calendar()
+    assert first.slot_minutes == 30
+    assert cal_module.get_calendar() is first
+
+    path.write_text(json.dumps({"slot_minutes": 20}))
+    os.utime(path, (1, 1))
+    assert cal_module.get_calendar().slot_minutes == 20
+    cal_module.set_calendar(None)
+
+
+def test_bookings_block_their_length_and_buffer(tmp_path):
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+    from src.handlers import booking_handler
+    from src.storage import open_store, set_store
+
+    set_store(open_store("journal", tmp_path / "bookings.json"))
+    cal_module.set_calendar(BusinessCalendar(CONFIG))
+    try:
+        booking_handler.save_individual_booking("a", _at(MONDAY, 9))
+        assert booking_handler.slot_taken(_at(MONDAY, 9, 15))
+        assert booking_handler.slot_taken(_at(MONDAY, 8, 45))  # before opening
+        assert booking_handler.next_free_slot(_at(MONDAY, 9)) == _at(MONDAY, 9, 45)
+        assert not booking_handler.slot_taken(_at(MONDAY, 9, 15), exclude_user="a")
+    finally:
+        set_store(None)
+        cal_module.set_calendar(None)
+
+
+def test_two_week_menu_labels_pick_the_exact_day(tmp_path):
+    from src.handlers import booking_handler
+    from src.storage import open_store, set_store
+
+    store = open_store("journal", tmp_path / "bookings.json")
+    set_store(store)
+    cal_module.set_calendar(
+        BusinessCalendar(
+            {"days_ahead": 14, "hours": {"wednesday": [["15:00", "15:15"]]}}
+        )
+    )
+    try:
+        slots = booking_handler.free_slots()
+        labels = booking_handler.get_booking_options(raw=True)
+        assert len(labels) == len(set(labels)) == len(slots) >= 2
+        booking_handler.handle_booking_response("a", "2", {"a": labels})
+        assert store.get("a")["slot_at"] == slots[1].isoformat()
+    finally:
+        set_store(None)
+        cal_module.set_calendar(None)
@@ -0,0 +1,160 @@
+# tests/test_concurrency.py
+# Concurrent bookings must never double-book a slot or lose a write
+
+import sys
+import os
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import pytest
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from src.config.calendar import BusinessCalendar, set_calendar
+from src.storage import BACKENDS, open_store, set_store
+from src.storage.base import SlotConflict, block_of, overlaps
+from src.handlers import booking_handler
+from src.handlers.booking_session import booking_session
+from src.utils.time_utils import BUSINESS_TZ
+
+SLOTS = [
+    datetime(2030, 5, 3, 9, tzinfo=BUSINESS_TZ) + timedelta(minutes=15 * i)
+    for i in range(10)
+]
+USERS = 200
+ATTEMPTS = 3000
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def store(request, tmp_path):
+    suffix = ".db" if request.param == "sqlite" else ".json"
+    store = open_store(request.param, tmp_path / f"bookings{suffix}")
+    set_store(store)
+    set_calendar(BusinessCalendar({}))
+    yield store
+    set_store(None)
+    set_calendar(None)
+
+
+def test_concurrent_bookings_never_double_book(store):
+    def attempt(i):
+        user = f"user-{i % USERS}"
+        slot = SLOTS[(i * 7) % len(SLOTS)]
+        try:
+            booking_handler.save_individual_booking(user, slot, email=f"{user}@x.io")
+            return "booked"
+        except SlotConflict:
+            return "conflict"
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        outcomes = Counter(pool.map(attempt, range(ATTEMPTS)))
+
+    bookings = store.load_all()
+    holders = Counter(rec["slot_at"] for rec in bookings.values())
+    assert holders and max(holders.values()) == 1
+    assert outcomes["booked"] >= len(holders)
+    assert outcomes["booked"] + outcomes["conflict"] == ATTEMPTS
+    for user, rec in bookings.items():
+        assert rec["email"] == f"{user}@x.io"
+        assert rec["version"] >= 1
+
+
+def test_concurrent_bookings_fill_each_resource_once(store, monkeypatch):
+    monkeypatch.setattr(booking_handler, "RESOURCES", ["alice", "bob", "room-3"])
+
+    def attempt(i):
+        try:
+            booking_handler.save_individual_booking(f"user-{i}", SLOTS[i % 2])
+            return True
+        except SlotConflict:
+            return False
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        booked = sum(pool.map(attempt, range(200)))
+
+    claims = Counter(
+        (rec["slot_at"], rec["resource"]) for rec in store.load_all().values()
+    )
+    assert booked == len(claims) == 6
+    assert max(claims.values()) == 1
+    assert booking_handler.remaining_capacity(SLOTS[0]) == 0
+
+
+def test_session_commit_moves_to_a_free_resource(store, monkeypatch):
+    monkeypatch.setattr(booking_handler, "RESOURCES", ["alice", "bob"])
+    with booking_session("late") as session:
+        booking_handler.save_individual_booking("late", SLOTS[0])
+        assert session.get("resource") == "alice"
+        # another request takes alice before this one commits
+        booking_handler.save_individual_booking("early", SLOTS[0], resource="alice")
+    assert store.get("late")["resource"] == "bob"
+
+    with booking_session("last") as session:
+        booking_handler.save_individual_booking("last", SLOTS[1])
+        booking_handler.save_individual_booking("a", SLOTS[1], resource="alice")
+        booking_handler.save_individual_booking("b", SLOTS[1], resource="bob")
+        with pytest.raises(SlotConflict):
+            session.commit()
+        session.rollback()
+    assert store.get("last") is None
+
+
+def test_concurrent_updates_keep_every_write(store):
+    store.put("counter", {"n": 0})
+
+    def bump(_):
+        booking_handler.mutate_booking(
+            "counter", lambda rec: {**rec, "n": rec["n"] + 1}, retries=10_000
+        )
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(bump, range(500)))
+
+    assert store.get("counter")["n"] == 500
+
+
+def test_multi_slot_bookings_never_overlap(store):
+    # 30 minutes + 5 minute buffer: every booking blocks three 15-minute slots
+    set_calendar(BusinessCalendar({"default_duration": 30, "buffer_minutes": 5}))
+
+    with booking_session("early") as session:
+        booking_handler.save_individual_booking("early", SLOTS[0])
+        # another customer takes 9:15 while the 9:00 booking is only staged
+        booking_handler.save_individual_booking("late", SLOTS[1])
+        with pytest.raises(SlotConflict):
+            session.commit()
+        session.rollback()
+    assert store.get("early") is None
+
+    def attempt(i):
+        try:
+            booking_handler.save_individual_booking(f"user-{i}", SLOTS[i % 6])
+            return True
+        except SlotConflict:
+            return False
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(attempt, range(200)))
+
+    blocks = sorted(block_of(rec) for rec in store.load_all().values())
+    assert len(blocks) >= 2
+    assert all(not overlaps(a, b) for a, b in zip(blocks, blocks[1:]))
+
+
+def test_bulk_save_skips_and_reports_stale_records(store):
+    from src.utils import metrics
+
+    store.put("a", {"n": 0})
+    store.put("b", {"n": 0})
+    snapshot = booking_handler.load_bookings()
+    store.update("a", n=1)  # written by someone else after the load
+    snapshot["a"]["n"] = snapshot["b"]["n"] = 2
+
+    before = metrics.STALE_WRITES.value()
+    assert booking_handler.save_all_bookings(snapshot) == ["a"]
+    assert metrics.STALE_WRITES.value() == before + 1
+    assert store.get("a")["n"] == 1 and store.get("b")["n"] == 2
@@ -0,0 +1,45 @@
+# tests/test_dedup.py
+# Redelivered webhook messages are recognised and answered from cache
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+
+from src.utils.dedup import DedupCache, message_key
+
+
+def test_message_key_prefers_id_then_fingerprint():
+    assert message_key({"id": "true_555@c.us_ABC", "message": "hi"}) == (
+        "id:true_555@c.us_ABC"
+    )
+    first = message_key({"number": "555", "message": "hi", "timestamp": 1700000000})
+    again = message_key({"number": "555", "message": "hi", "timestamp": 1700000000})
+    later = message_key({"number": "555", "message": "hi", "timestamp": 1700000009})
+    assert first == again != later
+    assert message_key({"number": "555", "message": "hi"}) is None
+
+
+def test_cache_is_bounded_expires_and_persists(tmp_path):
+    path = tmp_path / "dedup.jsonl"
+    cache = DedupCache(maxsize=2, ttl=60, path=path)
+    cache.put("a", (202, {"status": "queued"}))
+    cache.put("b", (200, {"status": "lookup"}))
+    assert cache.get("a") == (202, {"status": "queued"})
+    cache.put("c", (200, {"status": "cancel"}))  # evicts "b", the least recent
+    assert cache.get("b") is None
+    cache.discard("c")
+    cache.close()
+
+    reopened = DedupCache(maxsize=2, ttl=60, path=path)
+    assert reopened.get("a") == [202, {"status": "queued"}]
+    assert reopened.get("c") is None
+    reopened.close()
+
+    short = DedupCache(maxsize=2, ttl=0.01, path=None)
+    short.put("a", 1)
+    time.sleep(0.02)
+    assert short.get("a") is None
+    assert short.stats() == {"entries": 0, "hits": 0, "misses": 1}
@@ -0,0 +1,85 @@
+# tests/test_duckling.py
+# the Duckling fallback is gated, remembers misses and stops calling a dead server
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.utils import duckling
+from src.utils.circuit_breaker import CircuitBreaker
+from src.utils.dedup import DedupCache
+
+REFTIME = datetime(2026, 3, 6, 12, 0, tzinfo=timezone.utc)
+
+
+class _Duckling(BaseHTTPRequestHandler):
+    status = 200
+    seen: list = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.seen.append(body["text"])
+        entities = []
+        if "friday" in body["text"]:
+            entities = [{"dim": "time", "value": {"value": "2026-03-06T14:00:00Z"}}]
+        data = json.dumps(entities).encode()
+        self.send_response(self.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    _Duckling.status, _Duckling.seen = 200, []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Duckling)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    monkeypatch.setattr(
+        duckling, "DUCKLING_URL", f"http://127.0.0.1:{httpd.server_port}/parse"
+    )
+    monkeypatch.setattr(duckling, "breaker", CircuitBreaker("test", 2, 0.2))
+    monkeypatch.setattr(duckling, "negative_cache", DedupCache(16, 60, path=None))
+    yield _Duckling
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_gate_and_negative_cache(server):
+    assert not duckling.might_have_time("hi there, thanks!")
+    assert not duckling.might_have_time("mail me at anna.mon@example.com")
+    assert duckling.might_have_time("tomorrow at noon")
+
+    assert duckling.parse("hi there", REFTIME) is None
+    assert duckling.parse("see you friday", REFTIME) == datetime(
+        2026, 3, 6, 14, 0, tzinfo=timezone.utc
+    )
+    assert duckling.parse("next one please", REFTIME) is None
+    assert duckling.parse("next one please", REFTIME) is None  # remembered
+    assert server.seen == ["see you friday", "next one please"]
+
+
+def test_circuit_opens_and_recovers(server, monkeypatch):
+    server.status = 500
+    for _ in range(4):
+        assert duckling.parse("friday at 2", REFTIME) is None
+    assert len(server.seen) == 2  # opened after two failures
+    assert duckling.breaker.stats()["open"] == 1
+
+    server.status = 200
+    clock = duckling.breaker._opened_at + 1
+    monkeypatch.setattr("src.utils.circuit_breaker.time.monotonic", lambda: clock)
+    assert duckling.parse("friday at 2", REFTIME) is not None  # the probe
+    assert duckling.breaker.stats()["open"] == 0
+    assert len(server.seen) == 3
@@ -0,0 +1,173 @@
+# tests/test_incoming.py
+# The /incoming webhook end to end: routing, sessions, dedup, ordering, metrics
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import re
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import receiver
+from src.ingest_queue import IngestQueue
+from src.handlers.booking_handler import PastSlot, save_individual_booking
+from src.config.calendar import BusinessCalendar, set_calendar
+from src.outbox import Outbox, get_outbox, set_outbox
+from src.storage import get_store, open_store, set_store
+from src.utils.dedup import DedupCache
+from src.utils.time_utils import now_local
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """A TestClient on a fresh store, calendar and (undelivered) outbox."""
+    set_store(open_store("journal", tmp_path / "bookings.json"))
+    set_calendar(BusinessCalendar({}))
+    set_outbox(Outbox(tmp_path / "outbox.db", send=lambda number, message: None))
+    monkeypatch.setattr(receiver, "dedup", DedupCache(path=None))
+    monkeypatch.setattr(receiver, "INGEST_WORKERS", 0)
+    # no leader election, scheduler or dispatcher thread during tests
+    monkeypatch.setattr(receiver, "_warm_up", lambda: None)
+    with TestClient(receiver.app) as client:
+        yield client
+    set_outbox(None)
+    set_store(None)
+    set_calendar(None)
+
+
+def _gauge(text: str, name: str) -> int:
+    match = re.search(rf"^{name} (\d+)", text, re.M)
+    assert match, f"{name} missing from /metrics"
+    return int(match.group(1))
+
+
+def test_metrics_sees_the_slot_cache_the_webhook_fills(client):
+    before = client.get("/metrics").text
+    for user in ("111", "222"):
+        r = client.post(
+            "/incoming", json={"number": user, "message": "book tomorrow at 3pm"}
+        )
+        assert r.status_code == 200
+    after = client.get("/metrics").text
+    assert _gauge(after, "whatsapp_slot_cache_misses") > _gauge(
+        before, "whatsapp_slot_cache_misses"
+    )
+    assert _gauge(after, "whatsapp_slot_cache_hits") > _gauge(
+        before, "whatsapp_slot_cache_hits"
+    )
+
+
+def test_reschedule_is_one_read_and_one_write(client, monkeypatch):
+    store = get_store()
+    assert client.post(
+        "/incoming", json={"number": "111", "message": "book tomorrow at 3pm"}
+    ).json() == {"status": "ask email"}
+    client.post("/incoming", json={"number": "111", "message": "skip"})
+
+    calls: list[str] = []
+    for name in ("get", "put", "cas", "update", "delete"):
+        method = getattr(store, name)
+
+        def counted(*args, _name=name, _method=method, **kwargs):
+            calls.append(_name)
+            return _method(*args, **kwargs)
+
+        monkeypatch.setattr(store, name, counted)
+
+    r = client.post(
+        "/incoming", json={"number": "111", "message": "reschedule to tomorrow at 4pm"}
+    )
+    assert r.json()["status"] == "ask email"
+    assert calls == ["get", "cas"]  # cancel + book + flags commit together
+    record = store.get("111")
+    assert record["time"].endswith("4:00 PM") and record["awaiting_email"]
+
+
+def test_queued_messages_are_handled_in_order_per_user(client, monkeypatch):
+    monkeypatch.setattr(receiver, "INGEST_WORKERS", 4)
+    monkeypatch.setattr(
+        receiver, "ingest", IngestQueue(receiver.process_message, workers=4)
+    )
+    handled: list[tuple[str, int]] = []
+    lock = threading.Lock()
+
+    def handle(user, message):
+        n = int(message)
+        time.sleep(0.02 * (5 - n))  # early messages are the slow ones
+        with lock:
+            handled.append((user, n))
+        return {"status": "ok"}, []
+
+    monkeypatch.setattr(receiver, "handle_message", handle)
+    for n in range(5):
+        for user in ("111", "222", "333"):
+            r = client.post("/incoming", json={"number": user, "message": str(n)})
+            assert r.status_code == 202 and r.json() == {"status": "queued"}
+
+    deadline = time.monotonic() + 10
+    while len(handled) < 15 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    for user in ("111", "222", "333"):
+        assert [n for u, n in handled if u == user] == [0, 1, 2, 3, 4]
+
+
+def test_redelivered_message_is_answered_once(client, monkeypatch):
+    handled: list[str] = []
+
+    def handle(user, message):
+        handled.append(message)
+        return {"status": "ok", "n": len(handled)}, []
+
+    monkeypatch.setattr(receiver, "handle_message", handle)
+    payload = {"id": "wamid.1", "number": "111", "message": "hello there"}
+    first = client.post("/incoming", json=payload)
+    again = client.post("/incoming", json=payload)
+    assert first.json() == {"status": "ok", "n": 1}
+    assert again.status_code == 200
+    assert again.json() == {"status": "ok", "n": 1, "duplicate": True}
+
+    # no id: the bridge's timestamp makes the fingerprint
+    stamped = {"number": "111", "message": "hello there", "timestamp": 1700000000}
+    client.post("/incoming", json=stamped)
+    assert client.post("/incoming", json=stamped).json()["duplicate"] is True
+    assert handled == ["hello there", "hello there"]
+
+
+def test_a_time_that_has_passed_is_not_booked(client):
+    r = client.post(
+        "/incoming", json={"number": "111", "message": "book today at 12:00am"}
+    )
+    assert r.json() == {"status": "slot in past"}
+    assert get_store().get("111") is None
+    assert get_outbox().stats()["pending"] == 1  # the "already passed" reply
+    with pytest.raises(PastSlot):
+        save_individual_booking("111", now_local() - timedelta(hours=1))
+
+
+def test_agent_is_loaded_off_the_event_loop(monkeypatch):
+    import asyncio
+
+    threads = {}
+
+    class FakeAgent:
+        async def think_llm_async(self, message):
+            threads["loop"] = threading.get_ident()
+            return "SendWhatsappMsg", {}
+
+        def act(self, tool, args, message):
+            return "sent"
+
+    def new_agent(user_number):
+        threads["import"] = threading.get_ident()
+        return FakeAgent()
+
+    monkeypatch.setattr(receiver, "_new_agent", new_agent)
+    result = asyncio.run(receiver.run_agent("111", "what is the meaning of life"))
+    assert result["response"] == "sent"
+    assert threads["import"] != threads["loop"]
@@ -0,0 +1,60 @@
+# tests/test_ingest_queue.py
+# Per-user ordering and backpressure of the ingestion queue
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import random
+
+from src.ingest_queue import IngestQueue
+
+
+def test_messages_stay_in_order_per_user_and_run_concurrently():
+    seen: dict[str, list[int]] = {}
+    running = peak = 0
+
+    async def handler(user, message):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(random.random() / 1000)
+        seen.setdefault(user, []).append(int(message))
+        running -= 1
+
+    async def main():
+        queue = IngestQueue(handler, workers=8, maxsize=1000)
+        for i in range(400):
+            assert await queue.submit(f"user-{i % 20}", str(i))
+        await queue.join()
+        stats = queue.stats()
+        await queue.stop()
+        return stats
+
+    stats = asyncio.run(main())
+    assert stats["processed"] == stats["enqueued"] == 400
+    assert stats["depth"] == 0
+    assert all(msgs == sorted(msgs) and len(msgs) == 20 for msgs in seen.values())
+    assert peak > 1
+
+
+def test_full_queue_rejects_after_timeout():
+    release = asyncio.Event()
+
+    async def handler(user, message):
+        await release.wait()
+
+    async def main():
+        queue = IngestQueue(handler, workers=1, maxsize=2, enqueue_timeout=0.05)
+        # one message in flight, two waiting, the fourth finds no room
+        accepted = [await queue.submit("user", str(i)) for i in range(4)]
+        stats = queue.stats()
+        release.set()
+        await queue.stop()
+        return accepted, stats
+
+    accepted, stats = asyncio.run(main())
+    assert accepted == [True, True, True, False]
+    assert stats["rejected"] == 1 and stats["depth"] == 2
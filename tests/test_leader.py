@@ -0,0 +1,36 @@
+# tests/test_leader.py
+# Exactly one process runs the singleton jobs, and a follower takes over
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+
+from src.utils.leader import LeaderElection
+
+
+def test_one_leader_and_failover(tmp_path):
+    path = tmp_path / "leader.lock"
+    events = []
+    took_over = threading.Event()
+
+    first = LeaderElection(
+        lambda: events.append("first"),
+        lambda: events.append("first resigned"),
+        path=path,
+        retry=0.01,
+    ).start()
+    second = LeaderElection(
+        lambda: (events.append("second"), took_over.set()), path=path, retry=0.01
+    ).start()
+
+    assert first.is_leader and not second.is_leader
+    assert path.read_text().strip() == str(os.getpid())
+
+    first.stop()
+    assert took_over.wait(5)
+    assert second.is_leader
+    assert events == ["first", "first resigned", "second"]
+    second.stop()
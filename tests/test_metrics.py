@@ -0,0 +1,57 @@
+# tests/test_metrics.py
+# Stage timers and the Prometheus text rendering behind /metrics
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+
+import pytest
+
+from src.utils import metrics
+from src.utils.metrics import Histogram, timed
+
+
+def test_histogram_renders_cumulative_buckets():
+    hist = Histogram("t_seconds", "Test.", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        hist.observe(value, "parse")
+    lines = hist.render()
+    assert 't_seconds_bucket{stage="parse",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{stage="parse",le="1.0"} 3' in lines
+    assert 't_seconds_bucket{stage="parse",le="+Inf"} 4' in lines
+    assert 't_seconds_count{stage="parse"} 4' in lines
+    assert 't_seconds_sum{stage="parse"} 6.05' in lines
+
+
+def test_timed_records_sync_async_and_failures():
+    hist = Histogram("t2_seconds", "Test.", ["stage"])
+
+    @timed("sync", hist)
+    def work():
+        return 1
+
+    @timed("async", hist)
+    async def awork():
+        return 2
+
+    with pytest.raises(ValueError):
+        with timed("boom", hist):
+            raise ValueError
+
+    assert work() == 1 and asyncio.run(awork()) == 2
+    assert [hist.count(s) for s in ("sync", "async", "boom")] == [1, 1, 1]
+    assert metrics.STAGE_ERRORS.value("boom") == 1
+
+
+def test_render_exports_numeric_stats_as_gauges():
+    metrics.register_stats("t_queue", lambda: {"depth": 3, "mode": "batched"})
+    try:
+        text = metrics.render()
+    finally:
+        metrics._stats.pop("t_queue")
+    assert "# TYPE t_queue_depth gauge\nt_queue_depth 3\n" in text
+    assert "t_queue_mode" not in text
+    assert "# TYPE whatsapp_stage_seconds histogram" in text
@@ -0,0 +1,121 @@
+# tests/test_outbox.py
+# Durable outbound queue: ordering, retries, dead letters and rate limits
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+import time
+
+from src.outbox import Outbox, TokenBucket
+
+
+def make_outbox(tmp_path, send, **kwargs):
+    options = dict(rate=1000, burst=1000, recipient_rate=1000, recipient_burst=1000)
+    options.update(kwargs)
+    return Outbox(tmp_path / "outbox.db", send=send, backoff_base=0.01, **options)
+
+
+def test_retries_keep_per_recipient_order(tmp_path):
+    delivered: list[tuple[str, str]] = []
+    failures = {"a-0": 2}
+    lock = threading.Lock()
+
+    def send(number, message):
+        with lock:
+            if failures.get(message):
+                failures[message] -= 1
+                raise ConnectionError("bridge down")
+            delivered.append((number, message))
+
+    outbox = make_outbox(tmp_path, send)
+    ids = outbox.enqueue_many("a", [f"a-{i}" for i in range(5)])
+    for i in range(5):
+        outbox.enqueue("b", f"b-{i}")
+    outbox.start()
+    assert outbox.flush(timeout=5)
+
+    for number in "ab":
+        assert [m for n, m in delivered if n == number] == [
+            f"{number}-{i}" for i in range(5)
+        ]
+    assert outbox.status(ids[0])["attempts"] == 3
+    assert outbox.stats()["retried"] == 2
+    outbox.close()
+
+
+def test_exhausted_messages_are_dead_lettered_and_requeued(tmp_path):
+    healthy = threading.Event()
+
+    def send(number, message):
+        if message == "poison" and not healthy.is_set():
+            raise ConnectionError("rejected")
+
+    outbox = make_outbox(tmp_path, send, max_attempts=3).start()
+    poison = outbox.enqueue("a", "poison")
+    after = outbox.enqueue("a", "next")
+    assert outbox.flush(timeout=5)
+
+    assert outbox.status(poison)["status"] == "dead"
+    assert outbox.status(poison)["last_error"] == "rejected"
+    assert outbox.status(after)["status"] == "sent"
+    assert [row["id"] for row in outbox.dead_letters()] == [poison]
+
+    healthy.set()
+    assert outbox.requeue(poison)
+    assert outbox.flush(timeout=5)
+    assert outbox.status(poison)["status"] == "sent"
+    outbox.close()
+
+
+def test_pending_messages_survive_a_restart(tmp_path):
+    outbox = make_outbox(tmp_path, lambda n, m: None)
+    outbox.enqueue("a", "hello")
+    outbox.close()
+
+    sent = []
+    outbox = make_outbox(tmp_path, lambda n, m: sent.append(m)).start()
+    assert outbox.flush(timeout=5)
+    assert sent == ["hello"]
+    outbox.close()
+
+
+def test_recipient_rate_limit_spaces_out_sends(tmp_path):
+    stamps = []
+    outbox = make_outbox(
+        tmp_path,
+        lambda n, m: stamps.append(time.monotonic()),
+        recipient_rate=20,
+        recipient_burst=1,
+    ).start()
+    outbox.enqueue_many("a", ["1", "2", "3", "4"])
+    assert outbox.flush(timeout=5)
+    assert stamps[-1] - stamps[0] >= 3 / 20 * 0.9
+    outbox.close()
+
+    bucket = TokenBucket(rate=10, burst=2)
+    now = bucket.stamp
+    assert bucket.ready(now)
+    bucket.take()
+    bucket.take()
+    assert not bucket.ready(now)
+    assert abs(bucket.wait_time(now) - 0.1) < 1e-9
+
+
+def test_sent_messages_are_pruned_after_the_retention(tmp_path):
+    outbox = make_outbox(tmp_path, lambda number, message: None, retention=3600)
+    old, new = outbox.enqueue("a", "old"), outbox.enqueue("a", "new")
+    outbox.start()
+    assert outbox.flush(timeout=5)
+    with outbox._db_lock:
+        outbox._db.execute(
+            "UPDATE outbox SET sent_at = sent_at - 7200 WHERE id = ?", (old,)
+        )
+
+    assert outbox.prune() == 1
+    assert outbox.status(old) is None and outbox.status(new)["status"] == "sent"
+    stats = outbox.stats()
+    assert stats["sent"] == 1 and stats["pruned"] == 1
+    outbox.close()
@@ -0,0 +1,55 @@
+# tests/test_reminder_scheduler.py
+# Reminder flags land on the booking they were sent for, and only on it
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from datetime import timedelta
+
+import pytest
+
+from src import reminder_scheduler
+from src.storage import open_store, set_store
+from src.utils.time_utils import now_local
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = open_store("journal", tmp_path / "bookings.json")
+    set_store(store)
+    monkeypatch.setattr(reminder_scheduler, "_send_email", lambda *a: True)
+    yield store
+    set_store(None)
+
+
+def test_reminder_flags_are_stamped(store, monkeypatch):
+    monkeypatch.setattr(reminder_scheduler, "_send_sms", lambda number, msg: True)
+    soon = (now_local() + timedelta(minutes=30)).isoformat()
+    store.put("111", {"slot_at": soon, "email": "a@x.io"})
+
+    reminder_scheduler.check_reminders()
+    record = store.get("111")
+    assert record["reminder_sent_sms_1"] and record["reminder_sent_email_24"]
+
+
+def test_reschedule_during_the_send_keeps_its_flags_clear(store, monkeypatch):
+    soon = (now_local() + timedelta(minutes=30)).isoformat()
+    later = (now_local() + timedelta(days=3)).isoformat()
+    store.put("111", {"slot_at": soon})
+    store.put("222", {"slot_at": soon})
+
+    def send(number, msg):
+        if number == "111":
+            store.put("111", {"slot_at": later})  # the customer moved it
+        else:
+            store.delete("222")  # or cancelled
+        return True
+
+    monkeypatch.setattr(reminder_scheduler, "_send_sms", send)
+    reminder_scheduler.check_reminders()
+    record = store.get("111")
+    assert record["slot_at"] == later
+    assert not any(key.startswith("reminder_sent") for key in record)
+    assert store.get("222") is None
@@ -0,0 +1,46 @@
+# tests/test_reply_buffer.py
+# Replies of one request are deduplicated and sent as one message
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.utils import reply_buffer
+from src.utils.reply_buffer import ReplyBuffer, collect_replies, send_reply
+
+
+def test_equivalent_replies_collapse_into_one_send():
+    buffer = ReplyBuffer()
+    assert buffer.add("555", "✅ You're booked for Monday 10:00 AM!")
+    assert buffer.add("555@c.us", "📧 Got an email address? Reply or say 'skip'.")
+    assert not buffer.add("555", "you're booked for monday 10:00 am")
+    assert not buffer.add("555", "  ")
+    assert buffer.add("777", "✅ Booked")
+    assert buffer.add("777", "✅ Booked for Monday 9:00")  # contains it, still new
+
+    sent = []
+    assert buffer.flush(lambda number, message: sent.append((number, message))) == 2
+    assert sent == [
+        (
+            "555",
+            "✅ You're booked for Monday 10:00 AM!\n\n"
+            "📧 Got an email address? Reply or say 'skip'.",
+        ),
+        ("777", "✅ Booked\n\n✅ Booked for Monday 9:00"),
+    ]
+    assert buffer.combined() == {}
+
+
+def test_send_reply_buffers_inside_a_request_only(monkeypatch):
+    queued = []
+    monkeypatch.setattr(
+        reply_buffer, "queue_message", lambda n, m: queued.append((n, m))
+    )
+    with collect_replies() as buffer:
+        send_reply("555", "hello")
+        send_reply("555", "Hello!")
+    assert queued == [] and buffer.messages("555") == ["hello"]
+
+    send_reply("555", "later")
+    assert queued == [("555", "later")]
@@ -0,0 +1,41 @@
+# tests/test_slot_cache.py
+# parse_slot_dt results are cached per normalized text for the current minute
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from datetime import datetime, timedelta, timezone
+
+from src.utils import slot_parser
+
+
+def test_cache_hits_within_the_minute_and_resets_after(monkeypatch):
+    clock = {"now": datetime(2026, 3, 6, 13, 59, 20, tzinfo=timezone.utc)}
+    calls = []
+    monkeypatch.setattr(slot_parser, "now_local", lambda: clock["now"])
+    monkeypatch.setattr(slot_parser, "_cache", slot_parser.SlotCache(maxsize=8))
+    monkeypatch.setattr(slot_parser, "SLOT_FALLBACKS", [])
+    parse_grammar = slot_parser._parse_grammar
+    monkeypatch.setattr(
+        slot_parser, "_parse_grammar", lambda t: calls.append(t) or parse_grammar(t)
+    )
+
+    first = slot_parser.parse_slot_dt("Friday 2:00 PM")
+    assert slot_parser.parse_slot_dt("  friday   2:00 pm ") == first
+    assert slot_parser.parse_slot_dt("hello") is None
+    assert slot_parser.parse_slot_dt("HELLO") is None
+    assert calls == ["friday 2:00 pm", "hello"]
+    assert first.day == 6 and first.hour == 14  # later today
+
+    # a new minute may change the answer: 2 PM today has now passed
+    clock["now"] += timedelta(minutes=2)
+    assert slot_parser.parse_slot_dt("Friday 2:00 PM") == first + timedelta(days=7)
+    assert len(calls) == 3
+    assert slot_parser._cache.stats() == {
+        "entries": 1,
+        "hits": 2,
+        "misses": 3,
+        "invalidations": 1,
+    }
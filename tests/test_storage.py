@@ -0,0 +1,356 @@
+# tests/test_storage.py
+# Behaviour shared by every bookings backend
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from datetime import datetime, timezone
+
+from src.storage import BACKENDS, open_store
+from src.storage.migrate import canonicalize, migrate
+from src.utils.time_utils import slot_key
+
+FRI_2PM = "2030-05-03T14:00:00+00:00"
+FRI_215PM = "2030-05-03T14:15:00+00:00"
+
+
+def _key(iso):
+    return slot_key(datetime.fromisoformat(iso))
+
+
+def _unversioned(bookings):
+    return {
+        user: {k: v for k, v in rec.items() if k != "version"}
+        for user, rec in bookings.items()
+    }
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def store(request, tmp_path):
+    suffix = ".json" if request.param == "json" else ".db"
+    s = open_store(request.param, tmp_path / f"bookings{suffix}")
+    yield s
+    s.close()
+
+
+def test_put_get_delete(store):
+    assert store.get("111@c.us") is None
+    store.put("111@c.us", {"time": "Monday 9:00 AM", "email": None})
+    assert store.get("111@c.us")["time"] == "Monday 9:00 AM"
+    assert store.delete("111@c.us") is True
+    assert store.delete("111@c.us") is False
+    assert store.load_all() == {}
+
+
+def test_slot_lookup_and_update(store):
+    store.put("a", {"slot_at": FRI_2PM})
+    store.put("b", {"slot_at": FRI_215PM})
+    assert store.users_for_slot(_key(FRI_2PM)) == ["a"]
+
+    store.update("b", slot_at=FRI_2PM, awaiting_email=True)
+    assert sorted(store.users_for_slot(_key(FRI_2PM))) == ["a", "b"]
+    assert store.get("b")["awaiting_email"] is True
+
+
+def test_replace_all_drops_missing_users(store):
+    store.put("a", {"time": "Monday 9:00 AM"})
+    store.put("b", {"time": "Monday 9:15 AM"})
+    store.replace_all({"b": {"time": "Monday 9:30 AM"}, "c": {}})
+    assert _unversioned(store.load_all()) == {"b": {"time": "Monday 9:30 AM"}, "c": {}}
+
+
+def test_migrate_json_to_sqlite(tmp_path):
+    source = open_store("json", tmp_path / "bookings.json")
+    source.replace_all({"a": {"slot_at": FRI_2PM}, "b": {"email": "b@x.io"}})
+    dest = open_store("sqlite", tmp_path / "bookings.db")
+
+    assert migrate(source, dest) == 2
+    assert dest.load_all() == source.load_all()
+    assert dest.users_for_slot(_key(FRI_2PM)) == ["a"]
+    dest.close()
+
+
+def test_migrate_replays_the_journal_log_read_only(tmp_path):
+    from src.storage import JournalStore
+    from src.storage.migrate import main
+
+    source = JournalStore(tmp_path / "bookings.json", compact_every=10_000)
+    source.put("a", {"slot_at": FRI_2PM})
+    source.update("a", email="a@x.io")
+    source._log.close()  # still only in bookings.log, as after a crash
+    with open(source.log_path, "ab") as f:
+        f.write(b'{"op":"put","user":"torn"')
+    before = {p.name: p.read_bytes() for p in tmp_path.iterdir()}
+
+    assert main(["--source", str(source.path), "--dest", str(tmp_path / "b.db")]) == 0
+    dest = open_store("sqlite", tmp_path / "b.db")
+    assert _unversioned(dest.load_all()) == {
+        "a": {"slot_at": FRI_2PM, "email": "a@x.io"}
+    }
+    dest.close()
+    assert {
+        p.name: p.read_bytes() for p in tmp_path.iterdir() if p.name in before
+    } == before
+
+
+def test_canonicalize_adds_slot_at_once(store):
+    resolved = datetime(2030, 5, 3, 14, 0, tzinfo=timezone.utc)
+    store.put("a", {"time": "Friday 2:00 PM"})
+    store.put("b", {"time": "Friday 2:15 PM", "slot_at": FRI_215PM})
+
+    assert canonicalize(store, resolve=lambda label: resolved) == 1
+    assert store.get("a")["slot_at"] == resolved.isoformat()
+    assert store.get("b")["slot_at"] == FRI_215PM
+    assert canonicalize(store, resolve=lambda label: resolved) == 0
+    assert canonicalize(store, resolve=lambda label: resolved, resource="alice") == 2
+    assert store.get("b")["resource"] == "alice"
+
+
+def test_sqlite_schema_survives_workers_starting_together(tmp_path):
+    import sqlite3
+    from concurrent.futures import ThreadPoolExecutor
+
+    path = tmp_path / "bookings.db"
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        stores = list(pool.map(lambda _: open_store("sqlite", path), range(8)))
+    stores[0].put("a", {"slot_at": FRI_2PM})
+    assert stores[-1].users_for_slot(_key(FRI_2PM)) == ["a"]
+    for s in stores:
+        s.close()
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA user_version = 99")
+    conn.close()
+    with pytest.raises(RuntimeError, match="schema v99"):
+        open_store("sqlite", path)
+
+
+def test_cas_checks_version_and_slot(store):
+    from src.storage.base import SlotConflict, VersionConflict
+
+    stored = store.cas("a", 0, {"slot_at": FRI_2PM})
+    assert stored["version"] == 1
+
+    with pytest.raises(VersionConflict):
+        store.cas("a", 0, {"slot_at": FRI_215PM})
+    with pytest.raises(SlotConflict):
+        store.cas("b", 0, {"slot_at": FRI_2PM})
+
+    store.update("a", email="a@x.io")
+    assert store.get("a")["version"] == 2
+    assert store.cas("a", 2, {"slot_at": FRI_215PM})["version"] == 3
+    assert store.cas("b", 0, {"slot_at": FRI_2PM})["version"] == 1
+    assert store.cas("a", 3, None) is None
+    assert store.get("a") is None
+
+
+def test_cas_allows_one_booking_per_resource(store):
+    from src.storage.base import SlotConflict
+
+    store.cas("a", 0, {"slot_at": FRI_2PM, "resource": "alice"})
+    store.cas("b", 0, {"slot_at": FRI_2PM, "resource": "bob"})
+    with pytest.raises(SlotConflict):
+        store.cas("c", 0, {"slot_at": FRI_2PM, "resource": "bob"})
+    assert store.users_for_slot(_key(FRI_2PM)) == ["a", "b"]
+
+
+def test_slot_index_follows_writes(store):
+    from src.storage import SlotIndex
+
+    from src.storage.base import slot_key_of
+
+    store.put("a", {"slot_at": FRI_2PM})
+    index = SlotIndex(store, slot_key_of)
+
+    assert index.is_taken(_key(FRI_2PM))
+    assert not index.is_taken(_key(FRI_2PM), exclude_user="a")
+
+    store.update("a", slot_at=FRI_215PM)
+    store.put("b", {"slot_at": FRI_2PM})
+    assert index.occupants(_key(FRI_2PM)) == {"b"}
+    assert index.slot_of("a") == _key(FRI_215PM)
+
+    store.delete("b")
+    store.replace_all({"a": {"email": "a@x.io"}})
+    assert len(index) == 0
+    index.close()
+
+
+def test_sqlite_replays_writes_from_other_processes(tmp_path):
+    from src.storage import SqliteStore
+
+    # two store objects on one file stand in for two worker processes
+    mine = open_store("sqlite", tmp_path / "bookings.db")
+    other = open_store("sqlite", tmp_path / "bookings.db")
+    seen_by_mine, seen_by_other = [], []
+    mine.subscribe(lambda user, rec: seen_by_mine.append((user, rec)))
+    other.subscribe(lambda user, rec: seen_by_other.append((user, rec)))
+
+    mine.put("a", {"slot_at": FRI_2PM})
+    seen_by_mine.clear()
+    assert mine.sync_external() and seen_by_mine == []
+    assert other.sync_external()
+    assert [u for u, _ in seen_by_other] == ["a"]
+    assert other.sync_external() and len(seen_by_other) == 1
+
+    other.update("a", email="a@x.io")
+    other.delete("a")
+    mine.put("b", {"slot_at": FRI_215PM})
+    seen_by_mine.clear()
+    assert mine.sync_external()
+    assert seen_by_mine == [("a", None)]  # one replay per user, current state
+
+    # a worker that fell behind the pruned log has to rebuild
+    pruner = SqliteStore(tmp_path / "bookings.db", change_log_keep=1)
+    for n in range(300):
+        pruner.put(f"u{n}", {})
+    assert not other.sync_external()
+    assert other.sync_external()
+    for store in (mine, other, pruner):
+        store.close()
+
+
+def test_indexes_apply_other_workers_writes_without_rebuilding(tmp_path, monkeypatch):
+    from src.handlers import booking_handler
+    from src.storage import SlotIndex, set_store
+
+    mine = open_store("sqlite", tmp_path / "bookings.db")
+    other = open_store("sqlite", tmp_path / "bookings.db")
+    set_store(mine)
+    try:
+        index = booking_handler.get_slot_index()
+        monkeypatch.setattr(SlotIndex, "rebuild", lambda self: pytest.fail("rebuilt"))
+        other.put("a", {"slot_at": FRI_2PM})
+        assert booking_handler.get_slot_index() is index
+        assert index.slot_of("a") == (_key(FRI_2PM), "default")
+    finally:
+        set_store(None)
+        other.close()
+
+
+def test_journal_recovers_from_snapshot_and_log(tmp_path):
+    from src.storage import JournalStore
+
+    path = tmp_path / "bookings.json"
+    store = JournalStore(path, compact_every=10_000)
+    store.put("a", {"slot_at": FRI_2PM})
+    store.put("b", {"slot_at": FRI_215PM})
+    store.update("a", email="a@x.io")
+    store.delete("b")
+    store._log.close()  # simulate a crash: no compaction on close
+
+    # a crash mid-append leaves a torn final line behind
+    with open(store.log_path, "ab") as f:
+        f.write(b'{"op":"put","user":"c","rec":{')
+
+    recovered = JournalStore(path, compact_every=10_000)
+    assert _unversioned(recovered.load_all()) == {
+        "a": {"slot_at": FRI_2PM, "email": "a@x.io"}
+    }
+    recovered.put("c", {})
+    recovered.close()
+
+    reopened = JournalStore(path)
+    assert sorted(reopened.load_all()) == ["a", "c"]
+    assert reopened.log_path.read_bytes() == b""
+    reopened.close()
+
+
+def test_journal_compaction_keeps_writes(tmp_path):
+    from src.storage import JournalStore
+    from src.storage.json_store import read_json
+
+    path = tmp_path / "bookings.json"
+    store = JournalStore(path, compact_every=5)
+    for i in range(23):
+        store.put(f"user-{i}", {"n": i})
+    if store._compactor is not None:
+        store._compactor.join()
+    store.compact()
+
+    assert len(read_json(path)) == 23
+    assert store.log_path.stat().st_size == 0
+    store.put("late", {"n": -1})
+    store._log.close()
+    assert JournalStore(path).get("late") == {"n": -1, "version": 1}
+
+
+@pytest.mark.parametrize("mode", ["fsync", "batched"])
+def test_journal_write_that_never_reached_disk_is_rolled_back(
+    tmp_path, monkeypatch, mode
+):
+    from src.storage import JournalStore
+
+    store = JournalStore(tmp_path / "bookings.json", durability=mode)
+    store.put("a", {"slot_at": FRI_2PM})
+    heard = []
+    store.subscribe(lambda user, record: heard.append((user, record)))
+
+    def disk_full(fd):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(os, "fsync", disk_full)
+    with pytest.raises(OSError):
+        store.cas("b", 0, {"slot_at": FRI_215PM})
+    monkeypatch.undo()
+
+    assert store.get("b") is None
+    assert heard[-1] == ("b", None)  # indexes drop it again
+    store.cas("c", 0, {"slot_at": FRI_215PM})  # the slot was never taken
+    store.close()
+    reopened = JournalStore(tmp_path / "bookings.json")
+    assert sorted(reopened.load_all()) == ["a", "c"]
+    reopened.close()
+
+
+@pytest.mark.parametrize("mode", ["fsync", "batched", "async"])
+def test_group_commit_coalesces_concurrent_writers(mode):
+    import threading
+
+    from src.storage.group_commit import GroupCommitter
+
+    flushed = []
+    committer = GroupCommitter(flushed.append, mode=mode, window_ms=20)
+
+    def writer(i):
+        committer.commit(i)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(50)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    committer.close()
+
+    stats = committer.stats()
+    assert sorted(i for batch in flushed for i in batch) == list(range(50))
+    assert stats["commits"] == 50
+    if mode == "fsync":
+        assert stats["flushes"] == 50
+    else:
+        assert stats["flushes"] < 50
+        assert stats["batch_size_max"] > 1
+
+
+def test_multi_worker_start_adopts_the_journal_once(tmp_path):
+    from src.server import adopt_journal
+    from src.storage import JournalStore
+
+    journal = JournalStore(tmp_path / "bookings.json", compact_every=10_000)
+    journal.put("a", {"slot_at": FRI_2PM})
+    journal.update("a", email="a@x.io")  # only in bookings.log so far
+    db = tmp_path / "bookings.db"
+
+    assert adopt_journal(db, journal.path) == 1
+    journal.put("b", {"slot_at": FRI_215PM})
+    assert adopt_journal(db, journal.path) == 0  # never overwrites a live db
+    store = open_store("sqlite", db)
+    assert _unversioned(store.load_all()) == {
+        "a": {"slot_at": FRI_2PM, "email": "a@x.io"}
+    }
+    store.close()
+    journal.close()
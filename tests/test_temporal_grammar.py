@@ -0,0 +1,63 @@
+# tests/test_temporal_grammar.py
+# the in-process grammar reads the benchmark corpus and ranges correctly
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src.utils import slot_parser
+from src.utils.temporal_grammar import Temporal, parse, resolve
+
+CORPUS = Path(__file__).resolve().parents[1] / "benchmarks" / "temporal_corpus.json"
+# Wednesday 4 March 2026
+NOW = datetime(2026, 3, 4, 10, 17, tzinfo=timezone.utc)
+
+
+def _reading(found):
+    if found is None:
+        return None
+    if found.grain == "day":
+        return found.start.date().isoformat()
+    return found.start.strftime("%Y-%m-%dT%H:%M")
+
+
+def test_corpus():
+    corpus = json.loads(CORPUS.read_text(encoding="utf-8"))
+    now = datetime.fromisoformat(corpus["reference"]).replace(tzinfo=timezone.utc)
+    readings = {
+        case["text"]: _reading(resolve(case["text"], now)) for case in corpus["cases"]
+    }
+    expected = {case["text"]: case["expect"] for case in corpus["cases"]}
+    assert readings == expected
+
+
+def test_ranges_and_day_only_texts():
+    assert resolve("between 11 and 1 on friday", NOW) == Temporal(
+        datetime(2026, 3, 6, 11, tzinfo=timezone.utc),
+        datetime(2026, 3, 6, 13, tzinfo=timezone.utc),
+    )
+    assert resolve("2-4pm", NOW).end == datetime(2026, 3, 4, 16, tzinfo=timezone.utc)
+
+    # a day with no time is not a slot
+    assert resolve("next tuesday", NOW).grain == "day"
+    assert parse("next tuesday", NOW) is None
+    assert parse("next tuesday at 10", NOW) == datetime(
+        2026, 3, 10, 10, tzinfo=timezone.utc
+    )
+
+
+def test_slot_parser_rounds_grammar_results(monkeypatch):
+    monkeypatch.setattr(slot_parser, "now_local", lambda: NOW)
+    monkeypatch.setattr(slot_parser, "_cache", slot_parser.SlotCache(maxsize=8))
+    monkeypatch.setattr(slot_parser, "SLOT_FALLBACKS", [])
+
+    assert slot_parser.parse_slot_dt("in 2 hours") == datetime(
+        2026, 3, 4, 12, 15, tzinfo=timezone.utc
+    )
+    assert slot_parser.parse_slot("July 1 after lunch") == "Wednesday 1 July 1:00 PM"
+    assert slot_parser.parse_slot_dt("July 1") is None
@@ -0,0 +1,64 @@
+# tests/test_tracing.py
+# Request traces: nested spans, queue hand-off, export and propagation
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+
+from src.outbox import Outbox
+from src.utils import tracing
+from src.utils.metrics import timed
+
+
+def test_request_trace_nests_spans_and_exports(tmp_path, monkeypatch):
+    exporter = tracing.TraceExporter(tmp_path / "traces.jsonl", keep=10)
+    monkeypatch.setattr(tracing, "exporter", exporter)
+
+    started = tracing.start_trace("incoming", number="555")
+    with tracing.request_trace("incoming", number="555") as trace:
+        assert trace is started
+        with timed("route"):
+            with tracing.span("parse_slot"):
+                header = tracing.headers()["traceparent"]
+    exporter.close()
+
+    spans = {s["name"]: s for s in trace.to_dict()["spans"]}
+    assert list(spans) == ["ingest_wait", "route", "parse_slot"]
+    assert spans["parse_slot"]["parent_id"] == spans["route"]["span_id"]
+    assert header == f"00-{trace.trace_id}-{spans['parse_slot']['span_id']}-01"
+    (line,) = (tmp_path / "traces.jsonl").read_text().splitlines()
+    assert json.loads(line)["trace_id"] == trace.trace_id
+    assert exporter.recent(limit=1)[0]["trace_id"] == trace.trace_id
+
+
+def test_export_file_is_rotated_by_size(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = tracing.TraceExporter(path, max_bytes=1000)
+    for _ in range(20):
+        trace = tracing.Trace("incoming", number="555")
+        trace.root.end = trace.root.start
+        exporter.export(trace)
+    exporter.close()
+
+    rotated = path.with_name("traces.jsonl.1")
+    assert rotated.exists() and rotated.stat().st_size < 2000
+    assert not path.exists() or path.stat().st_size < 1000
+    assert tracing.TraceExporter().path is None  # file export is opt-in
+
+
+def test_outbox_carries_the_traceparent_to_the_sender(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "exporter", tracing.TraceExporter(None))
+    seen = []
+    outbox = Outbox(
+        tmp_path / "outbox.db", send=lambda n, m: seen.append(tracing.headers())
+    )
+    with tracing.request_trace("incoming") as trace:
+        outbox.enqueue("555", "hello")
+    outbox.start()
+    assert outbox.flush(timeout=5)
+    outbox.close()
+    assert seen[0]["traceparent"].startswith(f"00-{trace.trace_id}-")
+    assert tracing.headers() == {}
@@ -63,7 +63,8 @@ client.on('ready', () => {
 client.on('message', async (msg) => {
     console.log('📩 New WhatsApp message:', msg.body);
     try {
-        const payload = { message: msg.body, number: msg.from };
+        // id + timestamp let the agent drop redelivered messages
+        const payload = { message: msg.body, number: msg.from, id: msg.id._serialized, timestamp: msg.timestamp };
         console.log('📤 Forwarding message to agent:', payload);
         await axios.post(`http://localhost:${fastApiPort}/incoming`, payload);
     } catch (error) {